@@ -0,0 +1,322 @@
+#bench/carga.py
+"""
+Teste de carga de ponta a ponta: sobe a aplicação real (uvicorn) apontada para o ERP
+local sintético e simula estações de leitura e painéis ao mesmo tempo.
+
+Uso:
+    python -m bench.carga [--estacoes 1,5,20] [--taxa 2] [--paineis 3] [--intervalo-painel 2]
+                          [--duracao 20] [--armazem csv|sqlite] [--workers 1] [--saida arquivo.json]
+
+Cada nível de --estacoes é uma rodada com servidor e arquivos novos. Cada estação
+entra com o seu usuário e envia leituras a `--taxa` por segundo em /api/registrar_leitura;
+cada painel consulta /api/ops e /api/filtros a cada `--intervalo-painel` segundos.
+Ao fim da rodada o servidor é parado e o armazenamento é conferido contra as respostas:
+leituras confirmadas que não estão gravadas são perdidas; gravações além das enviadas
+são duplicadas; linhas do CSV fora do layout são corrompidas.
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+import httpx
+
+from bench.dados import gerar_erp, gerar_registros
+from bench.medicao import metadados, salvar
+
+PASTA_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados")
+SENHA_ESTACOES = "bench"
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentis(tempos: list[float]) -> dict:
+    if not tempos:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    ordenados = sorted(tempos)
+
+    def p(q):
+        return round(ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))] * 1000, 3)
+
+    return {"p50_ms": p(0.50), "p95_ms": p(0.95), "p99_ms": p(0.99), "max_ms": round(ordenados[-1] * 1000, 3)}
+
+
+class Estatisticas:
+    def __init__(self):
+        self.tempos = defaultdict(list)
+        self.erros = Counter()
+        self.status = defaultdict(Counter)
+
+    def anotar(self, rota: str, inicio: float, status):
+        self.tempos[rota].append(time.perf_counter() - inicio)
+        self.status[rota][str(status)] += 1
+        if not isinstance(status, int) or status >= 400:
+            self.erros[rota] += 1
+
+    def resumo(self, duracao: float) -> dict:
+        rotas = {}
+        for rota, tempos in self.tempos.items():
+            rotas[rota] = {
+                "requisicoes": len(tempos),
+                "vazao_rps": round(len(tempos) / duracao, 2),
+                "taxa_erro": round(self.erros[rota] / len(tempos), 4) if tempos else 0.0,
+                "status": dict(self.status[rota]),
+                **_percentis(tempos),
+            }
+        return rotas
+
+
+async def _entrar(cliente: httpx.AsyncClient, login: str):
+    resposta = await cliente.post("/login", data={"login": login, "senha": SENHA_ESTACOES})
+    if resposta.status_code != 302:
+        raise RuntimeError(f"Login de {login} falhou ({resposta.status_code})")
+
+
+async def _estacao(url: str, login: str, ops: list[dict], taxa: float, fim: float, stats: Estatisticas,
+                   enviadas: Counter, confirmadas: Counter, semente: int):
+    aleatorio = random.Random(semente)
+    intervalo = 1.0 / taxa if taxa > 0 else 0
+    async with httpx.AsyncClient(base_url=url, timeout=30) as cliente:
+        await _entrar(cliente, login)
+        proxima = time.perf_counter()
+        while time.perf_counter() < fim:
+            op = aleatorio.choice(ops)
+            chave = (login, op["CODIGO_OP"])
+            payload = {
+                "cod_op": op["CODIGO_OP"],
+                "codigo_barras": aleatorio.choice(op["CODIGOS_BARRAS"]),
+                "nome_produto": f"PRODUTO {op['ID_PRODUTO']:05d}",
+                "especie": "ESTOFADOS",
+                "sub_especie": "SUBESPECIE",
+                "id_produto": str(op["ID_PRODUTO"]),
+            }
+            enviadas[chave] += 1
+            inicio = time.perf_counter()
+            try:
+                resposta = await cliente.post("/api/registrar_leitura", json=payload)
+                stats.anotar("registrar_leitura", inicio, resposta.status_code)
+                if resposta.status_code == 200 and resposta.json().get("ok"):
+                    confirmadas[chave] += 1
+            except httpx.HTTPError as e:
+                stats.anotar("registrar_leitura", inicio, type(e).__name__)
+
+            proxima += intervalo
+            espera = proxima - time.perf_counter()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            else:
+                proxima = time.perf_counter()
+
+
+async def _painel(url: str, data_inicio: str, data_fim: str, intervalo: float, fim: float, stats: Estatisticas):
+    consulta = {"data_inicio": data_inicio, "data_fim": data_fim}
+    async with httpx.AsyncClient(base_url=url, timeout=60) as cliente:
+        while time.perf_counter() < fim:
+            for rota, caminho, params in (
+                ("ops", "/api/ops", {**consulta, "limite": 100, "formato": "colunar"}),
+                ("filtros", "/api/filtros", consulta),
+            ):
+                inicio = time.perf_counter()
+                try:
+                    resposta = await cliente.get(caminho, params=params)
+                    stats.anotar(rota, inicio, resposta.status_code)
+                except httpx.HTTPError as e:
+                    stats.anotar(rota, inicio, type(e).__name__)
+            await asyncio.sleep(intervalo)
+
+
+def _gravadas(armazem: str, caminho_csv: str, caminho_db: str) -> tuple[Counter, int]:
+    """Leituras gravadas por (USUARIO, COD_OP) e quantidade de linhas corrompidas."""
+    gravadas, corrompidas = Counter(), 0
+    if armazem == "sqlite":
+        con = sqlite3.connect(caminho_db)
+        try:
+            for usuario, cod_op, qtd in con.execute(
+                    "SELECT USUARIO, COD_OP, SUM(QTD) FROM LEITURA_PRODUTO GROUP BY USUARIO, COD_OP"):
+                gravadas[(usuario, cod_op)] += qtd
+        finally:
+            con.close()
+        return gravadas, corrompidas
+
+    with open(caminho_csv, "r", encoding="utf-8", newline="") as arq:
+        leitor = csv.reader(arq)
+        cabecalho = next(leitor, [])
+        for linha in leitor:
+            if len(linha) != len(cabecalho):
+                corrompidas += 1
+                continue
+            registro = dict(zip(cabecalho, linha))
+            gravadas[(registro["USUARIO"], registro["COD_OP"])] += 1
+    return gravadas, corrompidas
+
+
+def _conferir(enviadas: Counter, confirmadas: Counter, gravadas: Counter, usuarios: set) -> dict:
+    perdidas = duplicadas = 0
+    for chave in set(enviadas) | set(gravadas):
+        if chave[0] not in usuarios:
+            continue  # leituras sintéticas pré-existentes
+        perdidas += max(0, confirmadas[chave] - gravadas[chave])
+        duplicadas += max(0, gravadas[chave] - enviadas[chave])
+    return {
+        "enviadas": sum(enviadas.values()),
+        "confirmadas": sum(confirmadas.values()),
+        "gravadas": sum(v for k, v in gravadas.items() if k[0] in usuarios),
+        "perdidas": perdidas,
+        "duplicadas": duplicadas,
+    }
+
+
+def _subir_servidor(pasta: str, ambiente: dict, porta: int, workers: int = 1) -> subprocess.Popen:
+    log = open(os.path.join(pasta, "servidor.log"), "w", encoding="utf-8")
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main_web:app", "--host", "127.0.0.1", "--port", str(porta),
+         "--log-level", "warning", "--no-access-log", "--workers", str(workers)],
+        env={**os.environ, **ambiente}, stdout=log, stderr=subprocess.STDOUT,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    log.close()  # o processo do servidor mantém a sua cópia do arquivo
+    url = f"http://127.0.0.1:{porta}"
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"O servidor terminou ao subir; veja {log.name}")
+        try:
+            if httpx.get(url + "/", timeout=1).status_code == 200:
+                return processo
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError("O servidor não respondeu em 60s")
+
+
+def _parar_servidor(processo: subprocess.Popen):
+    processo.terminate()  # SIGTERM: o uvicorn executa o fim do ciclo de vida (fsync e fechamento)
+    try:
+        processo.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        processo.kill()
+        processo.wait()
+
+
+def rodada(pasta: str, estacoes: int, taxa: float, paineis: int, intervalo_painel: float, duracao: float,
+           armazem: str, n_ops: int, n_leituras: int, dias: int, workers: int = 1) -> dict:
+    caminho_erp = os.path.join(pasta, "erp.db")
+    caminho_csv = os.path.join(pasta, "registros.csv")
+    caminho_db = os.path.join(pasta, "registros.db")
+    caminho_usuarios = os.path.join(pasta, "usuarios.csv")
+    for caminho in (caminho_csv, caminho_db, caminho_db + "-wal", caminho_db + "-shm"):
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+    inicio = date.today() - timedelta(days=dias // 2)
+    ops = gerar_erp(caminho_erp, n_ops=n_ops, dias=dias, inicio=inicio)
+    if armazem == "csv":
+        gerar_registros(caminho_csv, ops, n_leituras)
+
+    logins = [f"estacao_{k:03d}" for k in range(1, estacoes + 1)]
+    with open(caminho_usuarios, "w", encoding="utf-8", newline="") as arq:
+        escritor = csv.writer(arq, lineterminator="\n")
+        escritor.writerow(["ID_USUARIO", "LOGIN", "SENHA", "NOME", "NIVEL_ACESSO", "ATIVO"])
+        for k, login in enumerate(logins, 1):
+            escritor.writerow([k, login, SENHA_ESTACOES, login, "operador", "S"])
+
+    porta = _porta_livre()
+    processo = _subir_servidor(pasta, {
+        "ERP_LOCAL_PATH": caminho_erp,
+        "REGISTROS_CSV_PATH": caminho_csv,
+        "ARMAZEM_LEITURAS": armazem,
+        "ARMAZEM_SQLITE_PATH": caminho_db,
+        "USUARIOS_CSV_PATH": caminho_usuarios,
+        "SESSAO_SEGREDO": "bench-carga",
+    }, porta, workers)
+
+    stats = Estatisticas()
+    enviadas, confirmadas = Counter(), Counter()
+    formatar = lambda d: d.strftime("%d/%m/%Y")
+    data_inicio, data_fim = formatar(inicio), formatar(inicio + timedelta(days=dias - 1))
+
+    async def simular():
+        fim = time.perf_counter() + duracao
+        tarefas = [_estacao(f"http://127.0.0.1:{porta}", login, ops, taxa, fim, stats, enviadas, confirmadas, k)
+                   for k, login in enumerate(logins)]
+        tarefas += [_painel(f"http://127.0.0.1:{porta}", data_inicio, data_fim, intervalo_painel, fim, stats)
+                    for _ in range(paineis)]
+        await asyncio.gather(*tarefas)
+
+    try:
+        t0 = time.perf_counter()
+        asyncio.run(simular())
+        decorrido = time.perf_counter() - t0
+    finally:
+        _parar_servidor(processo)
+
+    gravadas, corrompidas = _gravadas(armazem, caminho_csv, caminho_db)
+    return {
+        "estacoes": estacoes,
+        "paineis": paineis,
+        "workers": workers,
+        "duracao_s": round(decorrido, 2),
+        "rotas": stats.resumo(decorrido),
+        "integridade": {**_conferir(enviadas, confirmadas, gravadas, set(logins)), "corrompidas": corrompidas},
+    }
+
+
+def _imprimir(resultado: dict):
+    integridade = resultado["integridade"]
+    print(f"\n=== {resultado['estacoes']} estações, {resultado['paineis']} painéis, {resultado['workers']} worker(s) "
+          f"({resultado['duracao_s']}s) ===")
+    for rota, r in resultado["rotas"].items():
+        print(f"{rota:18s} {r['requisicoes']:6d} req  {r['vazao_rps']:8.2f} req/s  erro {r['taxa_erro']:.2%}  "
+              f"p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms  p99 {r['p99_ms']} ms")
+    print(f"leituras: enviadas {integridade['enviadas']}  confirmadas {integridade['confirmadas']}  "
+          f"gravadas {integridade['gravadas']}  perdidas {integridade['perdidas']}  "
+          f"duplicadas {integridade['duplicadas']}  corrompidas {integridade['corrompidas']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Teste de carga com estações de leitura e painéis simultâneos")
+    parser.add_argument("--estacoes", default="1,5,20", help="níveis de estações, separados por vírgula")
+    parser.add_argument("--taxa", type=float, default=2.0, help="leituras por segundo em cada estação")
+    parser.add_argument("--paineis", type=int, default=3)
+    parser.add_argument("--intervalo-painel", type=float, default=2.0, help="segundos entre consultas de cada painel")
+    parser.add_argument("--duracao", type=float, default=20.0, help="segundos de cada nível")
+    parser.add_argument("--armazem", choices=("csv", "sqlite"), default="csv")
+    parser.add_argument("--workers", type=int, default=1, help="processos do uvicorn (--workers)")
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--leituras", type=int, default=20000, help="leituras pré-existentes no registros.csv")
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--saida", help="arquivo JSON de resultado (padrão: bench/resultados/carga-<data>.json)")
+    args = parser.parse_args(argv)
+
+    niveis = [int(n) for n in args.estacoes.split(",") if n.strip()]
+    parametros = {k: v for k, v in vars(args).items() if k != "saida"}
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix="carga-") as pasta:
+        for estacoes in niveis:
+            resultado = rodada(pasta, estacoes, args.taxa, args.paineis, args.intervalo_painel, args.duracao,
+                               args.armazem, args.ops, args.leituras, args.dias, args.workers)
+            _imprimir(resultado)
+            resultados.append(resultado)
+
+    saida = args.saida or os.path.join(PASTA_RESULTADOS, f"carga-{datetime.now():%Y%m%d-%H%M%S}.json")
+    salvar({"meta": metadados(parametros), "niveis": resultados}, saida)
+    print(f"\n[OK] Resultado gravado em {saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
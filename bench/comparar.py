@@ -0,0 +1,40 @@
+#bench/comparar.py
+"""
+Compara dois resultados de benchmark (mediana de cada etapa).
+
+Uso:
+    python -m bench.comparar antes.json depois.json
+"""
+import json
+import sys
+
+
+def comparar(antes: dict, depois: dict) -> list[tuple]:
+    linhas = []
+    for nome in sorted(set(antes["resultados"]) | set(depois["resultados"])):
+        a = antes["resultados"].get(nome, {}).get("mediana_ms")
+        d = depois["resultados"].get(nome, {}).get("mediana_ms")
+        razao = d / a if a and d is not None else None
+        linhas.append((nome, a, d, razao))
+    return linhas
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print(__doc__)
+        return 2
+    with open(argv[0], encoding="utf-8") as arq:
+        antes = json.load(arq)
+    with open(argv[1], encoding="utf-8") as arq:
+        depois = json.load(arq)
+
+    print(f"{'etapa':32s} {'antes (ms)':>12s} {'depois (ms)':>12s} {'razão':>8s}")
+    for nome, a, d, razao in comparar(antes, depois):
+        fmt = lambda v: f"{v:12.3f}" if v is not None else f"{'-':>12s}"
+        print(f"{nome:32s} {fmt(a)} {fmt(d)} {f'{razao:7.2f}x' if razao else '       -'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
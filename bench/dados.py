@@ -0,0 +1,100 @@
+#bench/dados.py
+"""Geração de dados sintéticos: ERP local com N OPs e um registros.csv com M leituras."""
+import csv
+import os
+import random
+import sqlite3
+from datetime import date, datetime, timedelta
+
+from src.database.erp_local import criar_esquema
+from src.logic.diario_registros import COLUNAS_REGISTROS
+
+ESPECIES = ["ESTOFADOS", "COLCHÕES", "CABECEIRAS", "BASES", "TRAVESSEIROS", "ACESSÓRIOS"]
+
+
+def gerar_erp(caminho: str, n_ops: int = 5000, dias: int = 60, inicio: date = None, n_produtos: int = 500,
+              n_subespecies: int = 40, subdivisoes_por_op: int = 2, semente: int = 42) -> list[dict]:
+    """
+    Cria o ERP local em `caminho` com `n_ops` OPs (metade de linha, metade sob encomenda)
+    distribuídas em `dias` dias a partir de `inicio`. Retorna as OPs geradas
+    (CODIGO_OP, ID_PRODUTO, QTD_PREVISTA, CODIGOS_BARRAS) para gerar leituras.
+    """
+    aleatorio = random.Random(semente)
+    inicio = inicio or date.today() - timedelta(days=dias // 2)
+    if os.path.exists(caminho):
+        os.remove(caminho)
+    criar_esquema(caminho)
+
+    con = sqlite3.connect(caminho)
+    try:
+        con.executemany("INSERT INTO especie VALUES (?, ?)",
+                        [(i, f"PRODUTO ACABADO -{nome}") for i, nome in enumerate(ESPECIES, 1)])
+        con.executemany("INSERT INTO sub_especie VALUES (?, ?)",
+                        [(i, f"SUBESPECIE {i:03d}") for i in range(1, n_subespecies + 1)])
+        con.execute("INSERT INTO periodo_producao VALUES (1, 'PERIODO')")
+
+        produtos, codigos_produto = [], {}
+        for id_produto in range(1, n_produtos + 1):
+            produtos.append((id_produto, f"PRODUTO {id_produto:05d}", aleatorio.randint(1, len(ESPECIES)),
+                             aleatorio.randint(1, n_subespecies)))
+            codigos_produto[id_produto] = [f"789{id_produto:06d}{k:04d}" for k in range(aleatorio.randint(1, 3))]
+        con.executemany("INSERT INTO produto VALUES (?, ?, ?, ?)", produtos)
+        con.executemany("INSERT INTO produto_grade VALUES (?, ?)", [(p[0], p[0]) for p in produtos])
+        con.executemany("INSERT INTO grade_cor VALUES (?, ?)", [(p[0], p[0]) for p in produtos])
+        con.executemany("INSERT INTO codigo_barras (id_produto, codigo_barras) VALUES (?, ?)",
+                        [(id_produto, c) for id_produto, codigos in codigos_produto.items() for c in codigos])
+
+        ops, tabelas = [], {"linha": ([], []), "sob_encomenda": ([], [])}
+        for k in range(n_ops):
+            tipo = "linha" if k % 2 == 0 else "sob_encomenda"
+            id_os = k + 1
+            codigo = 100000 + k
+            id_produto = aleatorio.randint(1, n_produtos)
+            quando = datetime.combine(inicio + timedelta(days=aleatorio.randrange(dias)), datetime.min.time())
+            quando += timedelta(hours=aleatorio.randint(6, 18))
+            qtd = aleatorio.randint(1, 50)
+            linhas_op, subdivisoes = tabelas[tipo]
+            linhas_op.append((id_os, codigo, quando.strftime("%Y-%m-%d %H:%M:%S"), qtd, id_produto, 1))
+            codigos_sub = [f"{codigo}{s:03d}" for s in range(subdivisoes_por_op)]
+            subdivisoes.extend((id_os, c) for c in codigos_sub)
+            ops.append({"CODIGO_OP": str(codigo), "ID_PRODUTO": id_produto, "QTD_PREVISTA": qtd,
+                        "CODIGOS_BARRAS": codigos_produto[id_produto] + codigos_sub})
+
+        con.executemany("INSERT INTO os_producao_linha_prod VALUES (?, ?, ?, ?, ?, ?)", tabelas["linha"][0])
+        con.executemany("INSERT INTO os_producao_sob_enc VALUES (?, ?, ?, ?, ?, ?)", tabelas["sob_encomenda"][0])
+        con.executemany("INSERT INTO subdivisao_os_prod_linha_prod (id_ordem_serv_prod_linha, codigo_barras) VALUES (?, ?)",
+                        tabelas["linha"][1])
+        con.executemany("INSERT INTO subdivisao_os_prod_sob_enc (id_os_prod_sob_enc, codigo_barras) VALUES (?, ?)",
+                        tabelas["sob_encomenda"][1])
+        con.commit()
+    finally:
+        con.close()
+    return ops
+
+
+def linha_leitura(op: dict, aleatorio: random.Random, quando: datetime = None) -> dict:
+    """Uma leitura da OP no layout do registros.csv."""
+    return {
+        "DATA": (quando or datetime.now()).strftime("%Y-%m-%d %H:%M:%S"),
+        "COD_OP": op["CODIGO_OP"],
+        "CODIGO_BARRAS": aleatorio.choice(op["CODIGOS_BARRAS"]),
+        "ID_PRODUTO": op["ID_PRODUTO"],
+        "NOME_PRODUTO": f"PRODUTO {op['ID_PRODUTO']:05d}",
+        "ESPECIE": "ESTOFADOS",
+        "SUB_ESPECIE": "SUBESPECIE",
+        "QTD": 1,
+        "USUARIO": "bench",
+    }
+
+
+def gerar_registros(caminho: str, ops: list[dict], n_leituras: int = 50000, semente: int = 42) -> None:
+    """Grava um registros.csv com `n_leituras` leituras espalhadas entre as OPs."""
+    aleatorio = random.Random(semente)
+    agora = datetime.now()
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    with open(caminho, "w", encoding="utf-8", newline="") as arq:
+        escritor = csv.DictWriter(arq, fieldnames=COLUNAS_REGISTROS, lineterminator="\n")
+        escritor.writeheader()
+        for k in range(n_leituras):
+            quando = agora - timedelta(seconds=n_leituras - k)
+            escritor.writerow(linha_leitura(aleatorio.choice(ops), aleatorio, quando))
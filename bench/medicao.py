@@ -0,0 +1,63 @@
+#bench/medicao.py
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+
+def medir(funcao, repeticoes: int = 5, preparar=None, operacoes: int = 1, silencioso: bool = True) -> dict:
+    """
+    Executa `funcao()` `repeticoes` vezes (com `preparar()` antes de cada uma, fora do
+    tempo medido) e resume os tempos em milissegundos. `operacoes` é quantas operações
+    cada chamada faz, para o custo por operação.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        saida = io.StringIO() if silencioso else sys.stdout
+        with contextlib.redirect_stdout(saida):
+            if preparar:
+                preparar()
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append(time.perf_counter() - inicio)
+    mediana = statistics.median(tempos)
+    return {
+        "repeticoes": repeticoes,
+        "operacoes": operacoes,
+        "min_ms": round(min(tempos) * 1000, 3),
+        "mediana_ms": round(mediana * 1000, 3),
+        "max_ms": round(max(tempos) * 1000, 3),
+        "por_operacao_us": round(mediana / operacoes * 1e6, 3),
+    }
+
+
+def _commit_atual() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+
+def metadados(parametros: dict) -> dict:
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_atual(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parametros": parametros,
+    }
+
+
+def salvar(resultado: dict, caminho: str) -> str:
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as arq:
+        json.dump(resultado, arq, ensure_ascii=False, indent=2)
+    return caminho
@@ -0,0 +1,135 @@
+#bench/micro.py
+"""
+Microbenchmarks das partes quentes do painel e do registro de leituras, contra o ERP
+local (SQLite) com dados sintéticos.
+
+Uso:
+    python -m bench.micro [--ops 5000] [--leituras 50000] [--dias 60] [--repeticoes 5] [--saida arquivo.json]
+
+O resultado (tempos min/mediana/max por etapa) é gravado em JSON; compare execuções
+com `python -m bench.comparar antes.json depois.json`.
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+from bench.dados import gerar_erp, gerar_registros, linha_leitura
+from bench.medicao import medir, metadados, salvar
+
+PASTA_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados")
+
+
+def executar(n_ops: int, n_leituras: int, dias: int, repeticoes: int, pasta: str) -> dict:
+    caminho_erp = os.path.join(pasta, "erp.db")
+    caminho_csv = os.path.join(pasta, "registros.csv")
+    inicio = date.today() - timedelta(days=dias // 2)
+    ops = gerar_erp(caminho_erp, n_ops=n_ops, dias=dias, inicio=inicio)
+    gerar_registros(caminho_csv, ops, n_leituras)
+
+    # O ERP local e o registros.csv sintético precisam estar no ambiente antes dos imports da aplicação
+    os.environ["ERP_LOCAL_PATH"] = caminho_erp
+    os.environ["REGISTROS_CSV_PATH"] = caminho_csv
+    os.environ["ARMAZEM_LEITURAS"] = "csv"
+    from src.logic.configuracao import recarregar_configuracao
+    recarregar_configuracao()
+
+    from fastapi.encoders import jsonable_encoder
+    import json
+
+    from src.database.leituras_sqlite import ArmazemSQLite
+    from src.logic.cache_ops import invalidar_cache_ops
+    from src.logic.consulta_ops import (
+        _enriquecer_registros, _obter_particoes, carregar_op, carregar_ops_intervalo, classificar_status,
+        ordenar_ops, paginar_ops
+    )
+    from src.logic.diario_registros import DiarioRegistros
+    from src.logic.execucao import executar_em_paralelo
+    from src.logic.indice_registros import IndiceRegistros
+    from src.main_web import _montar_ops
+
+    data_inicio, data_fim = inicio.isoformat(), (inicio + timedelta(days=dias - 1)).isoformat()
+    resultados = {}
+
+    resultados["carregar_ops_intervalo_frio"] = medir(
+        lambda: carregar_ops_intervalo(data_inicio, data_fim), repeticoes, preparar=invalidar_cache_ops)
+    resultados["carregar_ops_intervalo_quente"] = medir(
+        lambda: carregar_ops_intervalo(data_inicio, data_fim), repeticoes)
+    resultados["carregar_ops_filtro_sql_frio"] = medir(
+        lambda: carregar_ops_intervalo(data_inicio, data_fim, subespecie="SUBESPECIE 001"), repeticoes,
+        preparar=invalidar_cache_ops)
+    cod_op = ops[len(ops) // 2]["CODIGO_OP"]
+    resultados["carregar_op_frio"] = medir(lambda: carregar_op(cod_op), repeticoes, preparar=invalidar_cache_ops)
+
+    df_erp = _obter_particoes().carregar(["linha", "sob_encomenda"], date.fromisoformat(data_inicio),
+                                         date.fromisoformat(data_fim), executar=executar_em_paralelo)
+    resultados["indice_registros_recarga"] = medir(lambda: IndiceRegistros(caminho_csv).somas_por_op(), repeticoes,
+                                                   operacoes=n_leituras)
+    resultados["enriquecimento_registros"] = medir(lambda: _enriquecer_registros(df_erp.copy()), repeticoes)
+
+    df = _enriquecer_registros(df_erp.copy())
+    resultados["classificar_status"] = medir(lambda: classificar_status(df), repeticoes, operacoes=len(df))
+    df["STATUS"] = classificar_status(df)
+    resultados["ordenar_paginar"] = medir(lambda: paginar_ops(ordenar_ops(df.copy()), 100), repeticoes)
+
+    resultados["api_ops_registros"] = medir(
+        lambda: json.dumps(jsonable_encoder(_montar_ops(df.copy(), 0, "", "registros"))), repeticoes)
+    resultados["api_ops_colunar"] = medir(lambda: _montar_ops(df.copy(), 0, "", "colunar"), repeticoes)
+    resultados["api_ops_colunar_pagina"] = medir(lambda: _montar_ops(df.copy(), 100, "", "colunar"), repeticoes)
+
+    aleatorio = random.Random(7)
+    linhas = [linha_leitura(aleatorio.choice(ops), aleatorio, datetime.now()) for _ in range(100)]
+
+    diario = DiarioRegistros(os.path.join(pasta, "append.csv"))
+    resultados["leitura_csv_unitaria"] = medir(lambda: [diario.registrar(l) for l in linhas], repeticoes,
+                                               operacoes=len(linhas))
+    resultados["leitura_csv_lote"] = medir(lambda: diario.registrar_lote(linhas, True), repeticoes,
+                                           operacoes=len(linhas))
+    diario.fechar()
+
+    sqlite = ArmazemSQLite(os.path.join(pasta, "append.db"))
+    resultados["leitura_sqlite_unitaria"] = medir(lambda: [sqlite.registrar(l) for l in linhas], repeticoes,
+                                                  operacoes=len(linhas))
+    resultados["leitura_sqlite_lote"] = medir(lambda: sqlite.registrar_lote(linhas, True), repeticoes,
+                                              operacoes=len(linhas))
+    resultados["soma_sqlite_por_op"] = medir(lambda: [sqlite.qtd_registrada(op["CODIGO_OP"]) for op in ops[:1000]],
+                                             repeticoes, operacoes=min(1000, len(ops)))
+    sqlite.fechar()
+
+    # Partida a frio de um worker: processo novo importando a aplicação (sem pandas nem driver do ERP)
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    resultados["partida_importacao_app"] = medir(
+        lambda: subprocess.run([sys.executable, "-c", "import src.main_web"], cwd=raiz, check=True,
+                               env={**os.environ, "LOG_NIVEL": "DESLIGADO"}),
+        repeticoes)
+
+    return resultados
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmarks com ERP local sintético")
+    parser.add_argument("--ops", type=int, default=5000, help="quantidade de OPs geradas")
+    parser.add_argument("--leituras", type=int, default=50000, help="quantidade de leituras no registros.csv")
+    parser.add_argument("--dias", type=int, default=60, help="dias cobertos pelas OPs")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--saida", help="arquivo JSON de resultado (padrão: bench/resultados/micro-<data>.json)")
+    args = parser.parse_args(argv)
+
+    parametros = {"ops": args.ops, "leituras": args.leituras, "dias": args.dias, "repeticoes": args.repeticoes}
+    with tempfile.TemporaryDirectory(prefix="bench-") as pasta:
+        resultados = executar(args.ops, args.leituras, args.dias, args.repeticoes, pasta)
+
+    saida = args.saida or os.path.join(PASTA_RESULTADOS, f"micro-{datetime.now():%Y%m%d-%H%M%S}.json")
+    salvar({"meta": metadados(parametros), "resultados": resultados}, saida)
+
+    for nome, r in resultados.items():
+        print(f"{nome:32s} mediana {r['mediana_ms']:10.3f} ms   min {r['min_ms']:10.3f} ms")
+    print(f"[OK] Resultado gravado em {saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
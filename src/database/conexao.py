@@ -1,29 +1,333 @@
 #src/database/conexao.py
-from dotenv import load_dotenv
-import os
-from firebird.driver import connect
+from contextlib import contextmanager
+import functools
+import logging
+import threading
+import time
+import weakref
 
-# Força o carregamento do .env correto a partir da raiz do projeto
-dotenv_path = os.path.join(os.path.dirname(__file__), '.', '.', '.env')
-load_dotenv(dotenv_path)
+from src.logic.configuracao import obter_configuracao
+from src.logic.log import obter_logger
+from src.logic.metricas import DURACAO_CONEXAO, PREPARACOES
 
-print("[DEBUG] DSN carregado do .env:", os.getenv("FIREBIRD_DSN"))
+log = obter_logger("conexao")
+
+
+def _conectar_firebird():
+    # O driver só é importado na primeira conexão (não pesa na partida nem com o ERP local)
+    from firebird.driver import connect
+
+    config = obter_configuracao()
+    return connect(
+        database=config.firebird_dsn,  # Aqui o nome correto é 'database'
+        user=config.firebird_user,
+        password=config.firebird_password,
+    )
 
 
 def conectar():
     try:
-        con = connect(
-            database=os.getenv("FIREBIRD_DSN"),  # Aqui o nome correto é 'database'
-            user=os.getenv("FIREBIRD_USER"),
-            password=os.getenv("FIREBIRD_PASSWORD"),
-        )
-        print("[DEBUG] Conectando ao banco:", os.getenv("FIREBIRD_DSN"))
-        print("[OK] Conectado ao banco Firebird com sucesso.")
+        con = _conectar_firebird()
+        log.debug("Conectado ao banco Firebird: %s", obter_configuracao().firebird_dsn)
         return con
     except Exception as e:
-        print("[ERRO] Falha na conexão com o Firebird:", e)
+        log.error("Falha na conexão com o Firebird: %s", e)
         return None
 
+
+class PoolEsgotado(Exception):
+    """Nenhuma conexão ficou livre dentro do tempo de espera do pool."""
+
+
+class _ConexaoPool:
+    __slots__ = ("con", "criada_em", "devolvida_em")
+
+    def __init__(self, con):
+        self.con = con
+        self.criada_em = time.monotonic()
+        self.devolvida_em = self.criada_em
+
+
+class PoolConexoes:
+    """
+    Pool limitado de conexões com o Firebird.
+
+    Mantém entre `minimo` e `maximo` conexões abertas. Antes de reutilizar uma
+    conexão ociosa há mais de `verificar_apos` segundos, faz um teste rápido
+    (`SELECT 1 FROM RDB$DATABASE`); conexões quebradas são descartadas e
+    substituídas por uma nova. Conexões ociosas além de `ocioso_max` segundos são
+    fechadas, respeitando o mínimo.
+    """
+
+    CONSULTA_SAUDE = "SELECT 1 FROM RDB$DATABASE"
+
+    def __init__(self, fabrica=None, minimo: int = 1, maximo: int = 5, ocioso_max: float = 300.0,
+                 verificar_apos: float = 30.0, timeout: float = 30.0):
+        self.fabrica = fabrica or _conectar_firebird
+        self.minimo = max(0, minimo)
+        self.maximo = max(1, maximo, self.minimo)
+        self.ocioso_max = ocioso_max
+        self.verificar_apos = verificar_apos
+        self.timeout = timeout
+        self._livres = []
+        self._em_uso = 0
+        self._cond = threading.Condition()
+        self._fechado = False
+        self._stats = {
+            "criadas": 0, "reutilizadas": 0, "descartadas": 0,
+            "expiradas": 0, "falhas_conexao": 0, "esperas": 0,
+        }
+
+    def _abrir_nova(self) -> _ConexaoPool:
+        try:
+            with DURACAO_CONEXAO.medir():
+                con = self.fabrica()
+        except Exception:
+            with self._cond:
+                self._stats["falhas_conexao"] += 1
+            raise
+        with self._cond:
+            self._stats["criadas"] += 1
+        return _ConexaoPool(con)
+
+    @staticmethod
+    def _fechar_silenciosamente(item: _ConexaoPool):
+        try:
+            item.con.close()
+        except Exception:
+            pass
+
+    def _saudavel(self, item: _ConexaoPool) -> bool:
+        con = item.con
+        esta_fechada = getattr(con, "is_closed", None)
+        if callable(esta_fechada) and esta_fechada():
+            return False
+        if time.monotonic() - item.devolvida_em < self.verificar_apos:
+            return True
+        try:
+            cur = con.cursor()
+            try:
+                cur.execute(self.CONSULTA_SAUDE)
+                cur.fetchall()
+            finally:
+                cur.close()
+            con.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _expirar_ociosas(self) -> list:
+        # Chamado com o lock: separa as conexões ociosas demais que podem ser fechadas
+        agora = time.monotonic()
+        expiradas = []
+        while len(self._livres) + self._em_uso > self.minimo and self._livres:
+            item = self._livres[0]
+            if agora - item.devolvida_em <= self.ocioso_max:
+                break
+            expiradas.append(self._livres.pop(0))
+        self._stats["expiradas"] += len(expiradas)
+        return expiradas
+
+    def _emprestar(self) -> _ConexaoPool:
+        limite = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                if self._fechado:
+                    raise RuntimeError("Pool de conexões fechado")
+                expiradas = self._expirar_ociosas()
+                item = None
+                criar = False
+                if self._livres:
+                    # LIFO: a conexão usada mais recentemente tem menos chance de ter caído
+                    item = self._livres.pop()
+                    self._em_uso += 1
+                elif self._em_uso + len(self._livres) < self.maximo:
+                    self._em_uso += 1
+                    criar = True
+                else:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        raise PoolEsgotado(f"Nenhuma conexão livre em {self.timeout:.0f}s (máximo {self.maximo})")
+                    self._stats["esperas"] += 1
+                    self._cond.wait(restante)
+                    continue
+
+            for velha in expiradas:
+                self._fechar_silenciosamente(velha)
+
+            if criar:
+                try:
+                    return self._abrir_nova()
+                except Exception:
+                    with self._cond:
+                        self._em_uso -= 1
+                        self._cond.notify()
+                    raise
+
+            if self._saudavel(item):
+                with self._cond:
+                    self._stats["reutilizadas"] += 1
+                return item
+
+            # Conexão quebrada: descarta e reconecta no lugar dela
+            self._fechar_silenciosamente(item)
+            with self._cond:
+                self._stats["descartadas"] += 1
+            try:
+                return self._abrir_nova()
+            except Exception:
+                with self._cond:
+                    self._em_uso -= 1
+                    self._cond.notify()
+                raise
+
+    def _devolver(self, item: _ConexaoPool, quebrada: bool = False):
+        if not quebrada:
+            try:
+                # Encerra a transação de leitura para a próxima consulta enxergar dados novos
+                item.con.rollback()
+            except Exception:
+                quebrada = True
+
+        with self._cond:
+            self._em_uso -= 1
+            if quebrada or self._fechado:
+                self._stats["descartadas"] += 1
+                descartar = True
+            else:
+                item.devolvida_em = time.monotonic()
+                self._livres.append(item)
+                descartar = False
+            self._cond.notify()
+
+        if descartar:
+            self._fechar_silenciosamente(item)
+
+    @contextmanager
+    def conexao(self):
+        """Empresta uma conexão do pool e a devolve ao final do bloco `with`."""
+        item = self._emprestar()
+        try:
+            yield item.con
+        except Exception:
+            # Em caso de erro, só devolve a conexão se ela ainda responder
+            item.devolvida_em = 0.0
+            self._devolver(item, quebrada=not self._saudavel(item))
+            raise
+        else:
+            self._devolver(item)
+
+    def preencher(self) -> None:
+        """Abre conexões até atingir o tamanho mínimo do pool."""
+        while True:
+            with self._cond:
+                if self._fechado or len(self._livres) + self._em_uso >= self.minimo:
+                    return
+                self._em_uso += 1
+            try:
+                item = self._abrir_nova()
+            except Exception:
+                with self._cond:
+                    self._em_uso -= 1
+                raise
+            self._devolver(item)
+
+    def estatisticas(self) -> dict:
+        with self._cond:
+            return {
+                **self._stats,
+                "livres": len(self._livres),
+                "em_uso": self._em_uso,
+                "minimo": self.minimo,
+                "maximo": self.maximo,
+            }
+
+    def fechar(self) -> None:
+        with self._cond:
+            self._fechado = True
+            livres, self._livres = self._livres, []
+            self._cond.notify_all()
+        for item in livres:
+            self._fechar_silenciosamente(item)
+
+
+# Comandos preparados de cada conexão (texto SQL -> comando), descartados junto com ela.
+# Uma conexão só é usada por uma thread de cada vez (empréstimo do pool), então o dicionário
+# de uma conexão não precisa de lock próprio.
+_preparados = weakref.WeakKeyDictionary()
+_preparados_lock = threading.Lock()
+
+
+def _comando_preparado(con, cur, sql: str, rotulo: str = ""):
+    with _preparados_lock:
+        comandos = _preparados.get(con)
+        if comandos is None:
+            comandos = _preparados[con] = {}
+    comando = comandos.get(sql)
+    if comando is None:
+        comando = comandos[sql] = cur.prepare(sql)
+        PREPARACOES.inc(consulta=rotulo)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Consulta preparada", extra={"campos": {"consulta": rotulo, "plano": comando.plan}})
+    return comando
+
+
+def executar_preparada(con, sql: str, params: list = None, rotulo: str = "") -> tuple[list, list]:
+    """
+    Executa `sql` com parâmetros ligados usando um comando preparado uma única vez por
+    conexão do pool (as próximas execuções do mesmo texto só reenviam os parâmetros).
+    Com o log em DEBUG, o plano de cada consulta é registrado ao prepará-la.
+    Retorna (nomes das colunas, linhas).
+    """
+    cur = con.cursor()
+    try:
+        cur.execute(_comando_preparado(con, cur, sql, rotulo), params or [])
+        colunas = [descricao[0] for descricao in cur.description]
+        return colunas, cur.fetchall()
+    finally:
+        cur.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obter_pool() -> PoolConexoes:
+    """
+    Retorna o pool compartilhado do Firebird, configurado pelas variáveis FIREBIRD_POOL_* do .env.
+    Ao criá-lo, já abre as FIREBIRD_POOL_MIN conexões mínimas; se o ERP estiver fora do ar, o
+    pool é criado mesmo assim e as conexões são abertas sob demanda.
+    """
+    global _pool
+    criado = False
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = obter_configuracao()
+                fabrica = None
+                erp_local = config.erp_local_path
+                if erp_local:
+                    # Banco SQLite com o esquema do ERP (benchmarks e testes de carga)
+                    from src.database.erp_local import conectar as conectar_local
+                    log.warning("Usando o ERP local %s em vez do Firebird", erp_local)
+                    fabrica = functools.partial(conectar_local, erp_local)
+                _pool = PoolConexoes(
+                    fabrica=fabrica,
+                    minimo=config.firebird_pool_min,
+                    maximo=config.firebird_pool_max,
+                    ocioso_max=config.firebird_pool_ocioso_max,
+                    verificar_apos=config.firebird_pool_verificar_apos,
+                    timeout=config.firebird_pool_timeout,
+                )
+                criado = True
+    if criado:
+        # Fora do lock: quem chegar enquanto isso já pode usar o pool
+        try:
+            _pool.preencher()
+        except Exception as e:
+            log.warning("Não foi possível abrir as conexões mínimas do pool: %s", e)
+    return _pool
+
 #Temporariamente desativado para evitar erro de conexão com o novo banco
 #Verificar possibilidade de usar novo modelo de database compatível, como MySql, SQLite ou PostgreSQL
 
@@ -0,0 +1,124 @@
+#src/database/erp_local.py
+"""
+Substituto local (SQLite) do ERP Firebird, com as tabelas usadas pelas consultas de
+OPs. Serve para benchmarks e testes de carga sem o banco de produção: com
+ERP_LOCAL_PATH definido no .env, o pool de conexões abre este banco em vez do Firebird.
+"""
+import re
+import sqlite3
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS "RDB$DATABASE" (RDB$RELATION_ID INTEGER);
+
+CREATE TABLE IF NOT EXISTS especie (id_especie INTEGER PRIMARY KEY, nome VARCHAR(100));
+CREATE TABLE IF NOT EXISTS sub_especie (id_sub_especie INTEGER PRIMARY KEY, nome VARCHAR(100));
+CREATE TABLE IF NOT EXISTS produto (
+    id_produto INTEGER PRIMARY KEY, nome VARCHAR(200), id_especie INTEGER, id_sub_especie INTEGER
+);
+CREATE TABLE IF NOT EXISTS produto_grade (id_produto_grade INTEGER PRIMARY KEY, id_produto INTEGER);
+CREATE TABLE IF NOT EXISTS grade_cor (id_grade_cor INTEGER PRIMARY KEY, id_produto_grade INTEGER);
+CREATE TABLE IF NOT EXISTS periodo_producao (id_periodo_producao INTEGER PRIMARY KEY, descricao VARCHAR(50));
+CREATE TABLE IF NOT EXISTS codigo_barras (
+    id_codigo_barras INTEGER PRIMARY KEY, id_produto INTEGER, codigo_barras VARCHAR(50)
+);
+
+CREATE TABLE IF NOT EXISTS os_producao_linha_prod (
+    id_os_producao_linha_prod INTEGER PRIMARY KEY,
+    codigo INTEGER,
+    data_prev_inicio TIMESTAMP,
+    quantidade_ref_prev_prod INTEGER,
+    id_grade_cor INTEGER,
+    id_periodo_producao INTEGER
+);
+CREATE TABLE IF NOT EXISTS os_producao_sob_enc (
+    id_os_sob_enc INTEGER PRIMARY KEY,
+    codigo INTEGER,
+    data_prev_inicio TIMESTAMP,
+    quantidade_prev_prod INTEGER,
+    id_grade_cor INTEGER,
+    id_periodo_producao INTEGER
+);
+CREATE TABLE IF NOT EXISTS subdivisao_os_prod_linha_prod (
+    id_subdivisao INTEGER PRIMARY KEY, id_ordem_serv_prod_linha INTEGER, codigo_barras VARCHAR(50)
+);
+CREATE TABLE IF NOT EXISTS subdivisao_os_prod_sob_enc (
+    id_subdivisao INTEGER PRIMARY KEY, id_os_prod_sob_enc INTEGER, codigo_barras VARCHAR(50)
+);
+
+CREATE INDEX IF NOT EXISTS idx_oplp_codigo ON os_producao_linha_prod (codigo);
+CREATE INDEX IF NOT EXISTS idx_oplp_data ON os_producao_linha_prod (data_prev_inicio);
+CREATE INDEX IF NOT EXISTS idx_opse_codigo ON os_producao_sob_enc (codigo);
+CREATE INDEX IF NOT EXISTS idx_opse_data ON os_producao_sob_enc (data_prev_inicio);
+CREATE INDEX IF NOT EXISTS idx_cb_produto ON codigo_barras (id_produto);
+CREATE INDEX IF NOT EXISTS idx_sub_lp ON subdivisao_os_prod_linha_prod (id_ordem_serv_prod_linha);
+CREATE INDEX IF NOT EXISTS idx_sub_se ON subdivisao_os_prod_sob_enc (id_os_prod_sob_enc);
+"""
+
+# Construções do dialeto Firebird usadas nas consultas -> equivalentes no SQLite
+_TRADUCOES = (
+    (re.compile(r"LIST\(\s*DISTINCT\s+([^,()]+?)\s*,\s*','\s*\)", re.IGNORECASE), r"GROUP_CONCAT(DISTINCT \1)"),
+    (re.compile(r"LIST\(\s*([^,()]+?)\s*,\s*'([^']*)'\s*\)", re.IGNORECASE), r"GROUP_CONCAT(\1, '\2')"),
+    (re.compile(r"CAST\(\s*([^()]+?)\s+AS\s+DATE\s*\)", re.IGNORECASE), r"DATE(\1)"),
+    (re.compile(r"\bROWS\s+(\?|\d+)\s*$", re.IGNORECASE), r"LIMIT \1"),
+)
+
+
+def traduzir_sql(sql: str) -> str:
+    for padrao, substituto in _TRADUCOES:
+        sql = padrao.sub(substituto, sql)
+    return sql
+
+
+class _ComandoLocal:
+    """
+    Equivalente local do comando preparado do Firebird: guarda o SQL já traduzido; a
+    compilação fica no cache de comandos do próprio sqlite3 (por texto SQL).
+    """
+
+    def __init__(self, con, sql: str):
+        self._con = con
+        self.sql = traduzir_sql(sql)
+
+    @property
+    def plan(self) -> str:
+        parametros = [None] * self.sql.count("?")
+        linhas = sqlite3.Connection.execute(self._con, "EXPLAIN QUERY PLAN " + self.sql, parametros).fetchall()
+        return "; ".join(str(linha[-1]) for linha in linhas)
+
+
+class _CursorLocal(sqlite3.Cursor):
+    def prepare(self, sql) -> _ComandoLocal:
+        return _ComandoLocal(self.connection, sql)
+
+    def execute(self, sql, parametros=()):
+        if isinstance(sql, _ComandoLocal):
+            return super().execute(sql.sql, parametros)
+        return super().execute(traduzir_sql(sql), parametros)
+
+    def executemany(self, sql, sequencia):
+        return super().executemany(traduzir_sql(sql), sequencia)
+
+
+class _ConexaoLocal(sqlite3.Connection):
+    def cursor(self, factory=_CursorLocal):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+
+def criar_esquema(caminho: str) -> None:
+    con = sqlite3.connect(caminho)
+    try:
+        con.executescript(ESQUEMA)
+        if con.execute('SELECT COUNT(*) FROM "RDB$DATABASE"').fetchone()[0] == 0:
+            con.execute('INSERT INTO "RDB$DATABASE" VALUES (1)')
+        con.commit()
+    finally:
+        con.close()
+
+
+def conectar(caminho: str) -> sqlite3.Connection:
+    """Conexão com o ERP local; aceita o SQL do Firebird usado em consulta_ops."""
+    return sqlite3.connect(caminho, factory=_ConexaoLocal, detect_types=sqlite3.PARSE_DECLTYPES,
+                           check_same_thread=False)
@@ -0,0 +1,237 @@
+#src/database/leituras_sqlite.py
+import os
+import pathlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from src.logic.armazem_leituras import ArmazemLeituras, _Ouvintes
+from src.logic.diario_registros import COLUNAS_REGISTROS
+from src.logic.indice_registros import _converter_qtd
+
+# Leituras (colunas do registros.csv) e somas por OP/produto mantidas por trigger na mesma transação
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS LEITURA_PRODUTO (
+    ID_LEITURA INTEGER PRIMARY KEY,
+    DATA TEXT NOT NULL,
+    COD_OP TEXT NOT NULL,
+    CODIGO_BARRAS TEXT,
+    ID_PRODUTO TEXT,
+    NOME_PRODUTO TEXT,
+    ESPECIE TEXT,
+    SUB_ESPECIE TEXT,
+    QTD INTEGER NOT NULL DEFAULT 1,
+    USUARIO TEXT
+);
+CREATE INDEX IF NOT EXISTS IDX_LEITURA_OP ON LEITURA_PRODUTO (COD_OP, ID_PRODUTO);
+CREATE INDEX IF NOT EXISTS IDX_LEITURA_DATA ON LEITURA_PRODUTO (DATA);
+
+CREATE TABLE IF NOT EXISTS SOMA_LEITURAS (
+    COD_OP TEXT NOT NULL,
+    ID_PRODUTO TEXT NOT NULL,
+    QTD INTEGER NOT NULL,
+    PRIMARY KEY (COD_OP, ID_PRODUTO)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS TRG_SOMA_LEITURAS AFTER INSERT ON LEITURA_PRODUTO
+BEGIN
+    INSERT INTO SOMA_LEITURAS (COD_OP, ID_PRODUTO, QTD)
+    VALUES (NEW.COD_OP, COALESCE(NEW.ID_PRODUTO, ''), NEW.QTD)
+    ON CONFLICT (COD_OP, ID_PRODUTO) DO UPDATE SET QTD = QTD + excluded.QTD;
+END;
+"""
+
+_INSERIR = (
+    f"INSERT INTO LEITURA_PRODUTO ({', '.join(COLUNAS_REGISTROS)}) "
+    f"VALUES ({', '.join('?' for _ in COLUNAS_REGISTROS)})"
+)
+
+
+def _valores(linha: dict) -> tuple:
+    valores = []
+    for coluna in COLUNAS_REGISTROS:
+        valor = linha.get(coluna, "")
+        if coluna == "QTD":
+            valor = _converter_qtd(valor)
+        elif coluna in ("COD_OP", "ID_PRODUTO"):
+            valor = str(valor if valor is not None else "").strip()
+        valores.append(valor)
+    return tuple(valores)
+
+
+class ArmazemSQLite(ArmazemLeituras):
+    """
+    Leituras num SQLite em modo WAL: gravações de vários processos (web e leitor de
+    mesa) convivem, leitores não bloqueiam o escritor e as quantidades por OP são
+    buscas no índice da tabela SOMA_LEITURAS, sem varrer as leituras.
+
+    Cada thread usa a sua conexão; as gravações deste processo são serializadas e cada
+    lote é uma única transação. Com synchronous=NORMAL o fsync acontece nos checkpoints
+    do WAL; `sincronizar` força o checkpoint (equivale ao fsync imediato do diário CSV).
+    Em reservar_escrita, leituras e gravações da thread ficam numa única transação
+    BEGIN IMMEDIATE, que bloqueia os escritores dos outros processos até o COMMIT.
+    """
+
+    def __init__(self, caminho: str, timeout: float = 30.0):
+        self.caminho = os.path.abspath(caminho)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock_escrita = threading.RLock()
+        self._conexoes = []
+        self._conexoes_lock = threading.Lock()
+        self._ouvintes = _Ouvintes()
+        self._ouvintes_externos = _Ouvintes()
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        self._conexao().executescript(ESQUEMA)
+        # Acompanhamento das gravações de outros processos: última leitura vista e as
+        # faixas de ID_LEITURA gravadas por este processo (que não são avisadas de novo)
+        self._lock_acompanhar = threading.Lock()
+        self._vista = self._ultimo_id()
+        self._proprias = []
+
+    def _conexao(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.caminho, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+            with self._conexoes_lock:
+                self._conexoes.append(con)
+        return con
+
+    def registrar_lote(self, linhas: list[dict], sincronizar: bool = False) -> None:
+        if not linhas:
+            return
+        valores = [_valores(linha) for linha in linhas]
+        with self._lock_escrita:
+            con = self._conexao()
+            reserva = getattr(self._local, "reserva", None)
+            if reserva is None:
+                con.execute("BEGIN IMMEDIATE")
+            # Com a escrita reservada, os IDs deste lote são os seguintes ao maior atual
+            primeiro = self._ultimo_id() + 1
+            faixa = (primeiro, primeiro + len(valores) - 1)
+            self._proprias.append(faixa)
+            if reserva is not None:
+                # Dentro de reservar_escrita: COMMIT, checkpoint e avisos ficam para o fim da reserva
+                reserva.append((faixa, linhas, sincronizar))
+                con.executemany(_INSERIR, valores)
+                return
+            try:
+                con.executemany(_INSERIR, valores)
+                con.execute("COMMIT")
+            except BaseException:
+                con.execute("ROLLBACK")
+                self._proprias.remove(faixa)
+                raise
+            if sincronizar:
+                con.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            self._ouvintes.notificar(linhas)
+
+    @contextmanager
+    def reservar_escrita(self):
+        with self._lock_escrita:
+            if getattr(self._local, "reserva", None) is not None:
+                yield
+                return
+            con = self._conexao()
+            con.execute("BEGIN IMMEDIATE")
+            reserva = self._local.reserva = []
+            try:
+                yield
+                con.execute("COMMIT")
+            except BaseException:
+                con.execute("ROLLBACK")
+                for faixa, _, _ in reserva:
+                    self._proprias.remove(faixa)
+                raise
+            finally:
+                self._local.reserva = None
+            if any(sincronizar for _, _, sincronizar in reserva):
+                con.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            for _, linhas, _ in reserva:
+                self._ouvintes.notificar(linhas)
+
+    def ao_gravar(self, ouvinte) -> None:
+        self._ouvintes.adicionar(ouvinte)
+
+    def ao_gravar_externo(self, ouvinte) -> None:
+        self._ouvintes_externos.adicionar(ouvinte)
+
+    def _ultimo_id(self) -> int:
+        return self._conexao().execute("SELECT COALESCE(MAX(ID_LEITURA), 0) FROM LEITURA_PRODUTO").fetchone()[0]
+
+    def acompanhar(self) -> int:
+        with self._lock_acompanhar:
+            cursor = self._conexao().execute(
+                f"SELECT ID_LEITURA, {', '.join(COLUNAS_REGISTROS)} FROM LEITURA_PRODUTO "
+                f"WHERE ID_LEITURA > ? ORDER BY ID_LEITURA", (self._vista,))
+            proprias = list(self._proprias)
+            externas = []
+            for id_leitura, *valores in cursor:
+                if not any(inicio <= id_leitura <= fim for inicio, fim in proprias):
+                    externas.append(dict(zip(COLUNAS_REGISTROS, valores)))
+                self._vista = id_leitura
+            with self._lock_escrita:
+                self._proprias[:] = [faixa for faixa in self._proprias if faixa[1] > self._vista]
+        if externas:
+            self._ouvintes_externos.notificar(externas)
+        return len(externas)
+
+    def somas_por_op(self) -> dict:
+        cursor = self._conexao().execute("SELECT COD_OP, SUM(QTD) FROM SOMA_LEITURAS GROUP BY COD_OP")
+        return dict(cursor.fetchall())
+
+    def somas_por_op_produto(self) -> dict:
+        cursor = self._conexao().execute("SELECT COD_OP, ID_PRODUTO, QTD FROM SOMA_LEITURAS")
+        return {(cod_op, id_produto): qtd for cod_op, id_produto, qtd in cursor}
+
+    def qtd_registrada(self, cod_op, id_produto=None) -> int:
+        cod_op = str(cod_op).strip()
+        if id_produto is None:
+            linha = self._conexao().execute(
+                "SELECT SUM(QTD) FROM SOMA_LEITURAS WHERE COD_OP = ?", (cod_op,)).fetchone()
+        else:
+            linha = self._conexao().execute(
+                "SELECT QTD FROM SOMA_LEITURAS WHERE COD_OP = ? AND ID_PRODUTO = ?",
+                (cod_op, str(id_produto).strip())).fetchone()
+        return int(linha[0] or 0) if linha else 0
+
+    def iterar_leituras(self, inicio: str = None, fim: str = None, lote: int = 1000):
+        filtros, params = [], []
+        if inicio:
+            filtros.append("DATA >= ?")
+            params.append(inicio)
+        if fim:
+            filtros.append("DATA < ?")
+            params.append(fim)
+        sql = f"SELECT {', '.join(COLUNAS_REGISTROS)} FROM LEITURA_PRODUTO"
+        if filtros:
+            sql += " WHERE " + " AND ".join(filtros)
+        sql += " ORDER BY DATA, ID_LEITURA"
+        # Conexão própria, só de leitura: o WAL entrega um retrato consistente sem travar as gravações
+        con = sqlite3.connect(pathlib.Path(self.caminho).as_uri() + "?mode=ro", uri=True, timeout=self.timeout,
+                              check_same_thread=False)
+        try:
+            cursor = con.execute(sql, params)
+            while True:
+                linhas = cursor.fetchmany(lote)
+                if not linhas:
+                    return
+                yield [dict(zip(COLUNAS_REGISTROS, linha)) for linha in linhas]
+        finally:
+            con.close()
+
+    def total_leituras(self) -> int:
+        return self._conexao().execute("SELECT COUNT(*) FROM LEITURA_PRODUTO").fetchone()[0]
+
+    def fechar(self) -> None:
+        with self._conexoes_lock:
+            conexoes, self._conexoes = self._conexoes, []
+        for con in conexoes:
+            try:
+                con.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
@@ -0,0 +1,90 @@
+#src/database/migrar_registros.py
+"""
+Migração única do registros.csv para o armazenamento SQLite.
+
+Uso:
+    python -m src.database.migrar_registros [--csv CAMINHO] [--particoes PASTA] [--db CAMINHO] [--forcar]
+
+Copia as partições mensais fechadas (mais antigas primeiro) e depois o registros.csv.
+Aceita também os nomes de coluna antigos do leitor de mesa (COD_BARRAS, DATA_REGISTRO).
+Linhas com colunas faltando (gravação interrompida) são ignoradas e contadas.
+Não faz nada se o banco já tiver leituras, a não ser com --forcar.
+"""
+import argparse
+import csv
+import os
+import sys
+
+from src.database.leituras_sqlite import ArmazemSQLite
+from src.logic.armazem_leituras import REGISTROS_DB_PATH
+from src.logic.configuracao import obter_configuracao
+from src.logic.diario_registros import REGISTROS_CSV_PATH, recuperar_linha_parcial
+from src.logic.particoes_registros import ParticoesRegistros, pasta_particoes
+
+# Nomes antigos de coluna -> layout atual
+COLUNAS_LEGADAS = {"COD_BARRAS": "CODIGO_BARRAS", "DATA_REGISTRO": "DATA"}
+
+TAMANHO_LOTE = 5000
+
+
+def _ler_csv(caminho: str):
+    with open(caminho, "r", encoding="utf-8-sig", newline="") as arq:
+        leitor = csv.DictReader(arq)
+        leitor.fieldnames = [COLUNAS_LEGADAS.get(c.strip(), c.strip()) for c in (leitor.fieldnames or [])]
+        for linha in leitor:
+            yield linha
+
+
+def migrar(caminho_csv: str = REGISTROS_CSV_PATH, caminho_db: str = REGISTROS_DB_PATH, forcar: bool = False,
+           pasta: str = None) -> int:
+    """Copia as leituras do CSV (e das partições em `pasta`) para o SQLite; retorna quantas foram copiadas."""
+    if not os.path.exists(caminho_csv):
+        print(f"[ERRO] Arquivo não encontrado: {caminho_csv}")
+        return 0
+
+    armazem = ArmazemSQLite(caminho_db)
+    try:
+        existentes = armazem.total_leituras()
+        if existentes and not forcar:
+            print(f"[AVISO] {caminho_db} já tem {existentes} leituras; use --forcar para migrar mesmo assim")
+            return 0
+
+        recuperar_linha_parcial(caminho_csv)
+        particoes = ParticoesRegistros(pasta or pasta_particoes())
+        arquivos = [particoes.caminho_particao(mes) for mes in particoes.meses()] + [caminho_csv]
+        total, ignoradas, lote = 0, 0, []
+        for caminho in arquivos:
+            for linha in _ler_csv(caminho):
+                if None in linha.values():
+                    # Mesma regra da leitura do registros.csv: linha curta não é uma leitura completa
+                    ignoradas += 1
+                    continue
+                lote.append(linha)
+                if len(lote) >= TAMANHO_LOTE:
+                    armazem.registrar_lote(lote)
+                    total += len(lote)
+                    lote = []
+        armazem.registrar_lote(lote, sincronizar=True)
+        total += len(lote)
+
+        if ignoradas:
+            print(f"[AVISO] {ignoradas} linhas incompletas ignoradas")
+        print(f"[OK] {total} leituras migradas de {caminho_csv} para {caminho_db}")
+        return total
+    finally:
+        armazem.fechar()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Migra o registros.csv para o armazenamento SQLite")
+    parser.add_argument("--csv", default=REGISTROS_CSV_PATH, help="registros.csv de origem")
+    parser.add_argument("--particoes", default=None, help="pasta das partições mensais (padrão: a da configuração)")
+    parser.add_argument("--db", default=obter_configuracao().armazem_sqlite_path or REGISTROS_DB_PATH, help="banco SQLite de destino")
+    parser.add_argument("--forcar", action="store_true", help="migra mesmo que o banco já tenha leituras")
+    args = parser.parse_args(argv)
+    migrar(args.csv, args.db, args.forcar, args.particoes)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
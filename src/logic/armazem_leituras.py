@@ -0,0 +1,215 @@
+#src/logic/armazem_leituras.py
+import atexit
+import csv
+import os
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from src.logic.configuracao import obter_configuracao
+from src.logic.diario_registros import obter_diario
+from src.logic.indice_registros import obter_indice
+from src.logic.log import obter_logger
+
+log = obter_logger("armazem_leituras")
+
+# Arquivo padrão do armazenamento SQLite (ARMAZEM_LEITURAS=sqlite)
+REGISTROS_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "files", "registros.db")
+
+
+class ArmazemLeituras(ABC):
+    """
+    Interface do armazenamento das leituras (uma linha por leitura, colunas de
+    COLUNAS_REGISTROS) e das quantidades registradas por OP. Um backend que não
+    implementa todos os métodos abstratos falha já ao ser instanciado.
+    """
+
+    def registrar(self, linha: dict) -> None:
+        self.registrar_lote([linha])
+
+    @abstractmethod
+    def registrar_lote(self, linhas: list[dict], sincronizar: bool = False) -> None:
+        """Grava várias leituras de uma vez; com `sincronizar`, só retorna depois de duráveis."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def reservar_escrita(self):
+        """
+        Contexto em que só a thread atual grava, em todos os processos: as quantidades lidas
+        dentro dele continuam valendo até a gravação (escolha da OP pelo saldo + registro).
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def ao_gravar(self, ouvinte) -> None:
+        """Registra `ouvinte(linhas)`, chamado depois de cada gravação deste processo (na ordem de registro)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def ao_gravar_externo(self, ouvinte) -> None:
+        """Registra `ouvinte(linhas)`, chamado com as leituras gravadas por outros processos (workers)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def acompanhar(self) -> int:
+        """Procura gravações de outros processos e avisa os ouvintes de ao_gravar_externo; retorna quantas achou."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def somas_por_op(self) -> dict:
+        """Mapa COD_OP -> QTD_REGISTRADA."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def somas_por_op_produto(self) -> dict:
+        """Mapa (COD_OP, ID_PRODUTO) -> QTD_REGISTRADA."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def qtd_registrada(self, cod_op, id_produto=None) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def iterar_leituras(self, inicio: str = None, fim: str = None, lote: int = 1000):
+        """
+        Leituras com DATA em [inicio, fim) ("AAAA-MM-DD HH:MM:SS"; None = sem limite), em
+        blocos de até `lote` dicts, lidas aos poucos do armazenamento.
+        """
+        raise NotImplementedError
+
+    def rotacionar(self) -> int:
+        """Manutenção periódica do histórico (partições mensais); retorna as leituras movidas."""
+        return 0
+
+    def fechar(self) -> None:
+        pass
+
+
+class _Ouvintes:
+    """Lista de ouvintes sem repetição, chamados em ordem e isolados uns dos outros."""
+
+    def __init__(self):
+        self._ouvintes = []
+
+    def adicionar(self, ouvinte) -> None:
+        if ouvinte not in self._ouvintes:
+            self._ouvintes.append(ouvinte)
+
+    def notificar(self, linhas: list[dict]) -> None:
+        for ouvinte in self._ouvintes:
+            try:
+                ouvinte(linhas)
+            except Exception as e:
+                log.error("Falha ao notificar gravação de leituras: %s", e)
+
+
+def _ler_leituras(caminho: str):
+    if not os.path.exists(caminho):
+        return
+    with open(caminho, "r", encoding="utf-8", newline="") as arq:
+        leitor = csv.DictReader(arq)
+        leitor.fieldnames = [c.strip() for c in (leitor.fieldnames or [])]
+        ultima = leitor.fieldnames[-1] if leitor.fieldnames else None
+        for linha in leitor:
+            # Linha sendo anexada neste instante chega incompleta (sem a última coluna)
+            if linha.get(ultima) is not None:
+                yield linha
+
+
+class ArmazemCSV(ArmazemLeituras):
+    """
+    Leituras no registros.csv (DiarioRegistros) com as somas no IndiceRegistros em memória;
+    os meses fechados ficam nas partições mensais (ParticoesRegistros).
+    """
+
+    def __init__(self, diario=None, indice=None):
+        self.diario = diario or obter_diario()
+        self.indice = indice or obter_indice()  # já ligado ao diário: soma cada gravação sob o lock dele
+        self.particoes = self.indice.particoes
+        self._ouvintes = _Ouvintes()
+
+    def registrar_lote(self, linhas: list[dict], sincronizar: bool = False) -> None:
+        self.diario.registrar_lote(linhas, sincronizar)
+        # Fora dos locks do diário: os ouvintes (SSE) consultam o índice, que pode precisar da trava.
+        # As leituras de outros workers achadas nesta gravação vieram antes dela
+        self.indice.avisar_pendentes()
+        self._ouvintes.notificar(linhas)
+
+    def reservar_escrita(self):
+        # A trava do diário é reentrante: registrar dentro do contexto não espera por ela
+        return self.diario.trava
+
+    def ao_gravar(self, ouvinte) -> None:
+        self._ouvintes.adicionar(ouvinte)
+
+    def ao_gravar_externo(self, ouvinte) -> None:
+        self.indice.ao_ler_externas(ouvinte)
+
+    def acompanhar(self) -> int:
+        return self.indice.acompanhar()
+
+    def somas_por_op(self) -> dict:
+        return self.indice.somas_por_op()
+
+    def somas_por_op_produto(self) -> dict:
+        return self.indice.somas_por_op_produto()
+
+    def qtd_registrada(self, cod_op, id_produto=None) -> int:
+        return self.indice.qtd_registrada(cod_op, id_produto)
+
+    def rotacionar(self) -> int:
+        # Só confere o arquivo aberto quando o mês virou desde a última rotação
+        if self.particoes.mes_rotacionado == datetime.now().strftime("%Y-%m"):
+            return 0
+        return self.diario.reescrever(self.particoes.rotacionar)
+
+    def iterar_leituras(self, inicio: str = None, fim: str = None, lote: int = 1000):
+        # Partições fora do período nem são abertas
+        arquivos = [
+            self.particoes.caminho_particao(mes) for mes in self.particoes.meses()
+            if (not inicio or mes >= inicio[:7]) and (not fim or mes <= fim[:7])
+        ]
+        bloco = []
+        for caminho in arquivos + [self.diario.caminho]:
+            for linha in _ler_leituras(caminho):
+                data = linha.get("DATA") or ""
+                if (inicio and data < inicio) or (fim and data >= fim):
+                    continue
+                bloco.append(linha)
+                if len(bloco) >= lote:
+                    yield bloco
+                    bloco = []
+        if bloco:
+            yield bloco
+
+    def fechar(self) -> None:
+        self.diario.fechar()
+
+
+_armazem = None
+_armazem_lock = threading.Lock()
+
+
+def obter_armazem() -> ArmazemLeituras:
+    """
+    Armazenamento de leituras configurado em ARMAZEM_LEITURAS: "csv" (padrão, registros.csv)
+    ou "sqlite" (banco embutido em modo WAL, caminho em ARMAZEM_SQLITE_PATH).
+    """
+    global _armazem
+    if _armazem is None:
+        with _armazem_lock:
+            if _armazem is None:
+                config = obter_configuracao()
+                tipo = config.armazem_leituras.strip().lower()
+                if tipo == "sqlite":
+                    from src.database.leituras_sqlite import ArmazemSQLite
+                    armazem = ArmazemSQLite(config.armazem_sqlite_path or REGISTROS_DB_PATH)
+                    atexit.register(armazem.fechar)
+                elif tipo == "csv":
+                    armazem = ArmazemCSV()
+                else:
+                    raise ValueError(f"ARMAZEM_LEITURAS inválido: {tipo}")
+                log.info("Armazenamento de leituras: %s", tipo)
+                _armazem = armazem
+    return _armazem
+
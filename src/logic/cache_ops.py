@@ -0,0 +1,337 @@
+#src/logic/cache_ops.py
+import functools
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import date, timedelta
+from typing import TYPE_CHECKING
+
+from src.logic.configuracao import obter_configuracao
+
+if TYPE_CHECKING:  # pandas só é importado quando há DataFrames para montar
+    import pandas as pd
+
+
+def tamanho_estimado(valor) -> int:
+    """Estimativa em bytes usada para limitar a memória do cache."""
+    memory_usage = getattr(valor, "memory_usage", None)
+    if callable(memory_usage):
+        try:
+            return int(memory_usage(index=True, deep=True).sum())
+        except TypeError:
+            pass
+    return sys.getsizeof(valor)
+
+
+class CacheTTL:
+    """
+    Cache em memória com expiração (TTL), descarte LRU e limite de memória.
+
+    Chamadas simultâneas de `obter` para a mesma chave ausente executam a função de
+    carga uma única vez; as demais esperam e recebem o mesmo resultado (single-flight).
+    Erros na carga não são guardados.
+    """
+
+    def __init__(self, max_entradas: int = 64, max_bytes: int = 256 * 1024 * 1024, ttl: float = 60.0,
+                 medir=tamanho_estimado):
+        self.max_entradas = max(1, max_entradas)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.medir = medir
+        self._lock = threading.Lock()
+        self._dados = OrderedDict()  # chave -> (valor, expira_em, tamanho)
+        self._em_andamento = {}      # chave -> Future da carga em curso
+        self._geracao = 0
+        self._bytes = 0
+        self._stats = {"acertos": 0, "faltas": 0, "agrupadas": 0, "descartes": 0, "expiradas": 0}
+
+    def _remover(self, chave):
+        _, _, tamanho = self._dados.pop(chave)
+        self._bytes -= tamanho
+
+    def _guardar(self, chave, valor, ttl: float):
+        tamanho = self.medir(valor)
+        if self.max_bytes and tamanho > self.max_bytes:
+            return
+        if chave in self._dados:
+            self._remover(chave)
+        self._dados[chave] = (valor, time.monotonic() + ttl, tamanho)
+        self._bytes += tamanho
+        while len(self._dados) > self.max_entradas or (self.max_bytes and self._bytes > self.max_bytes):
+            mais_antiga = next(iter(self._dados))
+            self._remover(mais_antiga)
+            self._stats["descartes"] += 1
+
+    @property
+    def geracao(self) -> int:
+        """Contador de invalidações; lido antes de uma carga feita fora de `obter`."""
+        with self._lock:
+            return self._geracao
+
+    def guardar(self, chave, valor, ttl: float = None, geracao: int = None) -> bool:
+        """
+        Guarda um valor produzido fora de `obter` (ex.: as partições de uma faixa de dias).
+        Com `geracao` (lida antes da carga), não guarda nada se houve invalidação no meio.
+        """
+        with self._lock:
+            if geracao is not None and geracao != self._geracao:
+                return False
+            self._guardar(chave, valor, self.ttl if ttl is None else ttl)
+            return True
+
+    def consultar(self, chave):
+        """Retorna o valor em cache (ou None), sem disparar carga."""
+        with self._lock:
+            entrada = self._dados.get(chave)
+            if entrada is not None and entrada[1] <= time.monotonic():
+                self._remover(chave)
+                self._stats["expiradas"] += 1
+                entrada = None
+            if entrada is None:
+                self._stats["faltas"] += 1
+                return None
+            self._dados.move_to_end(chave)
+            self._stats["acertos"] += 1
+            return entrada[0]
+
+    def obter(self, chave, carregar, ttl: float = None):
+        """Retorna o valor da chave, chamando `carregar()` se estiver ausente ou expirado."""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            entrada = self._dados.get(chave)
+            if entrada is not None:
+                if entrada[1] > time.monotonic():
+                    self._dados.move_to_end(chave)
+                    self._stats["acertos"] += 1
+                    return entrada[0]
+                self._remover(chave)
+                self._stats["expiradas"] += 1
+
+            futuro = self._em_andamento.get(chave)
+            dono = futuro is None
+            if dono:
+                futuro = Future()
+                self._em_andamento[chave] = futuro
+                self._stats["faltas"] += 1
+                geracao = self._geracao
+            else:
+                self._stats["agrupadas"] += 1
+
+        if not dono:
+            return futuro.result()
+
+        try:
+            valor = carregar()
+        except BaseException as e:
+            with self._lock:
+                self._em_andamento.pop(chave, None)
+            futuro.set_exception(e)
+            raise
+
+        with self._lock:
+            self._em_andamento.pop(chave, None)
+            # Uma invalidação durante a carga descarta o resultado (pode estar desatualizado)
+            if geracao == self._geracao:
+                self._guardar(chave, valor, ttl)
+        futuro.set_result(valor)
+        return valor
+
+    def invalidar(self, filtro=None) -> int:
+        """
+        Remove as entradas cujas chaves satisfazem `filtro(chave)` (todas, se omitido).
+        Retorna quantas foram removidas.
+        """
+        with self._lock:
+            self._geracao += 1
+            chaves = [c for c in self._dados if filtro is None or filtro(c)]
+            for chave in chaves:
+                self._remover(chave)
+            return len(chaves)
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            consultas = self._stats["acertos"] + self._stats["faltas"] + self._stats["agrupadas"]
+            return {
+                **self._stats,
+                "entradas": len(self._dados),
+                "bytes": self._bytes,
+                "taxa_acerto": (self._stats["acertos"] + self._stats["agrupadas"]) / consultas if consultas else 0.0,
+            }
+
+
+class ParticoesDiarias:
+    """
+    Armazém de resultados do ERP particionado por dia (e por tipo de OP).
+
+    Um intervalo é atendido juntando as partições diárias em cache; só os dias
+    ausentes ou expirados são buscados, agrupados em faixas contíguas para gerar o
+    menor número de consultas. Dias passados ficam em cache por `ttl_passado`;
+    hoje e dias futuros, que ainda mudam no ERP, por `ttl_atual`.
+    """
+
+    def __init__(self, buscar, coluna_data: str, cache: CacheTTL, ttl_atual: float = 60.0, ttl_passado: float = 1800.0):
+        # buscar(tipo, dia_inicio, dia_fim) -> DataFrame com as linhas de todos os dias da faixa
+        self.buscar = buscar
+        self.coluna_data = coluna_data
+        self.cache = cache
+        self.ttl_atual = ttl_atual
+        self.ttl_passado = ttl_passado
+        self._lock = threading.Lock()
+        self._em_andamento = {}  # (tipo, inicio, fim) -> Future
+
+    def _ttl(self, dia) -> float:
+        return self.ttl_passado if dia < date.today() else self.ttl_atual
+
+    @staticmethod
+    def _faixas(dias: list) -> list:
+        faixas = []
+        for dia in dias:
+            if faixas and (dia - faixas[-1][1]).days == 1:
+                faixas[-1][1] = dia
+            else:
+                faixas.append([dia, dia])
+        return [tuple(f) for f in faixas]
+
+    def _buscar_faixa(self, tipo: str, inicio, fim):
+        chave = (tipo, inicio, fim)
+        with self._lock:
+            futuro = self._em_andamento.get(chave)
+            dono = futuro is None
+            if dono:
+                futuro = Future()
+                self._em_andamento[chave] = futuro
+        if not dono:
+            return futuro.result()
+
+        try:
+            geracao = self.cache.geracao
+            df = self.buscar(tipo, inicio, fim)
+            particoes = {}
+            if not df.empty:
+                import pandas as pd
+                dias_df = pd.to_datetime(df[self.coluna_data]).dt.date
+                particoes = {dia: grupo for dia, grupo in df.groupby(dias_df, sort=False)}
+            dia = inicio
+            while dia <= fim:
+                # Dias sem OPs também viram partição (vazia), para não serem consultados de novo
+                particoes.setdefault(dia, df.iloc[0:0])
+                # Como em CacheTTL.obter: invalidado durante a busca, o resultado só vale para esta chamada
+                self.cache.guardar((tipo, dia), particoes[dia], self._ttl(dia), geracao)
+                dia += timedelta(days=1)
+        except BaseException as e:
+            with self._lock:
+                self._em_andamento.pop(chave, None)
+            futuro.set_exception(e)
+            raise
+
+        with self._lock:
+            self._em_andamento.pop(chave, None)
+        futuro.set_result(particoes)
+        return particoes
+
+    def carregar(self, tipos: list[str], inicio, fim, executar=None, somente_cache: bool = False) -> "pd.DataFrame":
+        """
+        Retorna as linhas de `inicio` a `fim` (datas, inclusive) para cada tipo, na
+        ordem dos tipos e dos dias. `executar(tarefas)` roda as buscas pendentes,
+        por padrão uma após a outra. Com `somente_cache`, retorna None em vez de
+        buscar quando falta algum dia.
+        """
+        dias = [inicio + timedelta(days=k) for k in range((fim - inicio).days + 1)]
+        partes = {}
+        tarefas, chaves_tarefas = [], []
+        for tipo in tipos:
+            faltando = []
+            for dia in dias:
+                particao = self.cache.consultar((tipo, dia))
+                if particao is None:
+                    faltando.append(dia)
+                else:
+                    partes[(tipo, dia)] = particao
+            for f_inicio, f_fim in self._faixas(faltando):
+                tarefas.append(functools.partial(self._buscar_faixa, tipo, f_inicio, f_fim))
+                chaves_tarefas.append(tipo)
+
+        if tarefas and somente_cache:
+            return None
+
+        resultados = executar(tarefas) if executar else [t() for t in tarefas]
+        for tipo, particoes in zip(chaves_tarefas, resultados):
+            for dia, particao in particoes.items():
+                partes[(tipo, dia)] = particao
+
+        import pandas as pd
+        blocos = [partes[(tipo, dia)] for tipo in tipos for dia in dias]
+        blocos = [b for b in blocos if not b.empty] or blocos[:1]
+        if not blocos:
+            return pd.DataFrame()
+        return pd.concat(blocos, ignore_index=True)
+
+
+_cache_ops = None
+_cache_ops_lock = threading.Lock()
+
+# Divisão do CACHE_OPS_MAX_MB entre os três caches: o limite vale para todos juntos
+PARTES_MEMORIA = {"consultas": 0.375, "dias": 0.5, "op": 0.125}
+
+
+def _max_bytes(parte: str) -> int:
+    return int(obter_configuracao().cache_ops_max_mb * PARTES_MEMORIA[parte] * 1024 * 1024)
+
+
+def obter_cache_ops() -> CacheTTL:
+    """Cache compartilhado das consultas de OPs no ERP, configurado pelas variáveis CACHE_OPS_* do .env."""
+    global _cache_ops
+    if _cache_ops is None:
+        with _cache_ops_lock:
+            if _cache_ops is None:
+                config = obter_configuracao()
+                _cache_ops = CacheTTL(
+                    max_entradas=config.cache_ops_max_entradas,
+                    max_bytes=_max_bytes("consultas"),
+                    ttl=config.cache_ops_ttl,
+                )
+    return _cache_ops
+
+
+_cache_dias = None
+
+
+def obter_cache_dias() -> CacheTTL:
+    """Cache compartilhado das partições diárias de OPs (ver ParticoesDiarias)."""
+    global _cache_dias
+    if _cache_dias is None:
+        with _cache_ops_lock:
+            if _cache_dias is None:
+                config = obter_configuracao()
+                _cache_dias = CacheTTL(
+                    max_entradas=config.cache_ops_max_dias,
+                    max_bytes=_max_bytes("dias"),
+                    ttl=config.cache_ops_ttl,
+                )
+    return _cache_dias
+
+
+_cache_op = None
+
+
+def obter_cache_op() -> CacheTTL:
+    """Cache pequeno das OPs consultadas individualmente (página de apontamento)."""
+    global _cache_op
+    if _cache_op is None:
+        with _cache_ops_lock:
+            if _cache_op is None:
+                config = obter_configuracao()
+                _cache_op = CacheTTL(
+                    max_entradas=config.cache_op_max_entradas,
+                    max_bytes=_max_bytes("op"),
+                    ttl=config.cache_op_ttl,
+                )
+    return _cache_op
+
+
+def invalidar_cache_ops() -> int:
+    """Descarta todas as consultas, partições diárias e OPs individuais em cache."""
+    return obter_cache_ops().invalidar() + obter_cache_dias().invalidar() + obter_cache_op().invalidar()
+
@@ -0,0 +1,110 @@
+#src/logic/configuracao.py
+import os
+import threading
+from dataclasses import dataclass, fields
+
+# .env na raiz do projeto (as variáveis já definidas no ambiente têm prioridade)
+DOTENV_PATH = os.path.join(os.path.dirname(__file__), "..", "..", ".env")
+PASTA_ARQUIVOS = os.path.join(os.path.dirname(__file__), "..", "files")
+
+
+def _bool(valor: str) -> bool:
+    return valor.strip().lower() in ("1", "s", "sim", "true", "yes")
+
+
+@dataclass(frozen=True)
+class Configuracao:
+    """Configuração da aplicação, lida do ambiente/.env uma única vez (ver obter_configuracao)."""
+
+    # ERP (Firebird) e pool de conexões
+    firebird_dsn: str = ""
+    firebird_user: str = ""
+    firebird_password: str = ""
+    firebird_pool_min: int = 1
+    firebird_pool_max: int = 5
+    firebird_pool_ocioso_max: float = 300
+    firebird_pool_verificar_apos: float = 30
+    firebird_pool_timeout: float = 30
+    erp_local_path: str = ""
+
+    # Caches de OPs
+    cache_ops_ttl: float = 60
+    cache_ops_ttl_passado: float = 1800
+    cache_ops_max_entradas: int = 64
+    cache_ops_max_mb: float = 256  # total dos três caches (ver cache_ops.PARTES_MEMORIA)
+    cache_ops_max_dias: int = 1000
+    cache_op_ttl: float = 300
+    cache_op_max_entradas: int = 256
+    indice_codigos_max_ops: int = 20000
+
+    # Índice de OPs abertas (estações de leitura automática)
+    ops_abertas_dias_atras: int = 30
+    ops_abertas_dias_frente: int = 7
+    ops_abertas_intervalo: float = 60
+    ops_abertas_espera_falha: float = 15  # segundos entre cargas na própria leitura enquanto o índice não carregou
+
+    # Partida: pré-carrega pandas, pool e janela de OPs abertas em segundo plano
+    aquecer_na_partida: bool = True
+
+    # Sessão
+    sessao_segredo: str = ""
+    sessao_duracao_horas: float = 12
+
+    # Arquivos e armazenamento das leituras
+    registros_csv_path: str = os.path.join(PASTA_ARQUIVOS, "registros.csv")
+    particoes_registros_path: str = ""  # vazio: "registros_particoes" ao lado do registros.csv
+    usuarios_csv_path: str = os.path.join(PASTA_ARQUIVOS, "usuarios.csv")
+    armazem_leituras: str = "csv"
+    armazem_sqlite_path: str = ""
+    leituras_acompanhar_intervalo: float = 1  # segundos entre buscas de leituras de outros workers (SSE)
+
+    # Execução
+    threads_dados: int = 8
+    threads_consultas: int = 4
+
+    # Log e perfilamento
+    log_nivel: str = "INFO"
+    log_formato: str = "texto"
+    perfil_limite_lento_ms: float = 0
+    perfil_intervalo_ms: float = 5
+    perfil_max_guardados: int = 20
+    perfil_max_segundos: float = 60
+
+    @classmethod
+    def do_ambiente(cls, ambiente=None) -> "Configuracao":
+        """Monta a configuração a partir das variáveis (nome do campo em maiúsculas); vazias usam o padrão."""
+        ambiente = os.environ if ambiente is None else ambiente
+        valores = {}
+        for campo in fields(cls):
+            bruto = ambiente.get(campo.name.upper(), "")
+            if not bruto.strip():
+                continue
+            try:
+                valores[campo.name] = _bool(bruto) if campo.type is bool else campo.type(bruto.strip())
+            except ValueError:
+                raise ValueError(f"Valor inválido para {campo.name.upper()}: {bruto!r}") from None
+        return cls(**valores)
+
+
+_configuracao = None
+_configuracao_lock = threading.Lock()
+
+
+def obter_configuracao() -> Configuracao:
+    """Configuração compartilhada; o .env é lido só na primeira chamada."""
+    global _configuracao
+    if _configuracao is None:
+        with _configuracao_lock:
+            if _configuracao is None:
+                from dotenv import load_dotenv
+                load_dotenv(DOTENV_PATH)
+                _configuracao = Configuracao.do_ambiente()
+    return _configuracao
+
+
+def recarregar_configuracao() -> Configuracao:
+    """Relê o ambiente; para ferramentas (benchmarks, testes) que mudam variáveis depois da primeira leitura."""
+    global _configuracao
+    with _configuracao_lock:
+        _configuracao = None
+    return obter_configuracao()
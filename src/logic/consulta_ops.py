@@ -1,27 +1,117 @@
 #src/logic/consulta_ops.py
-from dotenv import load_dotenv
-load_dotenv()
-
-from src.database.conexao import conectar
+from src.database.conexao import executar_preparada, obter_pool
+from src.logic.cache_ops import ParticoesDiarias, obter_cache_dias, obter_cache_op, obter_cache_ops
+from src.logic.execucao import em_thread, executar_em_paralelo
+from src.logic.armazem_leituras import obter_armazem
+from src.logic.configuracao import obter_configuracao
+from src.logic.indice_codigos import obter_indice_codigos, obter_ops_abertas
+from src.logic.log import obter_logger
+from src.logic.metricas import DURACAO_CONSULTA, LINHAS_CONSULTA, medir_etapa
+from datetime import date, datetime, timedelta
+import base64
+import functools
+import time
+import json
+import numpy as np
 import pandas as pd
-import os
 
-REGISTROS_CSV_PATH = os.path.join(os.path.dirname(__file__), "..","files", "registros.csv")
+log = obter_logger("consulta_ops")
 
-def carregar_ops_intervalo(data_inicio: str, data_fim: str, codigos_op: list[str] = None, tipo_op: str = "ambos") -> pd.DataFrame:
-    conn = conectar()
-    if not conn:
-        return pd.DataFrame()
+def _separar_lista(valor) -> list[str]:
+    # Resultado do LIST() do Firebird ("a,b,c"); blobs grandes chegam como leitor de blob
+    if valor is None or (isinstance(valor, float) and valor != valor):
+        return []
+    if hasattr(valor, "read"):
+        valor = valor.read()
+    vistos = []
+    for item in str(valor).split(","):
+        item = item.strip()
+        if item and item not in vistos:
+            vistos.append(item)
+    return vistos
 
-    filtro_op = ""
-    if codigos_op:
-        lista_codigos = ",".join(f"'{cod.strip()}'" for cod in codigos_op if cod.strip())
-        filtro_op = f"AND opp.codigo IN ({lista_codigos})"
+def _agregar_codigos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte as colunas agregadas (uma linha por OP) em listas: CODIGOS_BARRAS com
+    os códigos de barras do produto e CODS_OP com os códigos das subdivisões da OP.
+    CODIGO_BARRAS e COD_OP continuam com o primeiro código de cada lista.
+    """
+    df.columns = [str(c).upper() for c in df.columns]
+    for lista, primeiro in (("CODIGOS_BARRAS", "CODIGO_BARRAS"), ("CODS_OP", "COD_OP")):
+        if lista in df.columns:
+            df[lista] = [_separar_lista(v) for v in df[lista]]
+            df[primeiro] = [v[0] if v else None for v in df[lista]]
+    return df
+
+def _executar_consulta(sql: str, params: list = None, tipo: str = "") -> pd.DataFrame:
+    with obter_pool().conexao() as conn, DURACAO_CONSULTA.medir(tipo_op=tipo):
+        colunas, linhas = executar_preparada(conn, sql, params, rotulo=tipo)
+    df = pd.DataFrame.from_records(linhas, columns=colunas, coerce_float=True)
+    LINHAS_CONSULTA.inc(len(df), tipo_op=tipo)
+    log.debug("Consulta de OPs executada", extra={"campos": {"tipo_op": tipo, "linhas": len(df)}})
+    df = _agregar_codigos(df)
+    # Toda OP vinda do ERP atualiza o índice de códigos válidos usado na validação das leituras
+    obter_indice_codigos().atualizar(df)
+    return df
+
+TIPOS_OP = {
+    "linha": ("linha",),
+    "sob_encomenda": ("sob_encomenda",),
+    "ambos": ("linha", "sob_encomenda"),
+}
+
+# Tamanhos da lista do filtro opp.codigo IN (...): cada lote é completado até o próximo
+# tamanho repetindo o último código, para haver poucos textos SQL distintos (e poucos
+# comandos preparados por conexão). Listas maiores que o último tamanho viram vários lotes.
+TAMANHOS_LOTE_CODIGOS = (1, 4, 16, 64, 256)
+
+def _lotes_codigos(codigos_op: list[str]) -> list[list[str]]:
+    codigos = list(dict.fromkeys(str(c).strip() for c in codigos_op if str(c).strip()))
+    maximo = TAMANHOS_LOTE_CODIGOS[-1]
+    return [codigos[i:i + maximo] for i in range(0, len(codigos), maximo)]
+
+def _limites_periodo(data_inicio, data_fim) -> tuple[datetime, datetime]:
+    """Período semiaberto [00:00 do primeiro dia, 00:00 do dia seguinte ao último)."""
+    inicio = date.fromisoformat(str(data_inicio))
+    fim = date.fromisoformat(str(data_fim)) + timedelta(days=1)
+    return datetime.combine(inicio, datetime.min.time()), datetime.combine(fim, datetime.min.time())
+
+# Chave primária da tabela de cada tipo de OP (paginação da exportação)
+CHAVES_OP = {"linha": "id_os_producao_linha_prod", "sob_encomenda": "id_os_sob_enc"}
 
-    queries = []
+def _montar_consulta(tipo: str, data_inicio: str = None, data_fim: str = None, codigos_op: list[str] = None,
+                     subespecie: str = None, id_produto: int = None, limite: int = None,
+                     apos_id_os: int = None) -> tuple[str, list]:
+    """
+    Monta a consulta de OPs de um tipo e seus parâmetros. Sem datas, a consulta fica
+    limitada só pelos códigos de OP (busca direta de uma OP; no máximo um lote de
+    TAMANHOS_LOTE_CODIGOS). Todos os valores vão como parâmetros ligados e a data é
+    comparada direto na coluna (data_prev_inicio >= ? AND < ?), o que permite usar o índice.
+    Com `limite`, retorna só uma página de OPs em ordem de ID_OS, a partir da seguinte a `apos_id_os`.
+    """
+    filtros, params = [], []
+    if data_inicio and data_fim:
+        filtros.append("opp.data_prev_inicio >= ? AND opp.data_prev_inicio < ?")
+        params.extend(_limites_periodo(data_inicio, data_fim))
+    if codigos_op:
+        codigos = [str(c).strip() for c in codigos_op]
+        tamanho = next(t for t in TAMANHOS_LOTE_CODIGOS if t >= len(codigos))
+        codigos += [codigos[-1]] * (tamanho - len(codigos))
+        filtros.append(f"opp.codigo IN ({', '.join('?' * tamanho)})")
+        params.extend(codigos)
+    if subespecie:
+        filtros.append("UPPER(se.nome) = ?")
+        params.append(subespecie.upper())
+    if id_produto is not None:
+        filtros.append("p.id_produto = ?")
+        params.append(id_produto)
+    if apos_id_os is not None:
+        filtros.append(f"opp.{CHAVES_OP[tipo]} > ?")
+        params.append(apos_id_os)
+    filtro = "WHERE " + " AND ".join(filtros) if filtros else ""
 
-    if tipo_op in ("linha", "ambos"):
-        queries.append(f"""
+    if tipo == "linha":
+        sql = f"""
             SELECT
                 pp.id_periodo_producao AS id_period,
                 opp.id_os_producao_linha_prod AS id_os,
@@ -32,24 +122,22 @@ def carregar_ops_intervalo(data_inicio: str, data_fim: str, codigos_op: list[str
                 p.id_produto,
                 p.nome AS nome_produto,
                 opp.quantidade_ref_prev_prod AS qtd_prevista,
-                cb.codigo_barras,
-                sopp.codigo_barras AS cod_op,
+                (SELECT LIST(DISTINCT cb.codigo_barras, ',') FROM codigo_barras cb
+                  WHERE cb.id_produto = p.id_produto) AS codigos_barras,
+                (SELECT LIST(DISTINCT sopp.codigo_barras, ',') FROM subdivisao_os_prod_linha_prod sopp
+                  WHERE sopp.id_ordem_serv_prod_linha = opp.id_os_producao_linha_prod) AS cods_op,
                 'LIN_PROD' AS tipo_op
             FROM os_producao_linha_prod opp
             LEFT JOIN grade_cor gc ON gc.id_grade_cor = opp.id_grade_cor
             LEFT JOIN produto_grade pg ON pg.id_produto_grade = gc.id_produto_grade
             LEFT JOIN produto p ON p.id_produto = pg.id_produto
-            LEFT JOIN codigo_barras cb ON cb.id_produto = p.id_produto
-            LEFT JOIN subdivisao_os_prod_linha_prod sopp ON sopp.id_ordem_serv_prod_linha = opp.id_os_producao_linha_prod
             LEFT JOIN periodo_producao pp ON pp.id_periodo_producao = opp.id_periodo_producao
             LEFT JOIN especie e ON e.id_especie = p.id_especie
             LEFT JOIN sub_especie se ON se.id_sub_especie = p.id_sub_especie
-            WHERE CAST(opp.data_prev_inicio AS DATE) BETWEEN '{data_inicio}' AND '{data_fim}'
-            {filtro_op}
-        """)
-
-    if tipo_op in ("sob_encomenda", "ambos"):
-        queries.append(f"""
+            {filtro}
+        """
+    else:
+        sql = f"""
             SELECT
                 pp.id_periodo_producao AS id_period,
                 opp.id_os_sob_enc AS id_os,
@@ -60,56 +148,332 @@ def carregar_ops_intervalo(data_inicio: str, data_fim: str, codigos_op: list[str
                 p.id_produto,
                 p.nome AS nome_produto,
                 opp.quantidade_prev_prod AS qtd_prevista,
-                cb.codigo_barras,
-                sopp.codigo_barras AS cod_op,
+                (SELECT LIST(DISTINCT cb.codigo_barras, ',') FROM codigo_barras cb
+                  WHERE cb.id_produto = p.id_produto) AS codigos_barras,
+                (SELECT LIST(DISTINCT sopp.codigo_barras, ',') FROM subdivisao_os_prod_sob_enc sopp
+                  WHERE sopp.id_os_prod_sob_enc = opp.id_os_sob_enc) AS cods_op,
                 'SOB_ENC' AS tipo_op
             FROM os_producao_sob_enc opp
             LEFT JOIN grade_cor gc ON gc.id_grade_cor = opp.id_grade_cor
             LEFT JOIN produto_grade pg ON pg.id_produto_grade = gc.id_produto_grade
             LEFT JOIN produto p ON p.id_produto = pg.id_produto
-            LEFT JOIN codigo_barras cb ON cb.id_produto = p.id_produto
-            LEFT JOIN subdivisao_os_prod_sob_enc sopp ON sopp.id_os_prod_sob_enc = opp.id_os_sob_enc
             LEFT JOIN periodo_producao pp ON pp.id_periodo_producao = opp.id_periodo_producao
             LEFT JOIN especie e ON e.id_especie = p.id_especie
             LEFT JOIN sub_especie se ON se.id_sub_especie = p.id_sub_especie
-            WHERE CAST(opp.data_prev_inicio AS DATE) BETWEEN '{data_inicio}' AND '{data_fim}'
-            {filtro_op}
-        """)
+            {filtro}
+        """
 
-    try:
-        dfs = [pd.read_sql(q, conn) for q in queries]
-        df_final = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+    if limite:
+        sql += f"ORDER BY opp.{CHAVES_OP[tipo]} ROWS ?"
+        params.append(limite)
+    return sql, params
 
-        # Enriquecimento com registros.csv
-        if os.path.exists(REGISTROS_CSV_PATH):
-            registros = pd.read_csv(REGISTROS_CSV_PATH, sep=",")
-            registros["COD_OP"] = registros["COD_OP"].astype(str).str.strip()
+def _consultar_erp(data_inicio: str, data_fim: str, codigos_op: list[str] = None, tipo_op: str = "ambos",
+                   subespecie: str = None, id_produto: int = None) -> pd.DataFrame:
+    """Executa as consultas de OPs no ERP, sem o enriquecimento com os registros."""
+    lotes = _lotes_codigos(codigos_op) if codigos_op else [None]
+    queries = [
+        (tipo, *_montar_consulta(tipo, data_inicio, data_fim, lote, subespecie, id_produto))
+        for tipo in TIPOS_OP.get(tipo_op, ()) for lote in lotes
+    ]
 
-            # 🔧 Corrige valores ausentes ou inválidos na coluna QTD
-            registros["QTD"] = pd.to_numeric(registros["QTD"], errors="coerce").fillna(1).astype(int)
+    # Cada consulta usa sua própria conexão do pool, então linha e sob encomenda rodam em paralelo
+    dfs = executar_em_paralelo([
+        functools.partial(_executar_consulta, sql, params, tipo) for tipo, sql, params in queries
+    ])
+    return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
 
-            # Agrupamento após correção
-            soma_registrada = registros.groupby("COD_OP")["QTD"].sum().reset_index()
-            soma_registrada.columns = ["CODIGO_OP", "QTD_REGISTRADA"]
-            soma_registrada["CODIGO_OP"] = soma_registrada["CODIGO_OP"].astype(str)
+def _buscar_dias(tipo: str, dia_inicio: date, dia_fim: date) -> pd.DataFrame:
+    return _executar_consulta(*_montar_consulta(tipo, dia_inicio.isoformat(), dia_fim.isoformat()), tipo)
 
-            df_final["CODIGO_OP"] = df_final["CODIGO_OP"].astype(str)
-            df_final = df_final.merge(soma_registrada, on="CODIGO_OP", how="left")
+_particoes = None
+
+def _obter_particoes() -> ParticoesDiarias:
+    global _particoes
+    if _particoes is None:
+        _particoes = ParticoesDiarias(
+            _buscar_dias,
+            coluna_data="DATA_PREVISTA",
+            cache=obter_cache_dias(),
+            ttl_atual=obter_configuracao().cache_ops_ttl,
+            ttl_passado=obter_configuracao().cache_ops_ttl_passado,
+        )
+    return _particoes
 
+def _enriquecer_registros(df_final: pd.DataFrame) -> pd.DataFrame:
+    # Enriquecimento com as quantidades registradas (índice em memória ou tabela de somas).
+    # O STATUS fica para classificar_status, só onde é exibido (ex.: _montar_ops do painel)
+    with medir_etapa("enriquecimento"):
+        if not df_final.empty:
+            soma_registrada = obter_armazem().somas_por_op()
+            df_final["CODIGO_OP"] = df_final["CODIGO_OP"].astype(str)
+            df_final["QTD_REGISTRADA"] = df_final["CODIGO_OP"].map(soma_registrada)
         else:
             df_final["QTD_REGISTRADA"] = 0
 
         df_final["QTD_REGISTRADA"] = df_final["QTD_REGISTRADA"].fillna(0).astype(int)
-        df_final["STATUS"] = df_final["QTD_REGISTRADA"].apply(lambda x: "Registrado" if x > 0 else "")
+    return df_final
+
+def _filtrar_erp(df: pd.DataFrame, subespecie: str = None, id_produto: int = None) -> pd.DataFrame:
+    # Mesmos filtros de _montar_consulta, aplicados sobre partições já em memória
+    if subespecie:
+        df = df[df["SUB_ESPECIE"].str.upper() == subespecie.upper()]
+    if id_produto is not None:
+        df = df[pd.to_numeric(df["ID_PRODUTO"], errors="coerce") == id_produto]
+    return df.reset_index(drop=True)
+
+def _normalizar_filtros(subespecie: str = None, id_produto: str = None) -> tuple:
+    """Filtros vindos da tela -> (subespecie ou None, id_produto int ou None); id_produto inválido vira -1."""
+    if id_produto not in (None, ""):
+        id_produto = str(id_produto).strip()
+        id_produto = int(id_produto) if id_produto.isdigit() else -1
+    else:
+        id_produto = None
+    subespecie = subespecie.strip() if subespecie and subespecie.strip().lower() != "todas" else None
+    return subespecie, id_produto
+
+def carregar_ops_intervalo(data_inicio: str, data_fim: str, codigos_op: list[str] = None, tipo_op: str = "ambos",
+                           subespecie: str = None, id_produto: str = None) -> pd.DataFrame:
+    """
+    OPs do período com QTD_REGISTRADA. Uma falha no ERP é propagada (e nada fica em
+    cache), para não ser confundida com um período sem OPs.
+    """
+    subespecie, id_produto = _normalizar_filtros(subespecie, id_produto)
+    if id_produto == -1:
+        return _enriquecer_registros(pd.DataFrame())
+    tipos = list(TIPOS_OP.get(tipo_op, ()))
+    inicio, fim = date.fromisoformat(data_inicio), date.fromisoformat(data_fim)
+
+    # A parte do ERP fica em cache compartilhado; o enriquecimento é refeito sobre uma cópia
+    df_erp = None
+    if not codigos_op:
+        # Intervalos sem filtro de OP são montados a partir das partições diárias: só os dias
+        # ainda não carregados (ou expirados) vão ao Firebird. Com filtro de subespécie/produto,
+        # as partições só são usadas se o intervalo inteiro já estiver em memória.
+        particoes = _obter_particoes()
+        if subespecie or id_produto is not None:
+            df_cache = particoes.carregar(tipos, inicio, fim, somente_cache=True)
+            if df_cache is not None:
+                df_erp = _filtrar_erp(df_cache, subespecie, id_produto)
+        else:
+            df_erp = particoes.carregar(tipos, inicio, fim, executar=executar_em_paralelo)
+
+    if df_erp is None:
+        # Filtros vão para o SQL; o resultado fica no cache por chave de consulta
+        codigos = tuple(sorted(c.strip() for c in codigos_op or [] if c.strip()))
+        chave = (data_inicio, data_fim, tipo_op, codigos, (subespecie or "").upper(), id_produto)
+        df_erp = obter_cache_ops().obter(
+            chave, lambda: _consultar_erp(data_inicio, data_fim, codigos_op, tipo_op, subespecie, id_produto)
+        )
+    df_final = _enriquecer_registros(df_erp.copy())
+
+    log.debug("%d OPs carregadas entre %s e %s (tipo_op: %s)", len(df_final), data_inicio, data_fim, tipo_op)
+    return df_final
 
-        print(f"[OK] {len(df_final)} OPs carregadas entre {data_inicio} e {data_fim} (tipo_op: {tipo_op})")
-        return df_final
+def iterar_ops_exportacao(data_inicio: str, data_fim: str, codigos_op: list[str] = None, tipo_op: str = "ambos",
+                          subespecie: str = None, id_produto: str = None, lote: int = 1000):
+    """
+    OPs do período para exportação, em blocos de até `lote` dicts (COLUNAS_EXPORTACAO_OPS):
+    nada é juntado em memória nem passa pelo cache. Cada bloco é uma página da consulta
+    (ordem de ID_OS, continuando após o último da página anterior) e a conexão volta ao
+    pool antes de o bloco ser entregue, então um download lento não segura o pool.
+    """
+    subespecie, id_produto = _normalizar_filtros(subespecie, id_produto)
+    if id_produto == -1:
+        return
+    somas = obter_armazem().somas_por_op()
+    lotes = _lotes_codigos(codigos_op) if codigos_op else [None]
+    for tipo in TIPOS_OP.get(tipo_op, ()):
+        for lote_codigos in lotes:
+            apos_id_os = None
+            while True:
+                sql, params = _montar_consulta(tipo, data_inicio, data_fim, lote_codigos, subespecie, id_produto,
+                                               limite=lote, apos_id_os=apos_id_os)
+                with obter_pool().conexao() as conn, DURACAO_CONSULTA.medir(tipo_op=tipo):
+                    colunas, linhas = executar_preparada(conn, sql, params, rotulo=tipo)
+                if not linhas:
+                    break
+                colunas = [str(c).upper() for c in colunas]
+                LINHAS_CONSULTA.inc(len(linhas), tipo_op=tipo)
+                bloco = []
+                for valores in linhas:
+                    op = dict(zip(colunas, valores))
+                    cod_op = str(op["CODIGO_OP"])
+                    registrada = somas.get(cod_op, 0)
+                    bloco.append({
+                        "CODIGO_OP": cod_op,
+                        "DATA_PREVISTA": op["DATA_PREVISTA"],
+                        "TIPO_OP": op["TIPO_OP"],
+                        "ESPECIE": (op["ESPECIE"] or "").strip(),
+                        "SUB_ESPECIE": op["SUB_ESPECIE"],
+                        "ID_PRODUTO": op["ID_PRODUTO"],
+                        "NOME_PRODUTO": op["NOME_PRODUTO"],
+                        "QTD_PREVISTA": op["QTD_PREVISTA"],
+                        "QTD_REGISTRADA": registrada,
+                        "STATUS": status_leitura(registrada, op["QTD_PREVISTA"]),
+                    })
+                yield bloco
+                if len(linhas) < lote:
+                    break
+                apos_id_os = op["ID_OS"]
 
+def carregar_op(cod_op: str) -> pd.DataFrame:
+    """
+    Carrega uma única OP pelo código, sem limite de data, nos dois tipos de OP.
+    A parte do ERP fica num cache pequeno por OP; QTD_REGISTRADA é sempre atual.
+    """
+    cod_op = str(cod_op).strip()
+    df_erp = obter_cache_op().obter(cod_op, lambda: _consultar_erp(None, None, [cod_op], "ambos"))
+    return _enriquecer_registros(df_erp.copy())
+
+def atualizar_ops_abertas() -> int:
+    """
+    Recarrega no índice reverso (código de barras -> OPs abertas) a janela de OPs de
+    OPS_ABERTAS_DIAS_ATRAS dias antes até OPS_ABERTAS_DIAS_FRENTE dias depois de hoje.
+    Se a leitura do ERP falhar, mantém o índice anterior. Retorna quantas OPs há no índice.
+    """
+    config = obter_configuracao()
+    indice = obter_ops_abertas()
+    indice.tentado_em = time.monotonic()
+    hoje = date.today()
+    inicio = hoje - timedelta(days=config.ops_abertas_dias_atras)
+    fim = hoje + timedelta(days=config.ops_abertas_dias_frente)
+    try:
+        df = carregar_ops_intervalo(inicio.isoformat(), fim.isoformat())
     except Exception as e:
-        print("[ERRO] Falha na leitura das OPs:", e)
-        return pd.DataFrame()
-    finally:
-        conn.close()
+        log.warning("OPs abertas não atualizadas (%s); mantendo o índice anterior", e)
+        return len(indice)
+    indice.definir(df)
+    return len(indice)
+
+def aquecer() -> int:
+    """
+    Deixa a primeira requisição rápida: abre as conexões mínimas do pool e carrega a
+    janela de OPs abertas, que também preenche o cache de partições diárias do painel.
+    Diferente de obter_pool(), aqui uma falha ao abrir as conexões é propagada.
+    """
+    obter_pool().preencher()
+    return atualizar_ops_abertas()
+
+async def carregar_op_async(cod_op: str) -> pd.DataFrame:
+    """Versão assíncrona de carregar_op, executada fora do event loop."""
+    return await em_thread(carregar_op, cod_op)
+
+async def carregar_ops_intervalo_async(data_inicio: str, data_fim: str, codigos_op: list[str] = None, tipo_op: str = "ambos",
+                                       subespecie: str = None, id_produto: str = None) -> pd.DataFrame:
+    """Versão assíncrona de carregar_ops_intervalo, executada fora do event loop."""
+    return await em_thread(carregar_ops_intervalo, data_inicio, data_fim, codigos_op=codigos_op, tipo_op=tipo_op,
+                           subespecie=subespecie, id_produto=id_produto)
+
+def classificar_status(df: pd.DataFrame) -> pd.Series:
+    """Status de conferência de cada OP a partir de QTD_REGISTRADA × QTD_PREVISTA (vetorizado)."""
+    registrada = pd.to_numeric(df["QTD_REGISTRADA"], errors="coerce").fillna(0).to_numpy()
+    prevista = pd.to_numeric(df["QTD_PREVISTA"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    status = np.select(
+        [registrada == 0, registrada < prevista, registrada == prevista],
+        ["🔴 Pendente", "✅ Registrando", "✅ Registro OK"],
+        default="⚠️ Registro a maior",
+    )
+    return pd.Series(status, index=df.index, dtype=object)
+
+def status_leitura(qtd_registrada, qtd_prevista) -> str:
+    """Mesma regra de classificar_status, para uma única OP."""
+    try:
+        prevista = float(qtd_prevista)
+    except (TypeError, ValueError):
+        prevista = float("nan")
+    if qtd_registrada == 0:
+        return "🔴 Pendente"
+    if qtd_registrada < prevista:
+        return "✅ Registrando"
+    if qtd_registrada == prevista:
+        return "✅ Registro OK"
+    return "⚠️ Registro a maior"
+
+def deltas_leituras(linhas: list[dict]) -> list[dict]:
+    """
+    Novo QTD_REGISTRADA (e STATUS, quando a QTD_PREVISTA da OP está no índice de OPs
+    abertas) de cada OP afetada por um lote de leituras, uma entrada por OP.
+    """
+    armazem = obter_armazem()
+    ops_abertas = obter_ops_abertas()
+    deltas = {}
+    for linha in linhas:
+        cod_op = str(linha.get("COD_OP", "")).strip()
+        if not cod_op or cod_op in deltas:
+            continue
+        qtd = armazem.qtd_registrada(cod_op)
+        delta = {"CODIGO_OP": cod_op, "QTD_REGISTRADA": qtd}
+        dados = ops_abertas.dados(cod_op)
+        if dados is not None:
+            delta["STATUS"] = status_leitura(qtd, dados["QTD_PREVISTA"])
+        deltas[cod_op] = delta
+    return list(deltas.values())
+
+# Ordem de exibição das OPs: Status > Subespécie > ID Produto (com o código da OP como desempate)
+PRIORIDADE_STATUS = {
+    "⚠️ Registro a maior": 1,
+    "✅ Registro OK": 2,
+    "✅ Registrando": 3,
+    "🔴 Pendente": 4,
+}
+COLUNAS_ORDEM = ["_PRIORIDADE", "_SUB_ESPECIE", "_ID_PRODUTO", "_CODIGO_OP"]
+
+def ordenar_ops(df: pd.DataFrame) -> pd.DataFrame:
+    """Ordena as OPs (já com STATUS) e acrescenta as colunas da chave de ordenação."""
+    df = df.copy()
+    df["_PRIORIDADE"] = df["STATUS"].map(PRIORIDADE_STATUS).fillna(9).astype(int)
+    df["_SUB_ESPECIE"] = df["SUB_ESPECIE"].fillna("").astype(str).str.upper()
+    df["_ID_PRODUTO"] = pd.to_numeric(df["ID_PRODUTO"], errors="coerce").fillna(0).astype("int64")
+    df["_CODIGO_OP"] = df["CODIGO_OP"].astype(str)
+    return df.sort_values(COLUNAS_ORDEM, kind="stable").reset_index(drop=True)
+
+def codificar_cursor(chave: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(chave).encode("utf-8")).decode("ascii")
+
+def decodificar_cursor(cursor: str) -> list:
+    try:
+        chave = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        prioridade, sub_especie, id_produto, codigo_op = chave
+        return [int(prioridade), str(sub_especie), int(id_produto), str(codigo_op)]
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+def paginar_ops(df_ordenado: pd.DataFrame, limite: int, cursor: str = "") -> tuple[pd.DataFrame, str]:
+    """
+    Retorna a página de até `limite` OPs posterior ao `cursor` (paginação por chave,
+    estável mesmo com OPs mudando de status entre páginas) e o cursor da próxima
+    página, ou None quando não há mais.
+    """
+    df = df_ordenado
+    if cursor:
+        p, sub, id_prod, cod = decodificar_cursor(cursor)
+        col_p, col_sub, col_id, col_cod = (df[c] for c in COLUNAS_ORDEM)
+        depois = (
+            (col_p > p)
+            | ((col_p == p) & (col_sub > sub))
+            | ((col_p == p) & (col_sub == sub) & (col_id > id_prod))
+            | ((col_p == p) & (col_sub == sub) & (col_id == id_prod) & (col_cod > cod))
+        )
+        df = df[depois]
+
+    pagina = df.head(limite) if limite > 0 else df
+    proximo = None
+    if limite > 0 and len(df) > limite:
+        ultima = pagina.iloc[-1]
+        proximo = codificar_cursor([int(ultima[c]) if c in ("_PRIORIDADE", "_ID_PRODUTO") else str(ultima[c]) for c in COLUNAS_ORDEM])
+    return pagina.drop(columns=COLUNAS_ORDEM), proximo
+
+def resumir_por_especie(df: pd.DataFrame) -> dict:
+    """Totais de quantidade prevista e registrada por espécie (cards do painel)."""
+    if df.empty:
+        return {}
+    quantidades = df[["QTD_PREVISTA", "QTD_REGISTRADA"]].apply(pd.to_numeric, errors="coerce").fillna(0)
+    totais = quantidades.groupby(df["ESPECIE"].fillna("Não especificado")).sum()
+    return {
+        str(nome): {"qtd_prevista": int(linha["QTD_PREVISTA"]), "qtd_registrada": int(linha["QTD_REGISTRADA"])}
+        for nome, linha in totais.iterrows()
+    }
 
 def filtrar_ops_por_esp_especie(df: pd.DataFrame, especie_escolhida: str, subesp_escolhida: str) -> pd.DataFrame:
     if especie_escolhida and especie_escolhida.lower() != "todas":
@@ -0,0 +1,293 @@
+#src/logic/diario_registros.py
+import atexit
+import csv
+import io
+import os
+import threading
+
+from src.logic.configuracao import obter_configuracao
+from src.logic.log import obter_logger
+from src.logic.metricas import medir_etapa
+from src.logic.trava_arquivo import TravaArquivo
+
+log = obter_logger("diario_registros")
+
+# Caminho do arquivo CSV onde as leituras são registradas (REGISTROS_CSV_PATH no ambiente substitui o padrão)
+REGISTROS_CSV_PATH = obter_configuracao().registros_csv_path
+
+# Layout de colunas usado pelo registros.csv (mesmo cabeçalho gravado pela API web)
+COLUNAS_REGISTROS = [
+    "DATA", "COD_OP", "CODIGO_BARRAS", "ID_PRODUTO", "NOME_PRODUTO",
+    "ESPECIE", "SUB_ESPECIE", "QTD", "USUARIO"
+]
+
+
+def _linha_completa(cabecalho: bytes, linha: bytes) -> bool:
+    """A linha tem exatamente as colunas do cabeçalho (uma linha editada à mão sem a quebra final)."""
+    def campos(texto: bytes) -> list:
+        return list(csv.reader(io.StringIO(texto.decode("utf-8", errors="replace"), newline="")))
+
+    colunas, registros = campos(cabecalho), campos(linha)
+    return len(colunas) == 1 and len(registros) == 1 and len(registros[0]) == len(colunas[0])
+
+
+def recuperar_linha_parcial(caminho: str) -> int:
+    """
+    Remove do final do arquivo uma linha incompleta (sem quebra de linha),
+    deixada por uma queda do processo no meio de uma gravação. Uma última linha
+    sem quebra que ainda tem as colunas do cabeçalho é mantida e só ganha o "\\n".
+
+    Retorna a quantidade de bytes descartados.
+    """
+    if not os.path.exists(caminho):
+        return 0
+
+    with open(caminho, "rb+") as arq:
+        arq.seek(0, os.SEEK_END)
+        tamanho = arq.tell()
+        if tamanho == 0:
+            return 0
+
+        arq.seek(tamanho - 1)
+        if arq.read(1) == b"\n":
+            return 0
+
+        # Procura a última quebra de linha lendo o arquivo de trás para frente
+        bloco = 4096
+        posicao = tamanho
+        corte = 0
+        while posicao > 0:
+            inicio = max(0, posicao - bloco)
+            arq.seek(inicio)
+            trecho = arq.read(posicao - inicio)
+            indice = trecho.rfind(b"\n")
+            if indice != -1:
+                corte = inicio + indice + 1
+                break
+            posicao = inicio
+
+        arq.seek(corte)
+        cauda = arq.read()
+        arq.seek(0)
+        cabecalho = arq.readline().rstrip(b"\r\n")
+        if corte == 0 or _linha_completa(cabecalho, cauda.rstrip(b"\r")):
+            arq.seek(tamanho)
+            arq.write(b"\n")
+            descartados = 0
+        else:
+            arq.truncate(corte)
+            descartados = tamanho - corte
+        arq.flush()
+        os.fsync(arq.fileno())
+
+    if descartados:
+        log.warning("Linha parcial descartada de %s (%d bytes)", caminho, descartados)
+    else:
+        log.info("Quebra de linha final completada em %s", caminho)
+    return descartados
+
+
+class DiarioRegistros:
+    """
+    Escritor append-only do registros.csv.
+
+    Cada leitura vira uma única linha anexada ao final do arquivo, sem reler nem
+    regravar o histórico. As linhas vão para o sistema operacional a cada gravação
+    e o fsync é feito em lote: a cada `fsync_a_cada` linhas ou, no máximo,
+    `intervalo_fsync` segundos depois da primeira linha pendente.
+
+    Vários processos podem gravar no mesmo arquivo (uvicorn com --workers, leitor de
+    mesa): cada lote é uma única escrita em O_APPEND feita sob a trava `<arquivo>.lock`,
+    que a rotação mensal também usa. A trava é sempre tomada antes do lock interno (e
+    antes do lock do IndiceRegistros), então quem já a segura pode gravar de novo.
+    """
+
+    def __init__(self, caminho: str = REGISTROS_CSV_PATH, fsync_a_cada: int = 32, intervalo_fsync: float = 1.0):
+        self.caminho = os.path.abspath(caminho)
+        self.fsync_a_cada = max(1, fsync_a_cada)
+        self.intervalo_fsync = intervalo_fsync
+        self._lock = threading.Lock()
+        self._arquivo = None
+        self._colunas = None
+        self._pendentes = 0
+        self._sincronizador = None
+        self._parar = threading.Event()
+        self._ouvintes = []
+        self._recuperado = False
+        self.trava = TravaArquivo(self.caminho + ".lock")
+
+    @property
+    def colunas(self) -> list[str]:
+        with self.trava, self._lock:
+            self._abrir()
+            return list(self._colunas)
+
+    def _abrir(self):
+        if self._arquivo is not None:
+            if self._substituido():
+                # Outro processo trocou o arquivo (rotação mensal): passa a gravar no novo
+                self._fechar_arquivo()
+            else:
+                return
+
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        with self.trava:
+            if not self._recuperado:
+                # Só na primeira abertura: uma linha parcial vista sob a trava é de um processo que caiu
+                recuperar_linha_parcial(self.caminho)
+                self._recuperado = True
+
+            cabecalho = None
+            if os.path.exists(self.caminho) and os.path.getsize(self.caminho) > 0:
+                with open(self.caminho, "r", encoding="utf-8", newline="") as arq:
+                    cabecalho = next(csv.reader([arq.readline()]), None)
+
+            # Sem buffer e em modo append (O_APPEND): cada write é uma escrita no fim do arquivo
+            self._arquivo = open(self.caminho, "ab", buffering=0)
+            if cabecalho:
+                self._colunas = [c.strip() for c in cabecalho]
+            else:
+                # Arquivo novo (ou só com uma linha parcial descartada): grava o cabeçalho padrão
+                self._colunas = list(COLUNAS_REGISTROS)
+                self._escrever(self._formatar([self._colunas]))
+                os.fsync(self._arquivo.fileno())
+
+        if self.intervalo_fsync and self.intervalo_fsync > 0:
+            self._parar = threading.Event()
+            self._sincronizador = threading.Thread(target=self._sincronizar_periodicamente, name="diario-fsync", daemon=True)
+            self._sincronizador.start()
+
+    def _substituido(self) -> bool:
+        try:
+            return os.stat(self.caminho).st_ino != os.fstat(self._arquivo.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _fechar_arquivo(self):
+        self._parar.set()
+        self._fsync()
+        self._arquivo.close()
+        self._arquivo = None
+
+    @staticmethod
+    def _formatar(linhas) -> str:
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer, lineterminator="\n")
+        escritor.writerows(linhas)
+        return buffer.getvalue()
+
+    def _escrever(self, texto: str):
+        dados = memoryview(texto.encode("utf-8"))
+        while dados:
+            dados = dados[self._arquivo.write(dados):]
+
+    def ao_gravar(self, ouvinte) -> None:
+        """
+        Registra uma função chamada após cada gravação, com
+        `ouvinte(linhas, tamanho_antes, estado)`: as linhas anexadas, o tamanho do
+        arquivo antes da gravação e o `os.stat_result` logo depois dela (outros processos
+        podem ter anexado linhas antes de `tamanho_antes` ou depois de `estado.st_size`).
+        Os ouvintes são chamados na ordem de registro; registrar de novo o mesmo não tem efeito.
+        Rodam sob o lock interno (na ordem das gravações), então não podem tomar a trava:
+        quem precisa consultar o índice deve ser avisado depois de registrar_lote retornar.
+        """
+        if ouvinte not in self._ouvintes:
+            self._ouvintes.append(ouvinte)
+
+    def registrar(self, linha: dict) -> None:
+        """
+        Anexa uma leitura ao diário. As chaves ausentes no dicionário ficam vazias
+        e chaves fora do cabeçalho do arquivo são ignoradas.
+        """
+        self.registrar_lote([linha])
+
+    def registrar_lote(self, linhas: list[dict], sincronizar: bool = False) -> None:
+        """
+        Anexa várias leituras numa única gravação (group commit). Com `sincronizar`,
+        faz o fsync logo após o lote em vez de esperar o próximo fsync em lote.
+        """
+        if not linhas:
+            return
+        with medir_etapa("registros_trava"):
+            self.trava.adquirir()
+        try:
+            self._lock.acquire()
+            try:
+                self._abrir()  # reabre se outro processo rotacionou o arquivo
+                tamanho_antes = os.fstat(self._arquivo.fileno()).st_size
+                valores = [[linha.get(col, "") for col in self._colunas] for linha in linhas]
+                self._escrever(self._formatar(valores))
+                # Ainda sob a trava: o tamanho logo depois da escrita é o fim das linhas deste lote
+                estado = os.fstat(self._arquivo.fileno())
+            except BaseException:
+                self._lock.release()
+                raise
+        finally:
+            self.trava.liberar()
+        # fsync e ouvintes só sob o lock interno (na ordem das gravações deste processo)
+        try:
+            self._pendentes += len(linhas)
+            if sincronizar or self._pendentes >= self.fsync_a_cada:
+                self._fsync()
+
+            if self._ouvintes:
+                for ouvinte in self._ouvintes:
+                    try:
+                        ouvinte(linhas, tamanho_antes, estado)
+                    except Exception as e:
+                        log.error("Falha ao notificar gravação do diário: %s", e)
+        finally:
+            self._lock.release()
+
+    def _fsync(self):
+        if self._arquivo is not None and self._pendentes:
+            os.fsync(self._arquivo.fileno())
+            self._pendentes = 0
+
+    def _sincronizar_periodicamente(self):
+        parar = self._parar
+        while not parar.wait(self.intervalo_fsync):
+            with self._lock:
+                self._fsync()
+
+    def sincronizar(self) -> None:
+        """Força o fsync das linhas pendentes."""
+        with self._lock:
+            self._fsync()
+
+    def reescrever(self, funcao):
+        """
+        Executa `funcao(caminho)` com o arquivo fechado e as gravações bloqueadas (rotação
+        das partições mensais) e reabre o arquivo em seguida. Retorna o resultado de `funcao`.
+        """
+        with self.trava, self._lock:
+            if self._arquivo is not None:
+                self._fechar_arquivo()
+            try:
+                return funcao(self.caminho)
+            finally:
+                self._abrir()
+
+    def fechar(self) -> None:
+        self._parar.set()
+        with self._lock:
+            if self._arquivo is not None:
+                self._fechar_arquivo()
+        self.trava.fechar()
+
+
+_diario = None
+_diario_lock = threading.Lock()
+
+
+def obter_diario() -> DiarioRegistros:
+    """Retorna o diário compartilhado do registros.csv, abrindo-o (e recuperando o arquivo) na primeira chamada."""
+    global _diario
+    if _diario is None:
+        with _diario_lock:
+            if _diario is None:
+                diario = DiarioRegistros(obter_configuracao().registros_csv_path)
+                diario.colunas  # abre o arquivo já na inicialização
+                atexit.register(diario.fechar)
+                _diario = diario
+    return _diario
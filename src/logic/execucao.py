@@ -0,0 +1,36 @@
+#src/logic/execucao.py
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from src.logic.configuracao import obter_configuracao
+
+# Pool para o trabalho bloqueante das rotas (pandas, CSV, autenticação)
+EXECUTOR_DADOS = ThreadPoolExecutor(
+    max_workers=obter_configuracao().threads_dados,
+    thread_name_prefix="dados",
+)
+
+# Pool separado para as consultas SQL disparadas em paralelo de dentro do EXECUTOR_DADOS.
+# Ficar em outro pool evita que uma tarefa espere por subtarefas presas na mesma fila.
+EXECUTOR_CONSULTAS = ThreadPoolExecutor(
+    max_workers=obter_configuracao().threads_consultas,
+    thread_name_prefix="consulta",
+)
+
+
+async def em_thread(func, *args, **kwargs):
+    """Executa `func` no EXECUTOR_DADOS sem bloquear o event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(EXECUTOR_DADOS, functools.partial(func, *args, **kwargs))
+
+
+def executar_em_paralelo(tarefas: list) -> list:
+    """
+    Executa as funções sem argumentos de `tarefas` no EXECUTOR_CONSULTAS e devolve
+    os resultados na mesma ordem. Uma única tarefa roda direto na thread atual.
+    """
+    if len(tarefas) <= 1:
+        return [tarefa() for tarefa in tarefas]
+    futuros = [EXECUTOR_CONSULTAS.submit(tarefa) for tarefa in tarefas]
+    return [futuro.result() for futuro in futuros]
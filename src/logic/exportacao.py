@@ -0,0 +1,149 @@
+#src/logic/exportacao.py
+import csv
+import io
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+# Colunas dos relatórios exportados
+COLUNAS_EXPORTACAO_OPS = [
+    "CODIGO_OP", "DATA_PREVISTA", "TIPO_OP", "ESPECIE", "SUB_ESPECIE", "ID_PRODUTO", "NOME_PRODUTO",
+    "QTD_PREVISTA", "QTD_REGISTRADA", "STATUS",
+]
+
+FORMATOS_EXPORTACAO = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _texto(valor) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    if hasattr(valor, "strftime"):
+        return valor.strftime("%Y-%m-%d %H:%M:%S") if hasattr(valor, "hour") else valor.strftime("%Y-%m-%d")
+    return str(valor)
+
+
+def gerar_csv(colunas: list[str], blocos):
+    """
+    CSV em partes: o cabeçalho sai antes da primeira linha e cada bloco de `blocos`
+    (listas de dicts) vira um pedaço de bytes. Separador ";" e BOM UTF-8, como o Excel
+    em pt-BR espera.
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=";", lineterminator="\r\n")
+    escritor.writerow(colunas)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+    for linhas in blocos:
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerows([_texto(linha.get(c)) for c in colunas] for linha in linhas)
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _Coletor:
+    """Destino sem seek para o zipfile: acumula os bytes gravados até serem retirados."""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, dados) -> int:
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def retirar(self) -> bytes:
+        dados, self._partes = b"".join(self._partes), []
+        return dados
+
+
+_XLSX_FIXOS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Dados" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+# Caracteres de controle não são aceitos em XML 1.0
+_CONTROLE = {c: None for c in range(32) if c not in (9, 10, 13)}
+
+
+def _celula(valor) -> str:
+    if isinstance(valor, bool) or valor is None:
+        valor = _texto(valor)
+    if isinstance(valor, (int, float, Decimal)) and valor == valor and valor not in (float("inf"), float("-inf")):
+        return f"<c><v>{valor}</v></c>"
+    texto = escape(_texto(valor).translate(_CONTROLE))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _linha_xml(valores) -> str:
+    return "<row>" + "".join(_celula(v) for v in valores) + "</row>"
+
+
+def gerar_xlsx(colunas: list[str], blocos):
+    """
+    Planilha XLSX em partes, sem biblioteca externa: o zip é gravado em modo
+    streaming (descritores de dados no lugar de seek) e cada bloco de linhas vira
+    XML comprimido entregue assim que o compressor libera bytes.
+    """
+    coletor = _Coletor()
+    with zipfile.ZipFile(coletor, "w", compression=zipfile.ZIP_DEFLATED) as pacote:
+        for nome, conteudo in _XLSX_FIXOS.items():
+            pacote.writestr(nome, conteudo)
+        with pacote.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as planilha:
+            planilha.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + _linha_xml(colunas)
+            ).encode("utf-8"))
+            yield coletor.retirar()
+            for linhas in blocos:
+                planilha.write("".join(_linha_xml(linha.get(c) for c in colunas) for linha in linhas).encode("utf-8"))
+                dados = coletor.retirar()
+                if dados:
+                    yield dados
+            planilha.write(b"</sheetData></worksheet>")
+    yield coletor.retirar()
+
+
+def gerar_exportacao(formato: str, colunas: list[str], blocos):
+    """Gerador de bytes do relatório no `formato` (csv ou xlsx)."""
+    if formato == "xlsx":
+        return gerar_xlsx(colunas, blocos)
+    return gerar_csv(colunas, blocos)
@@ -0,0 +1,233 @@
+#src/logic/indice_codigos.py
+import threading
+import time
+from collections import OrderedDict
+
+from src.logic.configuracao import obter_configuracao
+
+# Motivos de rejeição de uma leitura
+MOTIVO_OK = "OK"
+MOTIVO_DADOS_INCOMPLETOS = "DADOS_INCOMPLETOS"
+MOTIVO_CODIGO_INVALIDO = "CODIGO_INVALIDO"
+MOTIVO_OP_DESCONHECIDA = "OP_DESCONHECIDA"
+MOTIVO_CODIGO_NAO_PERTENCE = "CODIGO_NAO_PERTENCE_OP"
+MOTIVO_SEM_OP_ABERTA = "SEM_OP_ABERTA"
+MOTIVO_SEM_SALDO = "SEM_SALDO_PENDENTE"
+MOTIVO_OPS_INDISPONIVEIS = "OPS_ABERTAS_INDISPONIVEIS"
+
+MENSAGENS_MOTIVO = {
+    MOTIVO_DADOS_INCOMPLETOS: "Dados incompletos",
+    MOTIVO_CODIGO_INVALIDO: "⚠️ Código de barras inválido.",
+    MOTIVO_OP_DESCONHECIDA: "⚠️ OP não encontrada.",
+    MOTIVO_CODIGO_NAO_PERTENCE: "⚠️ Código inválido para esta OP.",
+    MOTIVO_SEM_OP_ABERTA: "⚠️ Nenhuma OP aberta para este código.",
+    MOTIVO_SEM_SALDO: "⚠️ Todas as OPs deste código já foram completadas.",
+    MOTIVO_OPS_INDISPONIVEIS: "⚠️ OPs abertas ainda não carregadas do ERP. Tente novamente em instantes.",
+}
+
+
+def _lista(valor) -> list:
+    if valor is None:
+        return []
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return list(valor)
+    if isinstance(valor, float) and valor != valor:
+        return []
+    return [valor]
+
+
+def _normalizar(codigo) -> str:
+    return str(codigo).strip() if codigo is not None else ""
+
+
+def codigos_validos(linha: dict) -> set:
+    """Códigos aceitos por uma OP (linha da consulta): os do produto e os das subdivisões."""
+    codigos = set()
+    for coluna in ("CODIGOS_BARRAS", "CODIGO_BARRAS", "CODS_OP", "COD_OP"):
+        for codigo in _lista(linha.get(coluna)):
+            codigo = _normalizar(codigo)
+            if codigo:
+                codigos.add(codigo)
+    return codigos
+
+
+class IndiceCodigos:
+    """
+    Índice em memória OP -> conjunto de códigos válidos para leitura.
+
+    Cada OP aceita os códigos de barras do seu produto (CODIGOS_BARRAS) e os
+    códigos das suas subdivisões (CODS_OP). O índice é alimentado pelas consultas
+    de OPs no ERP, então validar uma leitura é só uma busca em hash, sem consulta.
+
+    Guarda no máximo `max_ops` OPs: ao passar do limite, descarta as atualizadas há
+    mais tempo. As OPs abertas são reconsultadas a cada atualização da janela e ficam;
+    uma OP descartada volta pela busca direta na próxima leitura dela.
+    """
+
+    def __init__(self, max_ops: int = 20000):
+        self.max_ops = max(1, max_ops)
+        self._lock = threading.Lock()
+        self._codigos_por_op = OrderedDict()  # da atualização mais antiga para a mais recente
+
+    def _incluir(self, novos: dict) -> None:
+        # Chamado com o lock
+        for cod_op, codigos in novos.items():
+            self._codigos_por_op[cod_op] = codigos
+            self._codigos_por_op.move_to_end(cod_op)
+        while len(self._codigos_por_op) > self.max_ops:
+            self._codigos_por_op.popitem(last=False)
+
+    def atualizar_op(self, linha: dict) -> None:
+        """Inclui (ou substitui) os códigos válidos de uma OP a partir de uma linha da consulta."""
+        cod_op = _normalizar(linha.get("CODIGO_OP"))
+        if not cod_op:
+            return
+        codigos = frozenset(codigos_validos(linha))
+        with self._lock:
+            self._incluir({cod_op: codigos})
+
+    def atualizar(self, df) -> None:
+        """Atualiza o índice com todas as OPs de um resultado da consulta de OPs."""
+        if df is None or df.empty or "CODIGO_OP" not in df.columns:
+            return
+        colunas = [c for c in ("CODIGO_OP", "CODIGOS_BARRAS", "CODIGO_BARRAS", "CODS_OP", "COD_OP") if c in df.columns]
+        novos = {}
+        for linha in df[colunas].to_dict(orient="records"):
+            cod_op = _normalizar(linha.get("CODIGO_OP"))
+            if cod_op:
+                novos[cod_op] = frozenset(codigos_validos(linha))
+        with self._lock:
+            self._incluir(novos)
+
+    def __len__(self) -> int:
+        return len(self._codigos_por_op)
+
+    def conhece(self, cod_op) -> bool:
+        return _normalizar(cod_op) in self._codigos_por_op
+
+    def validar(self, cod_op, codigo_barras) -> tuple[bool, str]:
+        """Verifica se o código lido pertence à OP; retorna (ok, motivo)."""
+        codigo = _normalizar(codigo_barras)
+        if not codigo or not codigo.isalnum():
+            return False, MOTIVO_CODIGO_INVALIDO
+        codigos = self._codigos_por_op.get(_normalizar(cod_op))
+        if codigos is None:
+            return False, MOTIVO_OP_DESCONHECIDA
+        if codigo not in codigos:
+            return False, MOTIVO_CODIGO_NAO_PERTENCE
+        return True, MOTIVO_OK
+
+
+# Dados da OP guardados no índice reverso (o necessário para montar a leitura)
+COLUNAS_OP_ABERTA = ("CODIGO_OP", "ID_PRODUTO", "NOME_PRODUTO", "ESPECIE", "SUB_ESPECIE", "QTD_PREVISTA",
+                     "DATA_PREVISTA", "TIPO_OP")
+
+
+def _quantidade(valor) -> float:
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if valor != valor else valor
+
+
+class IndiceOpsAbertas:
+    """
+    Índice reverso código de barras -> OPs abertas, para estações que leem produtos
+    variados sem escolher a OP antes.
+
+    É montado a partir da janela de OPs carregada do ERP (carregar_ops_intervalo) e
+    substituído inteiro a cada atualização. Cada código (do produto ou de uma
+    subdivisão) aponta para as OPs que o aceitam, da DATA_PREVISTA mais antiga para a
+    mais nova; resolver uma leitura não consulta o ERP.
+    """
+
+    def __init__(self):
+        self._ops_por_codigo = {}  # codigo -> tupla de cod_op, da mais antiga para a mais nova
+        self._dados_op = {}        # cod_op -> dict com COLUNAS_OP_ABERTA
+        self._lock_tentativa = threading.Lock()
+        self.atualizado_em = None
+        self.tentado_em = None     # última tentativa de carga no ERP, com ou sem sucesso
+
+    def reservar_tentativa(self, espera: float) -> bool:
+        """
+        Marca uma nova tentativa de carga se a anterior foi há pelo menos `espera`
+        segundos; retorna False (sem marcar) enquanto a espera não passou.
+        """
+        agora = time.monotonic()
+        with self._lock_tentativa:
+            if self.tentado_em is not None and agora - self.tentado_em < espera:
+                return False
+            self.tentado_em = agora
+            return True
+
+    def definir(self, df) -> None:
+        """Substitui o índice pelas OPs do DataFrame (uma linha por OP)."""
+        ops_por_codigo, dados_op = {}, {}
+        if df is not None and not df.empty and "CODIGO_OP" in df.columns:
+            import pandas as pd
+            df = df.copy()
+            df["_DATA"] = pd.to_datetime(df.get("DATA_PREVISTA"), errors="coerce")
+            df = df.sort_values(["_DATA", "CODIGO_OP"], na_position="last", kind="stable")
+            colunas = [c for c in (*COLUNAS_OP_ABERTA, "CODIGOS_BARRAS", "CODIGO_BARRAS", "CODS_OP", "COD_OP")
+                       if c in df.columns]
+            for linha in df[colunas].to_dict(orient="records"):
+                cod_op = _normalizar(linha.get("CODIGO_OP"))
+                if not cod_op or cod_op in dados_op:
+                    continue
+                dados_op[cod_op] = {c: linha.get(c) for c in COLUNAS_OP_ABERTA}
+                dados_op[cod_op]["CODIGO_OP"] = cod_op
+                dados_op[cod_op]["QTD_PREVISTA"] = _quantidade(linha.get("QTD_PREVISTA"))
+                for codigo in codigos_validos(linha):
+                    ops_por_codigo.setdefault(codigo, []).append(cod_op)
+
+        ops_por_codigo = {codigo: tuple(ops) for codigo, ops in ops_por_codigo.items()}
+        # Troca de referências: leituras em andamento veem o índice antigo ou o novo, nunca um misto
+        self._ops_por_codigo, self._dados_op = ops_por_codigo, dados_op
+        self.atualizado_em = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._dados_op)
+
+    def dados(self, cod_op) -> dict:
+        """Dados de uma OP da janela de OPs abertas (ou None)."""
+        dados = self._dados_op.get(_normalizar(cod_op))
+        return dict(dados) if dados is not None else None
+
+    def resolver(self, codigo_barras, qtd_registrada) -> tuple[dict, str]:
+        """
+        Escolhe a OP de uma leitura: a de DATA_PREVISTA mais antiga entre as que aceitam
+        o código e ainda têm saldo (QTD_PREVISTA - `qtd_registrada(cod_op)` > 0).
+        Retorna (dados da OP, motivo); os dados são None quando a leitura é rejeitada.
+        """
+        codigo = _normalizar(codigo_barras)
+        if not codigo or not codigo.isalnum():
+            return None, MOTIVO_CODIGO_INVALIDO
+        ops_por_codigo, dados_op = self._ops_por_codigo, self._dados_op
+        candidatas = ops_por_codigo.get(codigo)
+        if not candidatas:
+            return None, MOTIVO_SEM_OP_ABERTA
+        for cod_op in candidatas:
+            dados = dados_op[cod_op]
+            if dados["QTD_PREVISTA"] - qtd_registrada(cod_op) > 0:
+                return dict(dados), MOTIVO_OK
+        return None, MOTIVO_SEM_SALDO
+
+
+_indice_codigos = None
+_indice_codigos_lock = threading.Lock()
+_ops_abertas = IndiceOpsAbertas()
+
+
+def obter_indice_codigos() -> IndiceCodigos:
+    """Índice compartilhado de códigos válidos, limitado a INDICE_CODIGOS_MAX_OPS OPs."""
+    global _indice_codigos
+    if _indice_codigos is None:
+        with _indice_codigos_lock:
+            if _indice_codigos is None:
+                _indice_codigos = IndiceCodigos(max_ops=obter_configuracao().indice_codigos_max_ops)
+    return _indice_codigos
+
+
+def obter_ops_abertas() -> IndiceOpsAbertas:
+    return _ops_abertas
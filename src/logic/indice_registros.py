@@ -0,0 +1,230 @@
+#src/logic/indice_registros.py
+import csv
+import io
+import os
+import threading
+from contextlib import nullcontext
+
+from src.logic.diario_registros import REGISTROS_CSV_PATH, obter_diario
+from src.logic.log import obter_logger
+from src.logic.metricas import medir_etapa
+
+log = obter_logger("indice_registros")
+
+
+def _converter_qtd(valor) -> int:
+    # Mesma regra do enriquecimento antigo: QTD ausente ou inválida conta como 1
+    try:
+        qtd = float(valor)
+    except (TypeError, ValueError):
+        return 1
+    if qtd != qtd:  # NaN
+        return 1
+    return int(qtd)
+
+
+class IndiceRegistros:
+    """
+    Índice em memória das quantidades registradas no registros.csv.
+
+    Mantém COD_OP -> QTD_REGISTRADA e (COD_OP, ID_PRODUTO) -> QTD_REGISTRADA.
+    É montado uma vez e depois só avança: lembra até que byte do arquivo já somou e,
+    quando o arquivo cresce (gravações deste ou de outros processos), lê só o trecho
+    novo. Recarrega tudo apenas quando o arquivo é trocado (rotação) ou encolhe.
+    Com `particoes`, os meses fechados entram pelos resumos e só o mês aberto é relido;
+    a recarga completa usa a `trava` do diário para não ver uma rotação pela metade. A
+    trava vem sempre antes do lock do índice, a mesma ordem das gravações do diário.
+    """
+
+    def __init__(self, caminho: str = REGISTROS_CSV_PATH, particoes=None, trava=None):
+        self.caminho = os.path.abspath(caminho)
+        self.particoes = particoes
+        self.trava = trava
+        self._lock = threading.Lock()
+        self._por_op = {}
+        self._por_op_produto = {}
+        self._colunas = []
+        self._inode = None
+        self._posicao = 0  # bytes já somados, sempre no fim de uma linha
+        self._ouvintes_externos = []
+        self._externas_pendentes = []  # achadas em ao_gravar, avisadas fora dos locks do diário
+
+    def _somar(self, linha: dict, por_op: dict, por_op_produto: dict):
+        cod_op = str(linha.get("COD_OP", "")).strip()
+        id_produto = str(linha.get("ID_PRODUTO", "")).strip()
+        qtd = _converter_qtd(linha.get("QTD"))
+        por_op[cod_op] = por_op.get(cod_op, 0) + qtd
+        chave = (cod_op, id_produto)
+        por_op_produto[chave] = por_op_produto.get(chave, 0) + qtd
+
+    def _linhas(self, dados: bytes) -> list[dict]:
+        return list(csv.DictReader(io.StringIO(dados.decode("utf-8")), fieldnames=self._colunas))
+
+    def _recarregar_tudo(self):
+        por_op, por_op_produto = {}, {}
+        if self.particoes is not None:
+            base_por_op, base_por_op_produto = self.particoes.somas()
+            por_op, por_op_produto = dict(base_por_op), dict(base_por_op_produto)
+        self._por_op, self._por_op_produto = por_op, por_op_produto
+        self._colunas, self._inode, self._posicao = [], None, 0
+
+        try:
+            arq = open(self.caminho, "rb")
+        except FileNotFoundError:
+            return
+        with medir_etapa("registros_leitura"), arq:
+            inode = os.fstat(arq.fileno()).st_ino
+            cabecalho = arq.readline()
+            if not cabecalho.endswith(b"\n"):
+                return
+            self._colunas = [c.strip() for c in next(csv.reader([cabecalho.decode("utf-8")]), [])]
+            dados = arq.read()
+            corte = dados.rfind(b"\n") + 1
+            for linha in self._linhas(dados[:corte]):
+                self._somar(linha, por_op, por_op_produto)
+
+        self._inode, self._posicao = inode, len(cabecalho) + corte
+        log.info("Índice de registros carregado: %d OPs", len(por_op))
+
+    def _ler_cauda(self, ate: int = None):
+        """
+        Soma as linhas completas entre a posição atual e `ate` (padrão: o fim do arquivo)
+        e as retorna; None se o arquivo foi trocado (o índice precisa ser recarregado).
+        """
+        with open(self.caminho, "rb") as arq:
+            if os.fstat(arq.fileno()).st_ino != self._inode:
+                return None
+            arq.seek(self._posicao)
+            dados = arq.read() if ate is None else arq.read(ate - self._posicao)
+        corte = dados.rfind(b"\n") + 1
+        linhas = self._linhas(dados[:corte])
+        for linha in linhas:
+            self._somar(linha, self._por_op, self._por_op_produto)
+        self._posicao += corte
+        return linhas
+
+    def _verificar(self):
+        """
+        Põe o índice em dia com o trecho novo do arquivo; retorna as linhas novas de outros
+        processos, ou None se o arquivo foi trocado ou encolheu (precisa de recarga completa).
+        """
+        try:
+            estado = os.stat(self.caminho)
+        except FileNotFoundError:
+            return None
+        if estado.st_ino != self._inode or estado.st_size < self._posicao:
+            return None
+        if estado.st_size > self._posicao:
+            return self._ler_cauda()
+        return []
+
+    def _consultar(self, leitura):
+        """
+        Executa `leitura()` sob o lock do índice, com o índice em dia com o arquivo, e avisa
+        os ouvintes das leituras de outros processos. Retorna (resultado, linhas externas).
+        """
+        with self._lock:
+            externas = self._verificar()
+            if externas is not None:
+                resultado = leitura()
+        if externas is None:
+            # Recarga completa: a trava do diário é tomada antes do lock do índice
+            with self.trava or nullcontext(), self._lock:
+                externas = self._verificar()
+                if externas is None:
+                    self._recarregar_tudo()
+                    externas = []
+                resultado = leitura()
+        externas = self._tirar_pendentes() + externas
+        self._avisar(externas)
+        return resultado, externas
+
+    def _tirar_pendentes(self) -> list[dict]:
+        with self._lock:
+            pendentes, self._externas_pendentes = self._externas_pendentes, []
+        return pendentes
+
+    def avisar_pendentes(self) -> None:
+        """Avisa os ouvintes das leituras externas achadas em ao_gravar (chamar fora dos locks do diário)."""
+        self._avisar(self._tirar_pendentes())
+
+    def ao_ler_externas(self, ouvinte) -> None:
+        """Registra `ouvinte(linhas)`, chamado com as leituras gravadas por outros processos ao encontrá-las."""
+        if ouvinte not in self._ouvintes_externos:
+            self._ouvintes_externos.append(ouvinte)
+
+    def _avisar(self, linhas: list[dict]):
+        # Fora do lock do índice: os ouvintes costumam consultar o próprio índice
+        if not linhas:
+            return
+        for ouvinte in self._ouvintes_externos:
+            try:
+                ouvinte(linhas)
+            except Exception as e:
+                log.error("Falha ao notificar leituras de outros processos: %s", e)
+
+    def ao_gravar(self, linhas: list[dict], tamanho_antes: int, estado) -> None:
+        """
+        Aplica no índice as linhas recém-anexadas pelo diário. Roda sob o lock do diário,
+        então as leituras de outros processos achadas aqui só são avisadas depois, em
+        avisar_pendentes ou na próxima consulta.
+        """
+        with self._lock:
+            if estado.st_ino != self._inode or self._posicao > tamanho_antes:
+                # Arquivo trocado ou índice à frente do esperado: recarrega na próxima consulta
+                self._inode = None
+                return
+            if self._posicao < tamanho_antes:
+                # Outros processos gravaram desde a última leitura: soma o trecho deles antes
+                externas = self._ler_cauda(tamanho_antes)
+                if externas is None or self._posicao != tamanho_antes:
+                    self._inode = None
+                    return
+                self._externas_pendentes.extend(externas)
+            for linha in linhas:
+                self._somar(linha, self._por_op, self._por_op_produto)
+            self._posicao = estado.st_size
+
+    def acompanhar(self) -> int:
+        """Lê as gravações de outros processos (avisando os ouvintes); retorna quantas encontrou."""
+        _, externas = self._consultar(lambda: None)
+        return len(externas)
+
+    def somas_por_op(self) -> dict:
+        """Retorna uma cópia do mapa COD_OP -> QTD_REGISTRADA."""
+        return self._consultar(lambda: dict(self._por_op))[0]
+
+    def somas_por_op_produto(self) -> dict:
+        """Retorna uma cópia do mapa (COD_OP, ID_PRODUTO) -> QTD_REGISTRADA."""
+        return self._consultar(lambda: dict(self._por_op_produto))[0]
+
+    def qtd_registrada(self, cod_op, id_produto=None) -> int:
+        cod_op = str(cod_op).strip()
+        if id_produto is None:
+            return self._consultar(lambda: self._por_op.get(cod_op, 0))[0]
+        chave = (cod_op, str(id_produto).strip())
+        return self._consultar(lambda: self._por_op_produto.get(chave, 0))[0]
+
+
+_indice = None
+_indice_lock = threading.Lock()
+
+
+def obter_indice() -> IndiceRegistros:
+    """
+    Retorna o índice compartilhado, montando-o e ligando-o ao diário na primeira chamada
+    (antes disso, os meses fechados que ainda estiverem no registros.csv são rotacionados).
+    """
+    global _indice
+    if _indice is None:
+        with _indice_lock:
+            if _indice is None:
+                from src.logic.particoes_registros import obter_particoes
+                diario = obter_diario()
+                particoes = obter_particoes()
+                diario.reescrever(particoes.rotacionar)
+                indice = IndiceRegistros(diario.caminho, particoes, diario.trava)
+                indice.somas_por_op()
+                diario.ao_gravar(indice.ao_gravar)
+                _indice = indice
+    return _indice
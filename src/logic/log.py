@@ -0,0 +1,79 @@
+#src/logic/log.py
+import json
+import logging
+import sys
+import threading
+import time
+
+from src.logic.configuracao import obter_configuracao
+
+# LOG_NIVEL: DEBUG, INFO (padrão), AVISO, ERRO ou DESLIGADO. LOG_FORMATO: texto (padrão) ou json.
+NIVEIS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "AVISO": logging.WARNING,
+    "WARNING": logging.WARNING,
+    "ERRO": logging.ERROR,
+    "ERROR": logging.ERROR,
+    "DESLIGADO": logging.CRITICAL + 1,
+    "OFF": logging.CRITICAL + 1,
+}
+ROTULOS = {logging.DEBUG: "DEBUG", logging.INFO: "INFO", logging.WARNING: "AVISO", logging.ERROR: "ERRO",
+           logging.CRITICAL: "ERRO"}
+
+RAIZ = "produto_acabado"
+
+_configurado = False
+_lock = threading.Lock()
+
+
+class _FormatoTexto(logging.Formatter):
+    """Mesmo visual dos antigos prints: "[NIVEL] mensagem chave=valor"."""
+
+    def format(self, registro: logging.LogRecord) -> str:
+        texto = f"[{ROTULOS.get(registro.levelno, registro.levelname)}] {registro.getMessage()}"
+        campos = getattr(registro, "campos", None)
+        if campos:
+            texto += " " + " ".join(f"{k}={v}" for k, v in campos.items())
+        if registro.exc_info:
+            texto += "\n" + self.formatException(registro.exc_info)
+        return texto
+
+
+class _FormatoJSON(logging.Formatter):
+    def format(self, registro: logging.LogRecord) -> str:
+        dados = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(registro.created)),
+            "nivel": ROTULOS.get(registro.levelno, registro.levelname),
+            "modulo": registro.name.removeprefix(RAIZ + "."),
+            "msg": registro.getMessage(),
+            **(getattr(registro, "campos", None) or {}),
+        }
+        if registro.exc_info:
+            dados["excecao"] = self.formatException(registro.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+def configurar_log(nivel: str = None, formato: str = None) -> None:
+    """(Re)configura o log da aplicação; sem argumentos usa LOG_NIVEL e LOG_FORMATO da configuração."""
+    global _configurado
+    with _lock:
+        config = obter_configuracao()
+        nivel = (nivel or config.log_nivel).strip().upper()
+        formato = (formato or config.log_formato).strip().lower()
+        raiz = logging.getLogger(RAIZ)
+        for handler in list(raiz.handlers):
+            raiz.removeHandler(handler)
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(_FormatoJSON() if formato == "json" else _FormatoTexto())
+        raiz.addHandler(handler)
+        raiz.setLevel(NIVEIS.get(nivel, logging.INFO))
+        raiz.propagate = False
+        _configurado = True
+
+
+def obter_logger(nome: str) -> logging.Logger:
+    """Logger de um módulo da aplicação. Campos estruturados vão em extra={"campos": {...}}."""
+    if not _configurado:
+        configurar_log()
+    return logging.getLogger(f"{RAIZ}.{nome}")
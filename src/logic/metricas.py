@@ -0,0 +1,213 @@
+#src/logic/metricas.py
+import threading
+import time
+from contextlib import contextmanager
+
+# Limites (em segundos) dos histogramas de latência
+LIMITES_PADRAO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_rotulos(nomes: tuple, valores: tuple, extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _chave(self, rotulos: dict) -> tuple:
+        return tuple(rotulos.get(n, "") for n in self.rotulos)
+
+    def cabecalho(self) -> list[str]:
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, valor: float = 1, **rotulos) -> None:
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._series[chave] = self._series.get(chave, 0) + valor
+
+    def valor(self, **rotulos) -> float:
+        return self._series.get(self._chave(rotulos), 0)
+
+    def exportar(self) -> list[str]:
+        with self._lock:
+            series = list(self._series.items())
+        return self.cabecalho() + [
+            f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_numero(valor)}" for chave, valor in series
+        ]
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = (), limites: tuple = LIMITES_PADRAO):
+        super().__init__(nome, ajuda, rotulos)
+        self.limites = tuple(sorted(limites))
+
+    def observar(self, valor: float, **rotulos) -> None:
+        chave = self._chave(rotulos)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * len(self.limites), 0, 0.0]
+            baldes = serie[0]
+            for i, limite in enumerate(self.limites):
+                if valor <= limite:
+                    baldes[i] += 1
+                    break
+            serie[1] += 1
+            serie[2] += valor
+
+    @contextmanager
+    def medir(self, **rotulos):
+        """Mede a duração do bloco (mesmo se ele lançar exceção)."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **rotulos)
+
+    def exportar(self) -> list[str]:
+        with self._lock:
+            series = [(chave, (list(s[0]), s[1], s[2])) for chave, s in self._series.items()]
+        linhas = self.cabecalho()
+        for chave, (baldes, total, soma) in series:
+            acumulado = 0
+            for limite, quantidade in zip(self.limites, baldes):
+                acumulado += quantidade
+                rotulos = _formatar_rotulos(self.rotulos, chave, f'le="{_numero(limite)}"')
+                linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+            rotulos = _formatar_rotulos(self.rotulos, chave, 'le="+Inf"')
+            linhas.append(f"{self.nome}_bucket{rotulos} {total}")
+            linhas.append(f"{self.nome}_sum{_formatar_rotulos(self.rotulos, chave)} {_numero(soma)}")
+            linhas.append(f"{self.nome}_count{_formatar_rotulos(self.rotulos, chave)} {total}")
+        return linhas
+
+
+class Medidor(_Metrica):
+    """Gauge cujos valores são lidos na hora da exportação por `coletar() -> [(rotulos, valor)]`."""
+    tipo = "gauge"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = (), coletar=None):
+        super().__init__(nome, ajuda, rotulos)
+        self.coletar = coletar
+
+    def exportar(self) -> list[str]:
+        linhas = self.cabecalho()
+        for rotulos, valor in (self.coletar() if self.coletar else []):
+            linhas.append(f"{self.nome}{_formatar_rotulos(self.rotulos, self._chave(rotulos))} {_numero(valor)}")
+        return linhas
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._metricas = []
+
+    def adicionar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def exportar(self) -> str:
+        """Todas as métricas no formato de texto do Prometheus."""
+        linhas = []
+        for metrica in self._metricas:
+            try:
+                linhas.extend(metrica.exportar())
+            except Exception as e:
+                linhas.append(f"# erro ao coletar {metrica.nome}: {_escapar(e)}")
+        return "\n".join(linhas) + "\n"
+
+
+REGISTRO = RegistroMetricas()
+
+REQUISICOES = REGISTRO.adicionar(Contador(
+    "http_requisicoes_total", "Requisições HTTP atendidas", ("rota", "metodo", "status")))
+DURACAO_REQUISICAO = REGISTRO.adicionar(Histograma(
+    "http_duracao_segundos", "Tempo até o início da resposta, por rota", ("rota", "metodo")))
+PREPARACOES = REGISTRO.adicionar(Contador(
+    "erp_preparacoes_total", "Consultas preparadas no ERP (uma por texto de consulta e conexão)", ("consulta",)))
+DURACAO_CONEXAO = REGISTRO.adicionar(Histograma(
+    "erp_conexao_duracao_segundos", "Tempo para abrir uma conexão com o ERP"))
+DURACAO_CONSULTA = REGISTRO.adicionar(Histograma(
+    "erp_consulta_duracao_segundos", "Duração das consultas de OPs no ERP", ("tipo_op",)))
+LINHAS_CONSULTA = REGISTRO.adicionar(Contador(
+    "erp_linhas_total", "OPs retornadas pelas consultas no ERP", ("tipo_op",)))
+DURACAO_ETAPA = REGISTRO.adicionar(Histograma(
+    "etapa_duracao_segundos", "Duração das etapas internas (leitura dos registros, enriquecimento, serialização...)",
+    ("etapa",)))
+LEITURAS = REGISTRO.adicionar(Contador(
+    "leituras_registradas_total", "Leituras gravadas no armazenamento"))
+LEITURAS_REJEITADAS = REGISTRO.adicionar(Contador(
+    "leituras_rejeitadas_total", "Leituras recusadas pela API, por motivo", ("motivo",)))
+
+
+def medir_etapa(etapa: str):
+    """Span simples: `with medir_etapa("enriquecimento"): ...`."""
+    return DURACAO_ETAPA.medir(etapa=etapa)
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que conta as requisições e mede o tempo até o início da resposta,
+    por rota (o modelo da rota, ex. /op/{cod_op}, para não criar uma série por OP).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _rota(scope) -> str:
+        rota = getattr(scope.get("route"), "path", None)
+        if rota:
+            return rota
+        return "/static" if scope.get("path", "").startswith("/static") else "outras"
+
+    def _registrar(self, scope, status: int, inicio: float):
+        rota, metodo = self._rota(scope), scope.get("method", "")
+        DURACAO_REQUISICAO.observar(time.perf_counter() - inicio, rota=rota, metodo=metodo)
+        REQUISICOES.inc(rota=rota, metodo=metodo, status=status)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        registrado = False
+
+        async def enviar(mensagem):
+            nonlocal registrado
+            if mensagem["type"] == "http.response.start" and not registrado:
+                registrado = True
+                self._registrar(scope, mensagem["status"], inicio)
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        except Exception:
+            if not registrado:
+                self._registrar(scope, 500, inicio)
+            raise
@@ -0,0 +1,372 @@
+#src/logic/particoes_registros.py
+"""
+Partições mensais do registros.csv.
+
+O registros.csv guarda só o mês aberto; as leituras de meses fechados vão para
+`registros_AAAA-MM.csv` na pasta de partições, cada uma com um resumo compactado
+(`resumo_AAAA-MM.json`, quantidades por OP/produto). As somas saem dos resumos mais
+o arquivo aberto, sem reler o histórico.
+
+Uso (manutenção):
+    python -m src.logic.particoes_registros verificar     # confere os resumos com as partições
+    python -m src.logic.particoes_registros reconstruir   # refaz os resumos a partir das partições
+    python -m src.logic.particoes_registros rotacionar    # move os meses fechados agora
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+
+from src.logic.configuracao import obter_configuracao
+from src.logic.diario_registros import obter_diario, recuperar_linha_parcial
+from src.logic.indice_registros import _converter_qtd
+from src.logic.log import obter_logger
+from src.logic.trava_arquivo import TravaArquivo
+
+log = obter_logger("particoes_registros")
+
+_MES = re.compile(r"\d{4}-\d{2}")
+_PARTICAO = re.compile(r"registros_(\d{4}-\d{2})\.csv")
+
+# Sufixo dos arquivos montados durante a rotação, antes de substituírem os definitivos
+SUFIXO_ROTACAO = ".rotacao"
+DIARIO_ROTACAO = "rotacao.json"
+
+
+def _mes_de(data) -> str:
+    data = str(data or "").strip()
+    return data[:7] if _MES.match(data) else None
+
+
+def _gravar_atomico(caminho: str, conteudo: str) -> None:
+    temporario = caminho + SUFIXO_ROTACAO
+    with open(temporario, "w", encoding="utf-8", newline="") as arq:
+        arq.write(conteudo)
+        arq.flush()
+        os.fsync(arq.fileno())
+    os.replace(temporario, caminho)
+
+
+class ParticoesRegistros:
+    """
+    Pasta com as partições mensais fechadas e os seus resumos.
+
+    A rotação é refeita com segurança depois de uma queda: os arquivos novos são
+    montados com o sufixo SUFIXO_ROTACAO e só substituem os atuais depois de
+    listados no DIARIO_ROTACAO (ponto de confirmação); sem o diário, a rotação
+    interrompida é descartada e as leituras continuam no arquivo aberto.
+    """
+
+    def __init__(self, pasta: str):
+        self.pasta = os.path.abspath(pasta)
+        self._lock = threading.Lock()
+        self._assinatura = None
+        self._por_op = {}
+        self._por_op_produto = {}
+        self.mes_rotacionado = None
+
+    def caminho_particao(self, mes: str) -> str:
+        return os.path.join(self.pasta, f"registros_{mes}.csv")
+
+    def caminho_resumo(self, mes: str) -> str:
+        return os.path.join(self.pasta, f"resumo_{mes}.json")
+
+    def meses(self) -> list[str]:
+        """Meses fechados com partição, do mais antigo para o mais recente."""
+        if not os.path.isdir(self.pasta):
+            return []
+        return sorted(m.group(1) for m in map(_PARTICAO.fullmatch, os.listdir(self.pasta)) if m)
+
+    def ler_particao(self, mes: str):
+        with open(self.caminho_particao(mes), "r", encoding="utf-8", newline="") as arq:
+            leitor = csv.DictReader(arq)
+            leitor.fieldnames = [c.strip() for c in (leitor.fieldnames or [])]
+            yield from leitor
+
+    # ---------- Resumos ----------
+
+    def resumir(self, mes: str) -> dict:
+        """Resumo calculado direto da partição bruta."""
+        tamanho = os.path.getsize(self.caminho_particao(mes))
+        somas, linhas, fora_do_mes = {}, 0, 0
+        for linha in self.ler_particao(mes):
+            chave = (str(linha.get("COD_OP", "")).strip(), str(linha.get("ID_PRODUTO", "")).strip())
+            somas[chave] = somas.get(chave, 0) + _converter_qtd(linha.get("QTD"))
+            linhas += 1
+            fora_do_mes += _mes_de(linha.get("DATA")) != mes
+        return {
+            "mes": mes,
+            "linhas": linhas,
+            "tamanho": tamanho,
+            "fora_do_mes": fora_do_mes,
+            "somas": [[cod_op, id_produto, qtd] for (cod_op, id_produto), qtd in sorted(somas.items())],
+        }
+
+    def ler_resumo(self, mes: str):
+        try:
+            with open(self.caminho_resumo(mes), "r", encoding="utf-8") as arq:
+                return json.load(arq)
+        except FileNotFoundError:
+            return None
+
+    def reconstruir_resumo(self, mes: str) -> dict:
+        resumo = self.resumir(mes)
+        _gravar_atomico(self.caminho_resumo(mes), json.dumps(resumo, ensure_ascii=False))
+        return resumo
+
+    def _resumo_valido(self, mes: str) -> dict:
+        resumo = None
+        try:
+            resumo = self.ler_resumo(mes)
+        except (OSError, ValueError) as e:
+            log.warning("Resumo de %s ilegível: %s", mes, e)
+        if resumo is None or resumo.get("tamanho") != os.path.getsize(self.caminho_particao(mes)):
+            log.warning("Resumo de %s ausente ou desatualizado; refazendo a partir da partição", mes)
+            resumo = self.reconstruir_resumo(mes)
+        return resumo
+
+    def somas(self) -> tuple[dict, dict]:
+        """
+        Somas dos meses fechados (COD_OP -> QTD e (COD_OP, ID_PRODUTO) -> QTD), lidas dos
+        resumos. Os dicts retornados são compartilhados: quem for alterá-los deve copiar.
+        """
+        with self._lock:
+            meses = self.meses()
+            assinatura = tuple((mes, os.path.getsize(self.caminho_particao(mes))) for mes in meses)
+            if assinatura != self._assinatura:
+                por_op, por_op_produto = {}, {}
+                for mes in meses:
+                    for cod_op, id_produto, qtd in self._resumo_valido(mes)["somas"]:
+                        por_op[cod_op] = por_op.get(cod_op, 0) + qtd
+                        chave = (cod_op, id_produto)
+                        por_op_produto[chave] = por_op_produto.get(chave, 0) + qtd
+                self._por_op, self._por_op_produto, self._assinatura = por_op, por_op_produto, assinatura
+            return self._por_op, self._por_op_produto
+
+    # ---------- Rotação ----------
+
+    def _concluir_rotacao(self) -> list[str]:
+        """Aplica as substituições listadas no diário de rotação (se houver) e refaz os resumos."""
+        caminho_diario = os.path.join(self.pasta, DIARIO_ROTACAO)
+        if not os.path.exists(caminho_diario):
+            return []
+        with open(caminho_diario, "r", encoding="utf-8") as arq:
+            rotacao = json.load(arq)
+        self._preservar_gravacoes_tardias(rotacao["aberto"], rotacao["tamanho_aberto"])
+        for destino in rotacao["arquivos"]:
+            if os.path.exists(destino + SUFIXO_ROTACAO):
+                os.replace(destino + SUFIXO_ROTACAO, destino)
+        for mes in rotacao["meses"]:
+            self.reconstruir_resumo(mes)
+        os.remove(caminho_diario)
+        self._assinatura = None
+        return rotacao["meses"]
+
+    @staticmethod
+    def _preservar_gravacoes_tardias(caminho_aberto: str, tamanho: int):
+        """Leituras anexadas ao arquivo aberto depois da confirmação também vão para o arquivo novo."""
+        novo = caminho_aberto + SUFIXO_ROTACAO
+        if not os.path.exists(novo) or os.path.getsize(caminho_aberto) <= tamanho:
+            return
+        with open(caminho_aberto, "rb") as atual, open(novo, "ab") as saida:
+            atual.seek(tamanho)
+            shutil.copyfileobj(atual, saida)
+            saida.flush()
+            os.fsync(saida.fileno())
+
+    def _descartar_sobras(self, caminho_aberto: str):
+        sobras = [caminho_aberto + SUFIXO_ROTACAO]
+        if os.path.isdir(self.pasta):
+            sobras += [os.path.join(self.pasta, n) for n in os.listdir(self.pasta) if n.endswith(SUFIXO_ROTACAO)]
+        for sobra in sobras:
+            if os.path.exists(sobra):
+                os.remove(sobra)
+                log.warning("Rotação interrompida descartada: %s", sobra)
+
+    def rotacionar(self, caminho_aberto: str, mes_atual: str = None) -> int:
+        """
+        Move do arquivo aberto para as partições as leituras de meses anteriores a
+        `mes_atual` (padrão: o mês corrente) e refaz os resumos desses meses. Deve rodar
+        sem gravações no arquivo aberto (ver DiarioRegistros.reescrever).
+
+        Retorna quantas leituras foram movidas.
+        """
+        mes_atual = mes_atual or datetime.now().strftime("%Y-%m")
+        with self._lock:
+            if self._concluir_rotacao():
+                log.warning("Rotação interrompida concluída a partir de %s", DIARIO_ROTACAO)
+            self._descartar_sobras(caminho_aberto)
+
+            movidas = self._rotacionar(caminho_aberto, mes_atual)
+            self.mes_rotacionado = mes_atual
+            return movidas
+
+    def _rotacionar(self, caminho_aberto: str, mes_atual: str) -> int:
+        if not os.path.exists(caminho_aberto):
+            return 0
+        inicio = time.perf_counter()
+        recuperar_linha_parcial(caminho_aberto)
+        tamanho_aberto = os.path.getsize(caminho_aberto)
+
+        with open(caminho_aberto, "r", encoding="utf-8", newline="") as arq:
+            leitor = csv.reader(arq)
+            colunas = [c.strip() for c in next(leitor, [])]
+            if "DATA" not in colunas:
+                return 0
+            i_data = colunas.index("DATA")
+            fechadas, restantes = {}, []
+            for valores in leitor:
+                mes = _mes_de(valores[i_data]) if len(valores) > i_data else None
+                if mes and mes < mes_atual:
+                    fechadas.setdefault(mes, []).append(valores)
+                else:
+                    restantes.append(valores)
+
+        if not fechadas:
+            return 0
+
+        os.makedirs(self.pasta, exist_ok=True)
+        destinos = []
+        for mes, linhas in sorted(fechadas.items()):
+            destino = self.caminho_particao(mes)
+            self._montar_particao(destino, colunas, linhas)
+            destinos.append(destino)
+        self._montar_aberto(caminho_aberto, colunas, restantes)
+        destinos.append(caminho_aberto)
+
+        # Ponto de confirmação: a partir daqui a rotação é concluída mesmo após uma queda
+        caminho_diario = os.path.join(self.pasta, DIARIO_ROTACAO)
+        _gravar_atomico(caminho_diario, json.dumps({
+            "arquivos": destinos, "meses": sorted(fechadas),
+            "aberto": caminho_aberto, "tamanho_aberto": tamanho_aberto,
+        }))
+        self._concluir_rotacao()
+
+        movidas = sum(len(linhas) for linhas in fechadas.values())
+        log.info("Registros rotacionados: %d leituras em %d partições (%.0f ms)", movidas, len(fechadas),
+                 (time.perf_counter() - inicio) * 1000,
+                 extra={"campos": {"meses": ",".join(sorted(fechadas)), "restantes": len(restantes)}})
+        return movidas
+
+    @staticmethod
+    def _montar_aberto(caminho: str, colunas: list[str], linhas: list[list]):
+        """Arquivo aberto só com as leituras que ficam, em `caminho`+SUFIXO_ROTACAO."""
+        with open(caminho + SUFIXO_ROTACAO, "w", encoding="utf-8", newline="") as saida:
+            escritor = csv.writer(saida, lineterminator="\n")
+            escritor.writerow(colunas)
+            escritor.writerows(linhas)
+            saida.flush()
+            os.fsync(saida.fileno())
+
+    @staticmethod
+    def _montar_particao(destino: str, colunas: list[str], linhas: list[list]):
+        """Partição existente + linhas novas em `destino`+SUFIXO_ROTACAO, no cabeçalho da partição."""
+        temporario = destino + SUFIXO_ROTACAO
+        with open(temporario, "w", encoding="utf-8", newline="") as saida:
+            colunas_particao = colunas
+            if os.path.exists(destino) and os.path.getsize(destino) > 0:
+                with open(destino, "r", encoding="utf-8", newline="") as atual:
+                    colunas_particao = [c.strip() for c in next(csv.reader([atual.readline()]), [])]
+                    atual.seek(0)
+                    shutil.copyfileobj(atual, saida)
+            else:
+                csv.writer(saida, lineterminator="\n").writerow(colunas)
+
+            escritor = csv.writer(saida, lineterminator="\n")
+            if colunas_particao == colunas:
+                escritor.writerows(linhas)
+            else:
+                escritor.writerows([dict(zip(colunas, v)).get(c, "") for c in colunas_particao] for v in linhas)
+            saida.flush()
+            os.fsync(saida.fileno())
+
+
+_particoes = None
+_particoes_lock = threading.Lock()
+
+
+def pasta_particoes() -> str:
+    """PARTICOES_REGISTROS_PATH ou, sem ela, "registros_particoes" ao lado do registros.csv."""
+    config = obter_configuracao()
+    return config.particoes_registros_path or os.path.join(
+        os.path.dirname(os.path.abspath(config.registros_csv_path)), "registros_particoes"
+    )
+
+
+def obter_particoes() -> ParticoesRegistros:
+    global _particoes
+    if _particoes is None:
+        with _particoes_lock:
+            if _particoes is None:
+                _particoes = ParticoesRegistros(pasta_particoes())
+    return _particoes
+
+
+# ---------- Manutenção ----------
+
+def verificar(particoes: ParticoesRegistros, caminho_aberto: str) -> int:
+    """Confere cada resumo com a partição bruta; retorna a quantidade de problemas encontrados."""
+    problemas = 0
+    if os.path.exists(os.path.join(particoes.pasta, DIARIO_ROTACAO)):
+        print(f"[AVISO] Rotação pendente em {particoes.pasta}; será concluída na próxima partida")
+        problemas += 1
+
+    for mes in particoes.meses():
+        bruto = particoes.resumir(mes)
+        salvo = particoes.ler_resumo(mes)
+        if salvo is None:
+            print(f"[ERRO] {mes}: resumo ausente")
+            problemas += 1
+        elif any(salvo.get(c) != bruto[c] for c in ("linhas", "tamanho", "somas")):
+            print(f"[ERRO] {mes}: resumo divergente da partição "
+                  f"({salvo.get('linhas')} × {bruto['linhas']} leituras)")
+            problemas += 1
+        else:
+            print(f"[OK] {mes}: {bruto['linhas']} leituras, {len(bruto['somas'])} OP/produto")
+        if bruto["fora_do_mes"]:
+            print(f"[ERRO] {mes}: {bruto['fora_do_mes']} leituras com DATA fora do mês")
+            problemas += 1
+
+    if os.path.exists(caminho_aberto):
+        mes_atual = datetime.now().strftime("%Y-%m")
+        with open(caminho_aberto, "r", encoding="utf-8", newline="") as arq:
+            atrasadas = sum(1 for linha in csv.DictReader(arq) if (_mes_de(linha.get("DATA")) or mes_atual) < mes_atual)
+        if atrasadas:
+            print(f"[AVISO] {atrasadas} leituras de meses fechados ainda em {caminho_aberto} (aguardando rotação)")
+    return problemas
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Manutenção das partições mensais do registros.csv")
+    parser.add_argument("comando", choices=("verificar", "reconstruir", "rotacionar"))
+    args = parser.parse_args(argv)
+
+    particoes = obter_particoes()
+    caminho_aberto = os.path.abspath(obter_configuracao().registros_csv_path)
+
+    if args.comando == "verificar":
+        problemas = verificar(particoes, caminho_aberto)
+        print(f"[{'ERRO' if problemas else 'OK'}] {problemas} problema(s) em {particoes.pasta}")
+        return 1 if problemas else 0
+
+    if args.comando == "reconstruir":
+        # Mesma trava do diário: nenhum worker rotaciona enquanto os resumos são refeitos
+        with TravaArquivo(caminho_aberto + ".lock"):
+            for mes in particoes.meses():
+                resumo = particoes.reconstruir_resumo(mes)
+                print(f"[OK] {mes}: resumo refeito ({resumo['linhas']} leituras)")
+        return 0
+
+    movidas = obter_diario().reescrever(particoes.rotacionar)
+    print(f"[OK] {movidas} leituras movidas para {particoes.pasta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
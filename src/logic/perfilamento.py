@@ -0,0 +1,271 @@
+#src/logic/perfilamento.py
+import asyncio
+import itertools
+import sys
+import threading
+import time
+from collections import Counter, deque
+from urllib.parse import parse_qs
+
+from src.logic.configuracao import obter_configuracao
+from src.logic.log import obter_logger
+
+log = obter_logger("perfilamento")
+
+# Perfil automático de requisições mais lentas que este limite (0 desliga)
+PERFIL_LIMITE_LENTO_MS = obter_configuracao().perfil_limite_lento_ms
+PERFIL_INTERVALO_MS = obter_configuracao().perfil_intervalo_ms
+PERFIL_MAX_GUARDADOS = obter_configuracao().perfil_max_guardados
+PERFIL_MAX_SEGUNDOS = obter_configuracao().perfil_max_segundos
+
+CABECALHO_PERFILAR = b"x-perfilar"
+CABECALHO_PERFIL_ID = b"x-perfil-id"
+
+# Folhas de pilha de threads paradas esperando trabalho (pool ocioso, event loop no select)
+_FOLHAS_OCIOSAS = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+}
+
+_amostradores_ativos = set()  # idents das threads de amostragem, que não entram nos perfis
+
+
+def _quadro(codigo) -> str:
+    arquivo = codigo.co_filename.replace("\\", "/")
+    if "/src/" in arquivo:
+        arquivo = "src/" + arquivo.rsplit("/src/", 1)[1]
+    else:
+        arquivo = arquivo.rsplit("/", 1)[-1]
+    return f"{codigo.co_name} ({arquivo}:{codigo.co_firstlineno})"
+
+
+def _pilha(frame) -> tuple:
+    codigos = []
+    while frame is not None:
+        codigos.append(frame.f_code)
+        frame = frame.f_back
+    codigos.reverse()
+    return tuple(codigos)
+
+
+def _ociosa(pilha: tuple) -> bool:
+    folha = pilha[-1]
+    return (folha.co_filename.replace("\\", "/").rsplit("/", 1)[-1], folha.co_name) in _FOLHAS_OCIOSAS
+
+
+class Amostrador:
+    """
+    Profiler por amostragem: a cada `intervalo` segundos lê a pilha de todas as threads
+    (sys._current_frames) e conta quantas vezes cada pilha aparece.
+
+    Amostra todas as threads porque uma requisição passa pelo event loop, pelo
+    EXECUTOR_DADOS e pelo EXECUTOR_CONSULTAS; threads ociosas são descartadas, mas
+    requisições simultâneas aparecem juntas no mesmo perfil.
+    """
+
+    def __init__(self, intervalo: float = PERFIL_INTERVALO_MS / 1000, limite: float = PERFIL_MAX_SEGUNDOS):
+        self.intervalo = intervalo
+        self.limite = limite
+        self.amostras = 0
+        self._pilhas = Counter()
+        self._parar = threading.Event()
+        self._thread = None
+        self.iniciado_em = None
+
+    @property
+    def ativo(self) -> bool:
+        return self._thread is not None
+
+    def iniciar(self) -> None:
+        if self._thread is not None:
+            return
+        self.iniciado_em = time.perf_counter()
+        self._thread = threading.Thread(target=self._rodar, name="perfilamento", daemon=True)
+        self._thread.start()
+
+    def _rodar(self):
+        proprio = threading.get_ident()
+        _amostradores_ativos.add(proprio)
+        try:
+            fim = time.monotonic() + self.limite
+            while not self._parar.wait(self.intervalo) and time.monotonic() < fim:
+                for ident, frame in sys._current_frames().items():
+                    if ident in _amostradores_ativos:
+                        continue
+                    pilha = _pilha(frame)
+                    if pilha and not _ociosa(pilha):
+                        self._pilhas[pilha] += 1
+                self.amostras += 1
+        finally:
+            _amostradores_ativos.discard(proprio)
+
+    def parar(self) -> dict:
+        """Encerra a amostragem e resume as pilhas (formato 'folded' e tempo por função)."""
+        if self._thread is None:
+            return {}
+        self._parar.set()
+        self._thread.join()
+        duracao = time.perf_counter() - self.iniciado_em
+
+        nomes = {}
+
+        def nome(codigo):
+            if codigo not in nomes:
+                nomes[codigo] = _quadro(codigo)
+            return nomes[codigo]
+
+        proprias, totais = Counter(), Counter()
+        for pilha, vezes in self._pilhas.items():
+            proprias[pilha[-1]] += vezes
+            for codigo in set(pilha):
+                totais[codigo] += vezes
+
+        ocupadas = sum(self._pilhas.values())
+        return {
+            "amostras": self.amostras,
+            "pilhas_ocupadas": ocupadas,
+            "intervalo_ms": round(self.intervalo * 1000, 3),
+            "duracao_amostrada_ms": round(duracao * 1000, 1),
+            "funcoes": [
+                {"funcao": nome(codigo), "proprias": proprias[codigo], "total": vezes}
+                for codigo, vezes in totais.most_common(50)
+            ],
+            "pilhas": [
+                {"pilha": ";".join(nome(c) for c in pilha), "amostras": vezes}
+                for pilha, vezes in self._pilhas.most_common(300)
+            ],
+        }
+
+
+class RegistroPerfis:
+    """Guarda os últimos N perfis capturados, do mais recente para o mais antigo."""
+
+    def __init__(self, maximo: int = PERFIL_MAX_GUARDADOS):
+        self._lock = threading.Lock()
+        self._perfis = deque(maxlen=maximo)
+        self._ids = itertools.count(1)
+
+    def novo_id(self) -> int:
+        return next(self._ids)
+
+    def guardar(self, perfil: dict) -> None:
+        with self._lock:
+            self._perfis.appendleft(perfil)
+
+    def listar(self) -> list[dict]:
+        with self._lock:
+            perfis = list(self._perfis)
+        return [{k: v for k, v in p.items() if k not in ("funcoes", "pilhas")} for p in perfis]
+
+    def obter(self, perfil_id: int):
+        with self._lock:
+            return next((p for p in self._perfis if p["id"] == perfil_id), None)
+
+
+_registro_perfis = RegistroPerfis()
+
+
+def obter_registro_perfis() -> RegistroPerfis:
+    return _registro_perfis
+
+
+def como_folded(perfil: dict) -> str:
+    """Pilhas no formato 'folded' (uma por linha), aceito por flamegraph.pl e speedscope."""
+    return "".join(f"{p['pilha']} {p['amostras']}\n" for p in perfil.get("pilhas", []))
+
+
+def _pedido_manual(scope) -> bool:
+    if b"perfilar" in scope.get("query_string", b""):
+        valores = parse_qs(scope["query_string"].decode("latin-1")).get("perfilar", [])
+        if any(v not in ("", "0", "false") for v in valores):
+            return True
+    return any(nome == CABECALHO_PERFILAR and valor not in (b"", b"0") for nome, valor in scope.get("headers", ()))
+
+
+class MiddlewarePerfil:
+    """
+    Middleware ASGI que captura o perfil de uma requisição:
+      - pedido explícito (cabeçalho X-Perfilar: 1 ou ?perfilar=1), se `autorizado(scope)`
+        permitir; a resposta traz o cabeçalho X-Perfil-Id;
+      - automático, quando a requisição passa de PERFIL_LIMITE_LENTO_MS; a amostragem
+        começa ao atingir o limite, então o perfil cobre só o trecho lento. Só começa
+        se nenhum outro amostrador estiver ativo: cada um já lê a pilha de todas as
+        threads, e vários juntos só disputariam o GIL e repetiriam o mesmo perfil.
+    Sem pedido e com o limite desligado, a requisição segue direto, sem custo extra.
+    """
+
+    def __init__(self, app, autorizado, ignorar: tuple = ()):
+        self.app = app
+        self.autorizado = autorizado
+        self.ignorar = tuple(ignorar)
+        self._ativos = 0  # amostradores rodando (só alterado no event loop)
+
+    def _iniciar(self, amostrador: Amostrador, automatico: bool) -> None:
+        if automatico and self._ativos:
+            log.debug("Perfil automático ignorado: já há um amostrador ativo")
+            return
+        self._ativos += 1
+        amostrador.iniciar()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path", "").startswith(self.ignorar):
+            await self.app(scope, receive, send)
+            return
+
+        manual = _pedido_manual(scope) and self.autorizado(scope)
+        if not manual and PERFIL_LIMITE_LENTO_MS <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        registro = obter_registro_perfis()
+        perfil_id = registro.novo_id()
+        amostrador = Amostrador()
+        inicio = time.perf_counter()
+        status = 500
+        agendado = None
+        if manual:
+            self._iniciar(amostrador, automatico=False)
+        else:
+            agendado = asyncio.get_running_loop().call_later(
+                PERFIL_LIMITE_LENTO_MS / 1000, self._iniciar, amostrador, True
+            )
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+                if manual:
+                    cabecalhos = list(mensagem.get("headers", ()))
+                    cabecalhos.append((CABECALHO_PERFIL_ID, str(perfil_id).encode()))
+                    mensagem = {**mensagem, "headers": cabecalhos}
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            if agendado is not None:
+                agendado.cancel()
+            if amostrador.ativo:
+                try:
+                    resultado = await asyncio.get_running_loop().run_in_executor(None, amostrador.parar)
+                finally:
+                    self._ativos -= 1
+                rota = getattr(scope.get("route"), "path", None) or scope.get("path", "")
+                duracao_ms = (time.perf_counter() - inicio) * 1000
+                registro.guardar({
+                    "id": perfil_id,
+                    "motivo": "pedido" if manual else "lenta",
+                    "metodo": scope.get("method", ""),
+                    "rota": rota,
+                    "caminho": scope.get("path", ""),
+                    "consulta": scope.get("query_string", b"").decode("latin-1"),
+                    "status": status,
+                    "quando": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "duracao_ms": round(duracao_ms, 1),
+                    **resultado,
+                })
+                log.info("Perfil %d capturado", perfil_id,
+                         extra={"campos": {"rota": rota, "duracao_ms": round(duracao_ms, 1),
+                                           "motivo": "pedido" if manual else "lenta"}})
@@ -0,0 +1,64 @@
+#src/logic/serializacao.py
+import json
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; sem ele usa o json da biblioteca padrão
+    orjson = None
+
+
+def _padrao(valor):
+    # Tipos que nenhum dos encoders serializa sozinho
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    # Tipos do numpy só existem se ele já foi importado (pelo pandas); não o importa à toa
+    np = sys.modules.get("numpy")
+    if np is not None:
+        if isinstance(valor, np.integer):
+            return int(valor)
+        if isinstance(valor, np.floating):
+            return float(valor)
+        if isinstance(valor, np.ndarray):
+            return valor.tolist()
+    raise TypeError(f"Tipo não serializável em JSON: {type(valor).__name__}")
+
+
+def dumps_json(dados) -> bytes:
+    """Serializa para JSON com orjson (quando instalado) ou json."""
+    if orjson is not None:
+        return orjson.dumps(dados, default=_padrao, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(dados, default=_padrao, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _lista_coluna(serie) -> list:
+    import pandas as pd
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        texto = serie.dt.strftime("%Y-%m-%dT%H:%M:%S")
+        return texto.where(serie.notna(), None).tolist()
+    if pd.api.types.is_float_dtype(serie):
+        return serie.astype(object).where(serie.notna(), None).tolist()
+    return serie.where(serie.notna(), None).tolist()
+
+
+def para_colunar(df, categoricas: tuple = ()) -> dict:
+    """
+    Converte o DataFrame para o formato colunar: nomes de coluna uma única vez,
+    uma lista de valores por coluna e, nas colunas categóricas, códigos inteiros
+    que apontam para o dicionário de valores da coluna (-1 = nulo).
+    """
+    dados, dicionarios = {}, {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if coluna in categoricas:
+            import pandas as pd
+            codigos, valores = pd.factorize(serie, use_na_sentinel=True)
+            dados[coluna] = codigos.tolist()
+            dicionarios[coluna] = valores.tolist()
+        else:
+            dados[coluna] = _lista_coluna(serie)
+    return {"colunas": list(df.columns), "dados": dados, "dicionarios": dicionarios}
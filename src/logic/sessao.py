@@ -0,0 +1,87 @@
+#src/logic/sessao.py
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+
+from src.logic.configuracao import obter_configuracao
+from src.logic.log import obter_logger
+
+log = obter_logger("sessao")
+
+# Nome do cookie que guarda o token de sessão
+COOKIE_SESSAO = "sessao"
+
+_segredo = None
+
+
+def _segredo_gerado() -> str:
+    """
+    Segredo aleatório gravado ao lado do registros.csv: o primeiro worker a subir o cria
+    (O_EXCL) e os demais o leem, então um token vale em qualquer worker.
+    """
+    caminho = os.path.join(os.path.dirname(os.path.abspath(obter_configuracao().registros_csv_path)), ".sessao_segredo")
+    try:
+        fd = os.open(caminho, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(fd, "w", encoding="utf-8") as arq:
+            arq.write(secrets.token_hex(32))
+    log.warning("SESSAO_SEGREDO não definido; usando o segredo gerado em %s", caminho)
+    for _ in range(50):
+        # Outro worker pode ter criado o arquivo e ainda não ter escrito o segredo
+        with open(caminho, "r", encoding="utf-8") as arq:
+            segredo = arq.read().strip()
+        if segredo:
+            return segredo
+        time.sleep(0.02)
+    raise RuntimeError(f"Segredo de sessão vazio em {caminho}")
+
+
+def _obter_segredo() -> bytes:
+    global _segredo
+    if _segredo is None:
+        segredo = obter_configuracao().sessao_segredo or _segredo_gerado()
+        _segredo = segredo.encode("utf-8")
+    return _segredo
+
+
+def _b64(dados: bytes) -> str:
+    return base64.urlsafe_b64encode(dados).rstrip(b"=").decode("ascii")
+
+
+def _assinar(corpo: str) -> str:
+    return _b64(hmac.new(_obter_segredo(), corpo.encode("ascii"), hashlib.sha256).digest())
+
+
+def duracao_sessao() -> int:
+    """Validade do token em segundos (SESSAO_DURACAO_HORAS, padrão 12h)."""
+    return int(obter_configuracao().sessao_duracao_horas * 3600)
+
+
+def criar_token(login: str, duracao: int = None) -> str:
+    """Token "corpo.assinatura": corpo com o login e a expiração, assinado com HMAC-SHA256."""
+    expira = int(time.time()) + (duracao_sessao() if duracao is None else duracao)
+    corpo = _b64(json.dumps({"u": login, "exp": expira}, separators=(",", ":")).encode("utf-8"))
+    return f"{corpo}.{_assinar(corpo)}"
+
+
+def verificar_token(token: str):
+    """Login do token se a assinatura confere (comparação em tempo constante) e não expirou; senão None."""
+    if not token or token.count(".") != 1:
+        return None
+    corpo, assinatura = token.split(".")
+    try:
+        # Em bytes: compare_digest recusa (TypeError) str com caracteres fora do ASCII
+        if not hmac.compare_digest(_assinar(corpo).encode("ascii"), assinatura.encode("utf-8", errors="replace")):
+            return None
+        dados = json.loads(base64.urlsafe_b64decode(corpo + "=" * (-len(corpo) % 4)))
+    except (ValueError, UnicodeError):
+        return None
+    if not isinstance(dados, dict) or dados.get("exp", 0) < time.time():
+        return None
+    return dados.get("u")
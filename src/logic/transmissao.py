@@ -0,0 +1,63 @@
+#src/logic/transmissao.py
+import asyncio
+import threading
+
+# Evento enviado a um assinante que ficou para trás e perdeu eventos: ele deve recarregar os dados
+EVENTO_RESINCRONIZAR = {"tipo": "resincronizar"}
+
+
+class Transmissor:
+    """
+    Difusor de eventos em processo: um único ponto de publicação para todos os
+    assinantes (conexões SSE do painel).
+
+    `publicar` pode ser chamado de qualquer thread; cada assinante tem uma fila no seu
+    event loop. Um assinante lento cuja fila enche perde os eventos pendentes e recebe
+    EVENTO_RESINCRONIZAR, sem atrasar os demais nem quem publicou.
+    """
+
+    def __init__(self, max_fila: int = 256):
+        self.max_fila = max_fila
+        self._lock = threading.Lock()
+        self._assinantes = {}  # fila -> event loop da conexão
+
+    def assinar(self) -> asyncio.Queue:
+        """Cria a fila de um novo assinante (chamado dentro do event loop da conexão)."""
+        fila = asyncio.Queue(self.max_fila)
+        with self._lock:
+            self._assinantes[fila] = asyncio.get_running_loop()
+        return fila
+
+    def cancelar(self, fila: asyncio.Queue) -> None:
+        with self._lock:
+            self._assinantes.pop(fila, None)
+
+    @property
+    def total_assinantes(self) -> int:
+        return len(self._assinantes)
+
+    @staticmethod
+    def _entregar(fila: asyncio.Queue, evento: dict):
+        try:
+            fila.put_nowait(evento)
+        except asyncio.QueueFull:
+            while not fila.empty():
+                fila.get_nowait()
+            fila.put_nowait(EVENTO_RESINCRONIZAR)
+
+    def publicar(self, evento: dict) -> None:
+        with self._lock:
+            assinantes = list(self._assinantes.items())
+        for fila, loop in assinantes:
+            try:
+                loop.call_soon_threadsafe(self._entregar, fila, evento)
+            except RuntimeError:
+                # Event loop já encerrado: a conexão não existe mais
+                self.cancelar(fila)
+
+
+_transmissor = Transmissor()
+
+
+def obter_transmissor() -> Transmissor:
+    return _transmissor
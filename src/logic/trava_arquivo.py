@@ -0,0 +1,75 @@
+#src/logic/trava_arquivo.py
+import os
+import threading
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+class TravaArquivo:
+    """
+    Trava exclusiva entre processos (workers do uvicorn, leitor de mesa) sobre um
+    arquivo auxiliar: fcntl.flock no Linux/macOS e msvcrt.locking no Windows.
+
+    Dentro do processo funciona como um RLock: a mesma thread pode adquiri-la de novo
+    e as demais threads esperam. Use como gerenciador de contexto.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = os.path.abspath(caminho)
+        self._rlock = threading.RLock()
+        self._fd = None
+        self._nivel = 0
+
+    def adquirir(self) -> None:
+        self._rlock.acquire()
+        if self._nivel == 0:
+            try:
+                self._travar()
+            except BaseException:
+                self._rlock.release()
+                raise
+        self._nivel += 1
+
+    def liberar(self) -> None:
+        self._nivel -= 1
+        if self._nivel == 0:
+            self._destravar()
+        self._rlock.release()
+
+    def __enter__(self):
+        self.adquirir()
+        return self
+
+    def __exit__(self, *excecao):
+        self.liberar()
+
+    def _travar(self):
+        if self._fd is None:
+            os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+            self._fd = os.open(self.caminho, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.name == "nt":
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            while True:
+                try:
+                    msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+                    return
+                except OSError:
+                    # LK_LOCK desiste depois de ~10 tentativas de 1 s; continua esperando
+                    continue
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def _destravar(self):
+        if os.name == "nt":
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def fechar(self) -> None:
+        with self._rlock:
+            if self._fd is not None and self._nivel == 0:
+                os.close(self._fd)
+                self._fd = None
@@ -1,6 +1,117 @@
 #src/logic/usuario.py
-import pandas as pd
+import csv
+import hashlib
+import hmac
 import os
+import secrets
+import threading
+
+from src.logic.configuracao import obter_configuracao
+from src.logic.log import obter_logger
+
+log = obter_logger("usuario")
+
+# Caminho do arquivo de usuários (USUARIOS_CSV_PATH no ambiente substitui o padrão)
+USUARIOS_CSV_PATH = obter_configuracao().usuarios_csv_path
+
+# Prefixo das senhas já gravadas como hash no usuarios.csv (ver gerar_hash_senha)
+PREFIXO_PBKDF2 = "pbkdf2_sha256"
+
+
+def gerar_hash_senha(senha: str, iteracoes: int = 200_000) -> str:
+    """Gera o valor da coluna SENHA com hash PBKDF2 ("pbkdf2_sha256$iteracoes$sal$hash")."""
+    sal = secrets.token_bytes(16)
+    resumo = hashlib.pbkdf2_hmac("sha256", senha.encode("utf-8"), sal, iteracoes)
+    return f"{PREFIXO_PBKDF2}${iteracoes}${sal.hex()}${resumo.hex()}"
+
+
+def _verificador(senha: str) -> tuple:
+    """
+    Converte a SENHA do arquivo em (iteracoes, sal, hash). Senhas em texto puro
+    (legado) ficam em memória só como SHA-256 com sal aleatório.
+    """
+    if senha.startswith(PREFIXO_PBKDF2 + "$"):
+        _, iteracoes, sal, resumo = senha.split("$")
+        return int(iteracoes), bytes.fromhex(sal), bytes.fromhex(resumo)
+    sal = secrets.token_bytes(16)
+    return 0, sal, hashlib.sha256(sal + senha.encode("utf-8")).digest()
+
+
+def _calcular(senha: str, iteracoes: int, sal: bytes) -> bytes:
+    if iteracoes:
+        return hashlib.pbkdf2_hmac("sha256", senha.encode("utf-8"), sal, iteracoes)
+    return hashlib.sha256(sal + senha.encode("utf-8")).digest()
+
+
+class IndiceUsuarios:
+    """
+    Usuários do usuarios.csv em memória (login -> dados e hash da senha).
+
+    O arquivo é relido só quando muda (mtime/tamanho); autenticar e conferir se um
+    login continua ativo são buscas em dicionário, sem pandas.
+    """
+
+    def __init__(self, caminho: str = USUARIOS_CSV_PATH):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._usuarios = {}
+        self._assinatura = None
+        self._falso = _verificador(secrets.token_hex(8))
+
+    def _recarregar(self, assinatura):
+        usuarios = {}
+        with open(self.caminho, "r", encoding="utf-8-sig", newline="") as arq:
+            for linha in csv.DictReader(arq):
+                linha = {str(k).strip(): str(v or "").strip() for k, v in linha.items() if k}
+                login = linha.get("LOGIN")
+                if not login:
+                    continue
+                senha = linha.pop("SENHA", "")
+                usuarios[login] = (linha, _verificador(senha))
+        self._usuarios = usuarios
+        self._assinatura = assinatura
+        log.info("%d usuários carregados", len(usuarios))
+
+    def _verificar(self):
+        estado = os.stat(self.caminho)
+        assinatura = (estado.st_mtime_ns, estado.st_size)
+        if assinatura != self._assinatura:
+            with self._lock:
+                if assinatura != self._assinatura:
+                    self._recarregar(assinatura)
+
+    def autenticar(self, login: str, senha: str):
+        """Dados do usuário (sem a senha) se login e senha conferem e ele está ativo; senão None."""
+        self._verificar()
+        entrada = self._usuarios.get((login or "").strip())
+        dados, (iteracoes, sal, resumo) = entrada if entrada else (None, self._falso)
+        # Mesmo custo para login inexistente, e comparação em tempo constante
+        confere = hmac.compare_digest(_calcular((senha or "").strip(), iteracoes, sal), resumo)
+        if dados is None or not confere or dados.get("ATIVO") != "S":
+            return None
+        return dict(dados)
+
+    def usuario_ativo(self, login: str):
+        """Dados do usuário se o login existe e está ativo; senão None."""
+        self._verificar()
+        entrada = self._usuarios.get(login)
+        if entrada is None or entrada[0].get("ATIVO") != "S":
+            return None
+        return dict(entrada[0])
+
+
+_indice_usuarios = None
+_indice_usuarios_lock = threading.Lock()
+
+
+def obter_indice_usuarios() -> IndiceUsuarios:
+    global _indice_usuarios
+    if _indice_usuarios is None:
+        with _indice_usuarios_lock:
+            if _indice_usuarios is None:
+                _indice_usuarios = IndiceUsuarios(obter_configuracao().usuarios_csv_path)
+    return _indice_usuarios
+
 
 # Função para autenticar usuário
 def autenticar_usuario(login, senha):
@@ -15,34 +126,11 @@ def autenticar_usuario(login, senha):
         dict: Dados do usuário (ID, login, nome, etc.) caso o login e senha estejam corretos,
         ou None caso contrário.
     """
-    usuarios_file = os.path.join(os.path.dirname(__file__), '..', 'files', 'usuarios.csv')
-
     try:
-        # Lê o arquivo CSV com o separador correto (verifique se é ponto e vírgula)
-        df_usuarios = pd.read_csv(usuarios_file, sep=',')
-
-        # Remover espaços extras nas colunas
-        df_usuarios.columns = df_usuarios.columns.str.strip()
-
-        # Converte as colunas relevantes para string
-        df_usuarios['LOGIN'] = df_usuarios['LOGIN'].astype(str).str.strip()
-        df_usuarios['SENHA'] = df_usuarios['SENHA'].astype(str).str.strip()
-        df_usuarios['ATIVO'] = df_usuarios['ATIVO'].astype(str).str.strip()
-
-        # Imprime as colunas para depuração
-        print("[INFO] Colunas carregadas:", df_usuarios.columns)
-
-        # Verifica se o login e a senha existem no dataframe
-        usuario = df_usuarios[(df_usuarios['LOGIN'] == login.strip()) &
-                            (df_usuarios['SENHA'] == senha.strip()) &
-                            (df_usuarios['ATIVO'] == 'S')]
-
-        if not usuario.empty:
-            # Retorna os dados do usuário como um dicionário
-            return usuario.iloc[0].to_dict()
-        else:
-            print("[ERRO] Usuário ou senha incorretos ou usuário inativo.")
-            return None
+        usuario = obter_indice_usuarios().autenticar(login, senha)
+        if usuario is None:
+            log.warning("Usuário ou senha incorretos ou usuário inativo.", extra={"campos": {"login": login}})
+        return usuario
     except Exception as e:
-        print(f"[ERRO] Falha na autenticação: {e}")
+        log.error("Falha na autenticação: %s", e)
         return None
@@ -1,26 +1,171 @@
-from fastapi import FastAPI, Request, Form, Body
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+import time
+_INICIO_PARTIDA = time.perf_counter()
+
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Request, Form, Body, Depends, HTTPException
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timedelta
+import asyncio
 import os
-import pandas as pd
-
-from src.logic.usuario import autenticar_usuario
-from src.logic.consulta_ops import carregar_ops_intervalo
 
-# 🕽 Load env
-load_dotenv()
+# pandas, numpy e o driver do Firebird (via consulta_ops) só são importados no primeiro uso
+# ou no aquecimento da partida; assim a importação deste módulo fica leve
+from src.logic.configuracao import obter_configuracao
+from src.logic.usuario import autenticar_usuario, obter_indice_usuarios
+from src.logic.sessao import COOKIE_SESSAO, criar_token, duracao_sessao, verificar_token
+from src.database import conexao
+from src.logic.cache_ops import invalidar_cache_ops, obter_cache_dias, obter_cache_op, obter_cache_ops
+from src.logic.execucao import em_thread
+from src.logic.indice_codigos import (
+    MENSAGENS_MOTIVO, MOTIVO_DADOS_INCOMPLETOS, MOTIVO_OPS_INDISPONIVEIS, codigos_validos, obter_indice_codigos,
+    obter_ops_abertas
+)
+from src.logic.serializacao import dumps_json, para_colunar
+from src.logic.exportacao import COLUNAS_EXPORTACAO_OPS, FORMATOS_EXPORTACAO, gerar_exportacao
+from src.logic.diario_registros import COLUNAS_REGISTROS
+from src.logic.armazem_leituras import obter_armazem
+from src.logic.transmissao import obter_transmissor
+from src.logic.log import obter_logger
+from src.logic.perfilamento import MiddlewarePerfil, como_folded, obter_registro_perfis
+from src.logic.metricas import (
+    LEITURAS, LEITURAS_REJEITADAS, REGISTRO, Medidor, MiddlewareMetricas, medir_etapa
+)
+
+log = obter_logger("main_web")
+
+# Tempos da partida do worker (segundos), expostos em /metrics
+PARTIDA = {}
+
+def _atualizar_ops_abertas() -> int:
+    from src.logic.consulta_ops import atualizar_ops_abertas
+    return atualizar_ops_abertas()
+
+def _aquecer() -> int:
+    from src.logic.consulta_ops import aquecer
+    return aquecer()
+
+# 🕽 Atualização periódica do índice de OPs abertas (leitura sem escolher a OP). Com
+# AQUECER_NA_PARTIDA a primeira carga é o aquecimento: pandas, pool do ERP e cache de dias
+# ficam prontos em segundo plano, antes da primeira requisição do painel. Na virada do mês,
+# o mesmo ciclo move o mês fechado do registros.csv para a sua partição
+async def _manter_ops_abertas():
+    config = obter_configuracao()
+    if config.aquecer_na_partida:
+        inicio = time.perf_counter()
+        try:
+            total = await em_thread(_aquecer)
+            PARTIDA["aquecimento"] = time.perf_counter() - inicio
+            log.info("Aquecimento concluído em %.0f ms (%d OPs abertas)", PARTIDA["aquecimento"] * 1000, total)
+        except Exception as e:
+            log.error("Falha no aquecimento: %s", e)
+    while True:
+        await asyncio.sleep(config.ops_abertas_intervalo)
+        try:
+            total = await em_thread(_atualizar_ops_abertas)
+            log.debug("Índice de OPs abertas atualizado (%d OPs)", total)
+        except Exception as e:
+            log.error("Falha ao atualizar OPs abertas: %s", e)
+        try:
+            await em_thread(obter_armazem().rotacionar)
+        except Exception as e:
+            log.error("Falha ao rotacionar registros: %s", e)
+
+# 🕽 Cada gravação no diário vira um evento com o novo total das OPs afetadas
+def _publicar_leituras(linhas):
+    transmissor = obter_transmissor()
+    if transmissor.total_assinantes:
+        from src.logic.consulta_ops import deltas_leituras
+        transmissor.publicar({"tipo": "leituras", "ops": deltas_leituras(linhas)})
+
+def _contar_leituras(linhas):
+    LEITURAS.inc(len(linhas))
+
+# 🕽 Com vários workers, leituras gravadas por outro processo também chegam aos painéis
+# conectados neste: o armazenamento é conferido periodicamente (só o trecho novo)
+async def _acompanhar_leituras(armazem):
+    intervalo = obter_configuracao().leituras_acompanhar_intervalo
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            await em_thread(armazem.acompanhar)
+        except Exception as e:
+            log.error("Falha ao acompanhar leituras de outros processos: %s", e)
+
+# 🕽 Ciclo de vida: abre o armazenamento de leituras (no CSV: recupera linha parcial, rotaciona
+# os meses fechados e monta o índice de quantidades), mantém o índice de OPs abertas e fecha o armazenamento no fim
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    armazem = obter_armazem()
+    armazem.ao_gravar(_contar_leituras)
+    armazem.ao_gravar(_publicar_leituras)
+    armazem.ao_gravar_externo(_publicar_leituras)
+    tarefa_ops_abertas = asyncio.create_task(_manter_ops_abertas())
+    tarefa_acompanhar = asyncio.create_task(_acompanhar_leituras(armazem))
+    PARTIDA["pronto"] = time.perf_counter() - _INICIO_PARTIDA
+    log.info("Servidor pronto em %.0f ms", PARTIDA["pronto"] * 1000)
+    yield
+    for tarefa in (tarefa_ops_abertas, tarefa_acompanhar):
+        tarefa.cancel()
+        with suppress(asyncio.CancelledError):
+            await tarefa
+    armazem.fechar()
 
 # 🕽 Inicializa app
-app = FastAPI()
+app = FastAPI(lifespan=ciclo_de_vida)
+app.add_middleware(MiddlewareMetricas)
 
 # 🕽 Caminhos
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "web", "templates"))
 app.mount("/static", StaticFiles(directory=os.path.join(BASE_DIR, "web", "static")), name="static")
 
+# ===========================
+# 🔐 Sessão
+# ===========================
+def _usuario_da_sessao(request: Request):
+    """Login do token de sessão (assinado e dentro da validade) de um usuário ainda ativo; senão None."""
+    login = verificar_token(request.cookies.get(COOKIE_SESSAO))
+    if login is None:
+        return None
+    try:
+        return login if obter_indice_usuarios().usuario_ativo(login) else None
+    except Exception as e:
+        log.error("Falha ao conferir a sessão: %s", e)
+        return None
+
+async def exigir_sessao(request: Request) -> str:
+    """Dependência das APIs: retorna o login da sessão ou responde 401."""
+    login = _usuario_da_sessao(request)
+    if login is None:
+        raise HTTPException(status_code=401, detail="Sessão inválida ou expirada")
+    return login
+
+async def exigir_sessao_pagina(request: Request) -> str:
+    """Dependência das páginas: retorna o login da sessão ou redireciona para o login."""
+    login = _usuario_da_sessao(request)
+    if login is None:
+        raise HTTPException(status_code=303, headers={"Location": "/"})
+    return login
+
+def _eh_admin(login: str) -> bool:
+    dados = obter_indice_usuarios().usuario_ativo(login) if login else None
+    return bool(dados) and dados.get("NIVEL_ACESSO", "").lower() == "admin"
+
+async def exigir_admin(login: str = Depends(exigir_sessao)) -> str:
+    """Dependência das APIs administrativas: exige um usuário com NIVEL_ACESSO admin."""
+    if not _eh_admin(login):
+        raise HTTPException(status_code=403, detail="Acesso restrito a administradores")
+    return login
+
+def _perfil_autorizado(scope) -> bool:
+    return _eh_admin(_usuario_da_sessao(Request(scope)))
+
+# Perfil sob demanda (admins) ou automático das requisições lentas; o SSE fica de fora por ser contínuo
+app.add_middleware(MiddlewarePerfil, autorizado=_perfil_autorizado,
+                   ignorar=("/api/ops/stream", "/static", "/metrics", "/api/admin/perfis"))
+
 # ===========================
 # 🔐 Tela de Login
 # ===========================
@@ -30,9 +175,11 @@ async def tela_login(request: Request):
 
 @app.post("/login", response_class=HTMLResponse)
 async def processa_login(request: Request, login: str = Form(...), senha: str = Form(...)):
-    if autenticar_usuario(login, senha):
+    usuario = await em_thread(autenticar_usuario, login, senha)
+    if usuario:
         response = RedirectResponse(url="/admin", status_code=302)
-        response.set_cookie(key="usuario", value=login)
+        response.set_cookie(key=COOKIE_SESSAO, value=criar_token(usuario["LOGIN"]), max_age=duracao_sessao(),
+                            httponly=True, samesite="lax")
         return response
     return templates.TemplateResponse("index.html", {"request": request, "erro": "Login inválido"})
 
@@ -40,7 +187,7 @@ async def processa_login(request: Request, login: str = Form(...), senha: str =
 # 📟 Painel Admin
 # ===========================
 @app.get("/admin", response_class=HTMLResponse)
-async def painel_admin(request: Request):
+async def painel_admin(request: Request, usuario: str = Depends(exigir_sessao_pagina)):
     return templates.TemplateResponse("admin_dashboard.html", {"request": request})
 
 # ===========================
@@ -52,7 +199,8 @@ async def filtros_por_data(data_inicio: str, data_fim: str, tipo_op: str = "ambo
         data_inicio_fmt = datetime.strptime(data_inicio, "%d/%m/%Y").strftime("%Y-%m-%d")
         data_fim_fmt = datetime.strptime(data_fim, "%d/%m/%Y").strftime("%Y-%m-%d")
 
-        df = carregar_ops_intervalo(data_inicio_fmt, data_fim_fmt, tipo_op=tipo_op)
+        from src.logic.consulta_ops import carregar_ops_intervalo_async
+        df = await carregar_ops_intervalo_async(data_inicio_fmt, data_fim_fmt, tipo_op=tipo_op)
         df.columns = df.columns.str.upper()
 
         subespecies = sorted(df['SUB_ESPECIE'].dropna().unique().tolist())
@@ -64,6 +212,43 @@ async def filtros_por_data(data_inicio: str, data_fim: str, tipo_op: str = "ambo
 # ===========================
 # 📊 API - Dados de OPs
 # ===========================
+# Colunas de poucos valores distintos, enviadas com dicionário no formato colunar
+COLUNAS_CATEGORICAS = ("STATUS", "ESPECIE", "SUB_ESPECIE", "TIPO_OP", "NOME_PRODUTO")
+
+def _montar_ops(df, limite: int = 0, cursor: str = "", formato: str = "registros"):
+    """
+    Classifica o status, ordena e pagina as OPs (executado fora do event loop).
+    No formato "colunar" já devolve o corpo JSON serializado.
+    """
+    import pandas as pd
+    from src.logic.consulta_ops import classificar_status, ordenar_ops, paginar_ops, resumir_por_especie
+
+    df.columns = df.columns.str.upper()
+    resposta = {"total": 0, "proximo_cursor": None, "resumo": {}}
+    pagina = pd.DataFrame()
+
+    if not df.empty and "CODIGO_OP" in df.columns:
+        with medir_etapa("status_ordenacao"):
+            # Regras de status customizadas (vetorizadas)
+            df["STATUS"] = classificar_status(df)
+
+            # Ordenação (Status > Subespécie > ID Produto) e paginação feitas no servidor
+            df = ordenar_ops(df)
+            pagina, proximo_cursor = paginar_ops(df, limite, cursor)
+            resposta = {
+                "total": len(df),
+                "proximo_cursor": proximo_cursor,
+                "resumo": resumir_por_especie(df),
+            }
+
+    with medir_etapa("serializacao"):
+        if formato == "colunar":
+            resposta.update(para_colunar(pagina, COLUNAS_CATEGORICAS))
+            return dumps_json(resposta)
+
+        resposta["ops"] = pagina.fillna(0).to_dict(orient="records")
+        return resposta
+
 @app.get("/api/ops")
 async def dados_ops(
     data_inicio: str,
@@ -71,56 +256,190 @@ async def dados_ops(
     subespecie: str = "todas",
     id_produto: str = "",
     cod_op: str = "",
-    tipo_op: str = "ambos"
+    tipo_op: str = "ambos",
+    limite: int = 0,
+    cursor: str = "",
+    formato: str = "registros"
 ):
-    print("[INFO] Início da função /api/ops")
+    from src.logic.consulta_ops import carregar_ops_intervalo_async, decodificar_cursor
+
+    # Só erros nos parâmetros viram 400; falhas do ERP não podem parecer um período vazio
     try:
         data_inicio_fmt = datetime.strptime(data_inicio, "%d/%m/%Y").strftime("%Y-%m-%d")
         data_fim_fmt = datetime.strptime(data_fim, "%d/%m/%Y").strftime("%Y-%m-%d")
+        if cursor:
+            decodificar_cursor(cursor)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"erro": str(e)})
 
-        df = carregar_ops_intervalo(data_inicio_fmt, data_fim_fmt, tipo_op=tipo_op)
-        df.columns = df.columns.str.upper()
-        print(f"[INFO] {len(df)} OPs carregadas")
-
-        # Regras de status customizadas
-        def classificar_status(row):
-            if row["QTD_REGISTRADA"] == 0:
-                return "🔴 Pendente"
-            elif row["QTD_REGISTRADA"] < row["QTD_PREVISTA"]:
-                return "✅ Registrando"
-            elif row["QTD_REGISTRADA"] == row["QTD_PREVISTA"]:
-                return "✅ Registro OK"
-            else:
-                return "⚠️ Registro a maior"
+    try:
+        # Filtros de subespécie, produto e OP vão para a consulta no ERP
+        codigos = [c.strip() for c in cod_op.split(",") if c.strip()] if cod_op else None
+        df = await carregar_ops_intervalo_async(
+            data_inicio_fmt, data_fim_fmt, codigos_op=codigos, tipo_op=tipo_op,
+            subespecie=subespecie, id_produto=id_produto
+        )
+        resultado = await em_thread(_montar_ops, df, limite, cursor, formato)
+        if isinstance(resultado, bytes):
+            return Response(content=resultado, media_type="application/json")
+        return resultado
+
+    except conexao.PoolEsgotado as e:
+        log.warning("ERP ocupado em /api/ops: %s", e)
+        return JSONResponse(status_code=503, content={"erro": str(e)})
+    except Exception as e:
+        log.error("Falha em /api/ops: %s", e)
+        return JSONResponse(status_code=500, content={"erro": str(e)})
 
-        df["STATUS"] = df.apply(classificar_status, axis=1)
+# ===========================
+# 📤 API - Exportação (CSV/XLSX em streaming)
+# ===========================
+def _resposta_exportacao(nome: str, formato: str, colunas: list[str], blocos) -> Response:
+    """Relatório enviado em partes: os primeiros bytes saem antes de a consulta terminar."""
+    return StreamingResponse(
+        gerar_exportacao(formato, colunas, blocos),
+        media_type=FORMATOS_EXPORTACAO[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome}.{formato}"'},
+    )
+
+def _periodo_exportacao(data_inicio: str, data_fim: str, formato: str) -> tuple[str, str]:
+    if formato not in FORMATOS_EXPORTACAO:
+        raise ValueError(f"Formato inválido: {formato} (use csv ou xlsx)")
+    inicio = datetime.strptime(data_inicio, "%d/%m/%Y").date()
+    fim = datetime.strptime(data_fim, "%d/%m/%Y").date()
+    if inicio > fim:
+        raise ValueError("A data de início não pode ser posterior à data de fim")
+    return inicio.isoformat(), fim.isoformat()
+
+@app.get("/api/export/ops")
+async def exportar_ops(
+    data_inicio: str,
+    data_fim: str,
+    subespecie: str = "todas",
+    id_produto: str = "",
+    cod_op: str = "",
+    tipo_op: str = "ambos",
+    formato: str = "csv",
+    usuario: str = Depends(exigir_sessao)
+):
+    try:
+        inicio, fim = _periodo_exportacao(data_inicio, data_fim, formato)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"erro": str(e)})
+
+    from src.logic.consulta_ops import iterar_ops_exportacao
+    codigos = [c.strip() for c in cod_op.split(",") if c.strip()] if cod_op else None
+    blocos = iterar_ops_exportacao(inicio, fim, codigos_op=codigos, tipo_op=tipo_op, subespecie=subespecie,
+                                   id_produto=id_produto)
+    return _resposta_exportacao(f"ops_{inicio}_{fim}", formato, COLUNAS_EXPORTACAO_OPS, blocos)
+
+@app.get("/api/export/registros")
+async def exportar_registros(data_inicio: str, data_fim: str, formato: str = "csv",
+                             usuario: str = Depends(exigir_sessao)):
+    try:
+        inicio, fim = _periodo_exportacao(data_inicio, data_fim, formato)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"erro": str(e)})
 
-        # Filtros adicionais
-        if subespecie.lower() != "todas":
-            df = df[df["SUB_ESPECIE"].str.upper() == subespecie.upper()]
-        if id_produto:
-            df = df[df["ID_PRODUTO"].astype(str) == str(id_produto)]
-        if cod_op:
-            codigos = [c.strip() for c in cod_op.split(",")]
-            df = df[df["CODIGO_OP"].astype(str).isin(codigos)]
+    # Período semiaberto sobre DATA ("AAAA-MM-DD HH:MM:SS"): do início do primeiro dia até o dia seguinte ao último
+    fim_exclusivo = (datetime.strptime(fim, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    blocos = obter_armazem().iterar_leituras(inicio, fim_exclusivo)
+    return _resposta_exportacao(f"registros_{inicio}_{fim}", formato, COLUNAS_REGISTROS, blocos)
 
-        ops = df.fillna(0).to_dict(orient="records")
-        df = df.replace({pd.NA: None, float("nan"): 0})
-        return {"ops": ops}
+# ===========================
+# 📡 API - Progresso ao vivo (SSE)
+# ===========================
+# Intervalo do comentário de keep-alive enviado quando não há leituras
+INTERVALO_PING_SSE = 15
+
+@app.get("/api/ops/stream")
+async def progresso_ops(request: Request):
+    """
+    Server-Sent Events com o novo QTD_REGISTRADA/STATUS de cada OP assim que uma leitura
+    é gravada, para o painel atualizar as linhas sem refazer /api/ops.
+    """
+    transmissor = obter_transmissor()
+    fila = transmissor.assinar()
+
+    async def eventos():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    evento = await asyncio.wait_for(fila.get(), timeout=INTERVALO_PING_SSE)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {evento['tipo']}\ndata: {dumps_json(evento).decode('utf-8')}\n\n"
+        finally:
+            transmissor.cancelar(fila)
+
+    return StreamingResponse(eventos(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-    except Exception as e:
-        print("[ERRO] Falha em /api/ops:", e)
-        return JSONResponse(status_code=500, content={"erro": str(e)})
+# ===========================
+# 📈 Métricas (formato Prometheus)
+# ===========================
+def _metricas_cache(chave: str):
+    caches = {"consultas": obter_cache_ops, "dias": obter_cache_dias, "op": obter_cache_op}
+    return lambda: [({"cache": nome}, obter().estatisticas()[chave]) for nome, obter in caches.items()]
+
+def _metricas_pool():
+    pool = conexao._pool  # não cria o pool só para exportar métricas
+    if pool is None:
+        return []
+    estatisticas = pool.estatisticas()
+    return [({"estado": "livres"}, estatisticas["livres"]), ({"estado": "em_uso"}, estatisticas["em_uso"])]
+
+REGISTRO.adicionar(Medidor("cache_taxa_acerto", "Taxa de acerto dos caches de OPs", ("cache",),
+                           _metricas_cache("taxa_acerto")))
+REGISTRO.adicionar(Medidor("cache_entradas", "Entradas nos caches de OPs", ("cache",), _metricas_cache("entradas")))
+REGISTRO.adicionar(Medidor("cache_bytes", "Memória estimada dos caches de OPs", ("cache",), _metricas_cache("bytes")))
+REGISTRO.adicionar(Medidor("erp_pool_conexoes", "Conexões do pool do ERP", ("estado",), _metricas_pool))
+REGISTRO.adicionar(Medidor("partida_segundos", "Tempo da partida do worker até ficar pronto e até o fim do aquecimento",
+                           ("etapa",), lambda: [({"etapa": etapa}, valor) for etapa, valor in PARTIDA.items()]))
+REGISTRO.adicionar(Medidor("sse_assinantes", "Painéis conectados ao progresso ao vivo", (),
+                           lambda: [({}, obter_transmissor().total_assinantes)]))
+
+@app.get("/metrics")
+async def metricas():
+    return PlainTextResponse(REGISTRO.exportar(), media_type="text/plain; version=0.0.4")
+
+# ===========================
+# 🔬 Perfis de requisições (admin)
+# ===========================
+@app.get("/api/admin/perfis")
+async def listar_perfis(usuario: str = Depends(exigir_admin)):
+    return {"perfis": obter_registro_perfis().listar()}
+
+@app.get("/api/admin/perfis/{perfil_id}")
+async def detalhar_perfil(perfil_id: int, formato: str = "json", usuario: str = Depends(exigir_admin)):
+    perfil = obter_registro_perfis().obter(perfil_id)
+    if perfil is None:
+        return JSONResponse(status_code=404, content={"erro": "Perfil não encontrado"})
+    if formato == "folded":
+        return PlainTextResponse(como_folded(perfil))
+    return perfil
+
+# ===========================
+# ♻️ API - Cache de OPs
+# ===========================
+@app.post("/api/cache/invalidar")
+async def invalidar_cache(usuario: str = Depends(exigir_admin)):
+    removidas = invalidar_cache_ops()
+    return {"ok": True, "removidas": removidas}
 
 # ===========================
 # 📄 Página Detalhe da OP
 # ===========================
 @app.get("/op/{cod_op}", response_class=HTMLResponse)
-async def detalhe_op(request: Request, cod_op: str):
+async def detalhe_op(request: Request, cod_op: str, usuario: str = Depends(exigir_sessao_pagina)):
     try:
-        df = carregar_ops_intervalo("2025-01-01", "2025-12-31", tipo_op="ambos")
+        from src.logic.consulta_ops import carregar_op_async
+
+        # Busca direta pela OP (sem carregar um intervalo de datas inteiro)
+        df = await carregar_op_async(cod_op)
         df.columns = df.columns.str.upper()
-        df = df[df["CODIGO_OP"].astype(str) == cod_op]
 
         if df.empty:
             return HTMLResponse(content=f"<h2>OP {cod_op} não encontrada.</h2>", status_code=404)
@@ -131,53 +450,178 @@ async def detalhe_op(request: Request, cod_op: str):
         return templates.TemplateResponse("op_detalhe.html", {
             "request": request,
             "op": op,
-            "qtd_registrada": qtd_registrada
+            "qtd_registrada": qtd_registrada,
+            # Mesmo conjunto que o servidor aceita: códigos do produto e das subdivisões da OP
+            "codigos_validos": sorted(codigos_validos(op))
         })
 
     except Exception as e:
         return HTMLResponse(content=f"<h2>Erro ao carregar OP: {str(e)}</h2>", status_code=500)
 
+# ===========================
+# 🏭 Estação de leitura (sem escolher a OP)
+# ===========================
+@app.get("/estacao", response_class=HTMLResponse)
+async def estacao_leitura(request: Request, usuario: str = Depends(exigir_sessao_pagina)):
+    return templates.TemplateResponse("estacao.html", {"request": request})
+
 # ===========================
 # 📥 API - Registrar leitura
 # ===========================
+# Máximo de leituras aceitas num único lote
+MAX_LEITURAS_LOTE = 1000
+
+def _montar_registro(payload: dict, usuario: str):
+    """Confere os campos de uma leitura recebida e monta a linha do registros.csv; retorna (linha, motivo)."""
+    if not isinstance(payload, dict):
+        return None, MOTIVO_DADOS_INCOMPLETOS
+
+    cod_op = payload.get("cod_op")
+    codigo_barras = payload.get("codigo_barras")
+    nome_produto = payload.get("nome_produto")
+    especie = payload.get("especie")
+    sub_especie = payload.get("sub_especie")
+    id_produto = payload.get("id_produto")
+
+    if not all([cod_op, codigo_barras, nome_produto, especie, sub_especie, id_produto]):
+        return None, MOTIVO_DADOS_INCOMPLETOS
+
+    return {
+        "DATA": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "COD_OP": cod_op,
+        "CODIGO_BARRAS": codigo_barras,
+        "ID_PRODUTO": id_produto,
+        "NOME_PRODUTO": nome_produto,
+        "ESPECIE": especie,
+        "SUB_ESPECIE": sub_especie,
+        "QTD": "1",
+        "USUARIO": usuario or "desconhecido"
+    }, None
+
+async def _validar_codigos(linhas: list[dict]) -> list[tuple[bool, str]]:
+    """
+    Confere cada leitura no índice OP -> códigos válidos (busca em hash, sem ERP).
+    Uma OP ainda não vista é carregada uma única vez pela busca direta (que alimenta o índice).
+    """
+    from src.logic.consulta_ops import carregar_op_async
+
+    indice = obter_indice_codigos()
+    for cod_op in {str(l["COD_OP"]).strip() for l in linhas if not indice.conhece(l["COD_OP"])}:
+        await carregar_op_async(cod_op)
+    return [indice.validar(l["COD_OP"], l["CODIGO_BARRAS"]) for l in linhas]
+
+def _rejeicao(motivo: str) -> dict:
+    LEITURAS_REJEITADAS.inc(motivo=motivo)
+    return {"ok": False, "motivo": motivo, "erro": MENSAGENS_MOTIVO.get(motivo, "❌ Falha no registro")}
+
 @app.post("/api/registrar_leitura")
-async def registrar_leitura(request: Request, payload: dict = Body(...)):
+async def registrar_leitura(payload: dict = Body(...), usuario: str = Depends(exigir_sessao)):
     try:
-        cod_op = payload.get("cod_op")
-        codigo_barras = payload.get("codigo_barras")
-        nome_produto = payload.get("nome_produto")
-        especie = payload.get("especie")
-        sub_especie = payload.get("sub_especie")
-        id_produto = payload.get("id_produto")
-
-        usuario = request.cookies.get("usuario")
-
-        if not all([cod_op, codigo_barras, nome_produto, especie, sub_especie, id_produto]):
-            return JSONResponse(status_code=400, content={"erro": "Dados incompletos"})
-
-        caminho_csv = os.path.join(BASE_DIR, "files", "registros.csv")
-
-        if os.path.exists(caminho_csv):
-            df = pd.read_csv(caminho_csv, sep=",", dtype=str)
-        else:
-            df = pd.DataFrame(columns=["DATA", "COD_OP", "CODIGO_BARRAS", "ID_PRODUTO", "NOME_PRODUTO", "ESPECIE", "SUB_ESPECIE", "QTD", "USUARIO"])
-
-        novo_registro = {
-            "DATA": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "COD_OP": cod_op,
-            "CODIGO_BARRAS": codigo_barras,
-            "ID_PRODUTO": id_produto,
-            "NOME_PRODUTO": nome_produto,
-            "ESPECIE": especie,
-            "SUB_ESPECIE": sub_especie,
-            "QTD": "1",
-            "USUARIO": usuario or "desconhecido"
-        }
+        novo_registro, motivo = _montar_registro(payload, usuario)
+        if motivo:
+            return JSONResponse(status_code=400, content=_rejeicao(motivo))
+
+        (valido, motivo), = await _validar_codigos([novo_registro])
+        if not valido:
+            return JSONResponse(status_code=422, content=_rejeicao(motivo))
 
-        df = pd.concat([df, pd.DataFrame([novo_registro])], ignore_index=True)
-        df.to_csv(caminho_csv, index=False, sep=",")
+        # Anexa só a nova linha ao registros.csv (sem reler/regravar o arquivo)
+        await em_thread(obter_armazem().registrar, novo_registro)
 
         return {"ok": True}
 
     except Exception as e:
         return JSONResponse(status_code=500, content={"erro": str(e)})
+
+@app.post("/api/registrar_leitura/lote")
+async def registrar_leitura_lote(payload=Body(...), usuario: str = Depends(exigir_sessao)):
+    """
+    Registra um lote de leituras (modo rajada do leitor). Todas são validadas (campos
+    e código de barras da OP), as válidas são gravadas numa única escrita com um único fsync e o retorno traz o
+    resultado de cada item, na ordem recebida.
+    """
+    try:
+        leituras = payload.get("leituras") if isinstance(payload, dict) else payload
+        if not isinstance(leituras, list) or not leituras:
+            return JSONResponse(status_code=400, content={"erro": "Informe a lista de leituras"})
+        if len(leituras) > MAX_LEITURAS_LOTE:
+            return JSONResponse(status_code=413, content={"erro": f"Lote acima de {MAX_LEITURAS_LOTE} leituras"})
+
+        resultados, montadas = [], []
+        for indice, leitura in enumerate(leituras):
+            linha, motivo = _montar_registro(leitura, usuario)
+            resultados.append({"indice": indice, **(_rejeicao(motivo) if motivo else {"ok": True})})
+            if linha:
+                montadas.append((indice, linha))
+
+        linhas = []
+        validacoes = await _validar_codigos([linha for _, linha in montadas])
+        for (indice, linha), (valido, motivo) in zip(montadas, validacoes):
+            if valido:
+                linhas.append(linha)
+            else:
+                resultados[indice] = {"indice": indice, **_rejeicao(motivo)}
+
+        await em_thread(obter_armazem().registrar_lote, linhas, True)
+
+        return {"ok": all(r["ok"] for r in resultados), "registradas": len(linhas), "resultados": resultados}
+
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"erro": str(e)})
+
+def _registrar_automatico(codigo_barras: str, usuario: str):
+    """Resolve a OP da leitura no índice reverso e grava a leitura; retorna (dados da OP, motivo)."""
+    armazem = obter_armazem()
+    # Escolha da OP + gravação com a escrita reservada em todos os workers (trava do diário
+    # ou BEGIN IMMEDIATE): duas leituras simultâneas não usam o mesmo saldo
+    with armazem.reservar_escrita():
+        op, motivo = obter_ops_abertas().resolver(codigo_barras, armazem.qtd_registrada)
+        if op is None:
+            return None, motivo
+        linha, motivo = _montar_registro({
+            "cod_op": op["CODIGO_OP"],
+            "codigo_barras": str(codigo_barras).strip(),
+            "nome_produto": op["NOME_PRODUTO"],
+            "especie": op["ESPECIE"],
+            "sub_especie": op["SUB_ESPECIE"],
+            "id_produto": op["ID_PRODUTO"],
+        }, usuario)
+        if motivo:
+            return None, motivo
+        armazem.registrar(linha)
+        op["QTD_REGISTRADA"] = armazem.qtd_registrada(op["CODIGO_OP"])
+    return op, None
+
+@app.post("/api/registrar_leitura/auto")
+async def registrar_leitura_automatica(payload: dict = Body(...), usuario: str = Depends(exigir_sessao)):
+    """
+    Registra uma leitura sem OP informada: o código de barras é resolvido para a OP
+    aberta mais antiga que o aceita e ainda tem saldo (índice em memória, sem ERP).
+    """
+    try:
+        ops_abertas = obter_ops_abertas()
+        if ops_abertas.atualizado_em is None:
+            # Índice ainda não carregado (partida em andamento ou ERP fora): no máximo uma carga
+            # a cada OPS_ABERTAS_ESPERA_FALHA segundos vem da leitura; as demais recebem 503
+            if ops_abertas.reservar_tentativa(obter_configuracao().ops_abertas_espera_falha):
+                await em_thread(_atualizar_ops_abertas)
+            if ops_abertas.atualizado_em is None:
+                return JSONResponse(status_code=503, content=_rejeicao(MOTIVO_OPS_INDISPONIVEIS))
+
+        op, motivo = await em_thread(_registrar_automatico, payload.get("codigo_barras"), usuario)
+        if op is None:
+            status = 400 if motivo == MOTIVO_DADOS_INCOMPLETOS else 422
+            return JSONResponse(status_code=status, content=_rejeicao(motivo))
+
+        return {
+            "ok": True,
+            "cod_op": op["CODIGO_OP"],
+            "id_produto": op["ID_PRODUTO"],
+            "nome_produto": op["NOME_PRODUTO"],
+            "sub_especie": op["SUB_ESPECIE"],
+            "qtd_prevista": int(op["QTD_PREVISTA"]),
+            "qtd_registrada": op["QTD_REGISTRADA"],
+        }
+
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"erro": str(e)})
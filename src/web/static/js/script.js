@@ -52,31 +52,17 @@ document.addEventListener("DOMContentLoaded", function () {
     });
   }
 
-  function ordenarOps(ops) {
-    const prioridade = {
-      "⚠️ Registro a maior": 1,
-      "✅ Registro OK": 2,
-      "✅ Registrando": 3,
-      "🔴 Pendente": 4
-    };
-
-    return ops.sort((a, b) => {
-      const p1 = prioridade[a.STATUS] || 9;
-      const p2 = prioridade[b.STATUS] || 9;
-      if (p1 !== p2) return p1 - p2;
-
-      const sub1 = (a.SUB_ESPECIE || "").toUpperCase();
-      const sub2 = (b.SUB_ESPECIE || "").toUpperCase();
-      if (sub1 < sub2) return -1;
-      if (sub1 > sub2) return 1;
-
-      const id1 = parseInt(a.ID_PRODUTO || 0);
-      const id2 = parseInt(b.ID_PRODUTO || 0);
-      return id1 - id2;
-    });
-  }
-
-  async function buscarDados() {
+  // Paginação feita no servidor: cada página traz até TAMANHO_PAGINA OPs já ordenadas
+  // (Status > Subespécie > ID Produto) e o cursor da próxima página
+  const TAMANHO_PAGINA = 100;
+  const btnCarregarMais = document.getElementById("carregar-mais");
+  const infoPaginacao = document.getElementById("info-paginacao");
+  let consultaAtual = "";
+  let proximoCursor = null;
+  let totalCarregado = 0;
+  let resumoAtual = {};
+
+  function montarConsulta() {
     const dataInicio = formatarDataUSA(document.getElementById("data-inicio").value);
     const dataFim = formatarDataUSA(document.getElementById("data-fim").value);
     const subespecie = document.getElementById("subespecie").value;
@@ -88,21 +74,71 @@ document.addEventListener("DOMContentLoaded", function () {
     let tipoOp = "ambos";
     if (tipoLinha && !tipoSob) tipoOp = "linha";
     else if (!tipoLinha && tipoSob) tipoOp = "sob_encomenda";
-    else if (!tipoLinha && !tipoSob) return alert("Selecione pelo menos um tipo de OP");
+    else if (!tipoLinha && !tipoSob) return null;
+
+    const params = new URLSearchParams({
+      data_inicio: formatarDataBR(dataInicio),
+      data_fim: formatarDataBR(dataFim),
+      subespecie: subespecie,
+      id_produto: idProduto,
+      cod_op: codOp,
+      tipo_op: tipoOp,
+      limite: TAMANHO_PAGINA,
+      formato: "colunar"
+    });
+    return params.toString();
+  }
+
+  // Converte a resposta colunar (uma lista por coluna, categóricas como índice no
+  // dicionário da coluna) de volta para uma lista de objetos por OP
+  function decodificarColunar(data) {
+    const colunas = data.colunas || [];
+    const dicionarios = data.dicionarios || {};
+    const total = colunas.length ? data.dados[colunas[0]].length : 0;
+    const ops = new Array(total);
+    for (let i = 0; i < total; i++) ops[i] = {};
+
+    colunas.forEach((coluna) => {
+      const valores = data.dados[coluna];
+      const dicionario = dicionarios[coluna];
+      for (let i = 0; i < total; i++) {
+        const valor = valores[i];
+        ops[i][coluna] = dicionario ? (valor >= 0 ? dicionario[valor] : null) : valor;
+      }
+    });
+    return ops;
+  }
+
+  async function buscarPagina(cursor) {
+    const url = `/api/ops?${consultaAtual}` + (cursor ? `&cursor=${encodeURIComponent(cursor)}` : "");
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`Erro ${response.status}: ${response.statusText}`);
+    const data = await response.json();
+    data.ops = decodificarColunar(data);
+    return data;
+  }
+
+  function atualizarPaginacao(total) {
+    if (infoPaginacao) infoPaginacao.textContent = total ? `Exibindo ${totalCarregado} de ${total} OPs` : "";
+    if (btnCarregarMais) btnCarregarMais.style.display = proximoCursor ? "inline-block" : "none";
+  }
+
+  async function buscarDados() {
+    const consulta = montarConsulta();
+    if (consulta === null) return alert("Selecione pelo menos um tipo de OP");
+    consultaAtual = consulta;
 
     try {
       tbody.innerHTML = '<tr><td colspan="9" style="text-align: center">Carregando dados...</td></tr>';
       cardsContainer.innerHTML = '<div class="card">Carregando...</div>';
 
-      const response = await fetch(
-        `/api/ops?data_inicio=${formatarDataBR(dataInicio)}&data_fim=${formatarDataBR(dataFim)}&subespecie=${subespecie}&id_produto=${idProduto}&cod_op=${codOp}&tipo_op=${tipoOp}`
-      );
-      if (!response.ok) throw new Error(`Erro ${response.status}: ${response.statusText}`);
-
-      const data = await response.json();
-      const ordenado = ordenarOps(data.ops);
-      renderizarTabela(ordenado);
-      renderizarCards(calcularResumo(ordenado));
+      const data = await buscarPagina(null);
+      proximoCursor = data.proximo_cursor;
+      totalCarregado = data.ops.length;
+      renderizarTabela(data.ops);
+      resumoAtual = data.resumo || {};
+      renderizarCards(resumoAtual);
+      atualizarPaginacao(data.total);
     } catch (error) {
       console.error("Erro ao buscar dados:", error);
       tbody.innerHTML = `<tr><td colspan="9" style="text-align: center; color: #dc2626">Erro ao carregar dados: ${error.message}</td></tr>`;
@@ -110,11 +146,116 @@ document.addEventListener("DOMContentLoaded", function () {
     }
   }
 
-    function renderizarTabela(ops) {
+  async function carregarMais() {
+    if (!proximoCursor) return;
+    try {
+      btnCarregarMais.disabled = true;
+      const data = await buscarPagina(proximoCursor);
+      proximoCursor = data.proximo_cursor;
+      totalCarregado += data.ops.length;
+      renderizarTabela(data.ops, true);
+      atualizarPaginacao(data.total);
+    } catch (error) {
+      console.error("Erro ao carregar mais OPs:", error);
+      alert(`Erro ao carregar mais OPs: ${error.message}`);
+    } finally {
+      btnCarregarMais.disabled = false;
+    }
+  }
+
+  if (btnCarregarMais) btnCarregarMais.addEventListener("click", carregarMais);
+
+  // Exportação: o servidor envia o relatório completo (sem paginação) em partes
+  document.querySelectorAll("button.exportar").forEach((botao) => {
+    botao.addEventListener("click", () => {
+      const consulta = montarConsulta();
+      if (consulta === null) return alert("Selecione pelo menos um tipo de OP");
+      const params = new URLSearchParams(consulta);
+      params.delete("limite");
+      params.set("formato", botao.dataset.formato);
+      window.location.href = `/api/export/ops?${params.toString()}`;
+    });
+  });
+
+  function classeStatus(status) {
+    if (status.includes("Registro OK")) return "status-ok";
+    if (status.includes("Registrando")) return "status-parcial";
+    if (status.includes("a maior")) return "status-maior";
+    return "status-pendente";
+  }
+
+  // Mesma regra de status do servidor, usada quando o evento não traz o STATUS
+  function statusPorQuantidade(registrada, prevista) {
+    if (registrada === 0) return "🔴 Pendente";
+    if (registrada < prevista) return "✅ Registrando";
+    if (registrada === prevista) return "✅ Registro OK";
+    return "⚠️ Registro a maior";
+  }
+
+  // Resumo por espécie das OPs que ainda não foram carregadas na tabela: uma única
+  // página pequena de /api/ops, no máximo uma vez a cada ESPERA_RESUMO ms
+  const ESPERA_RESUMO = 2000;
+  let timeoutResumo = null;
+
+  function agendarResumo() {
+    if (timeoutResumo) return;
+    timeoutResumo = setTimeout(async () => {
+      timeoutResumo = null;
+      try {
+        const params = new URLSearchParams(consultaAtual);
+        params.set("limite", 1);
+        const response = await fetch(`/api/ops?${params.toString()}`);
+        if (!response.ok) throw new Error(`Erro ${response.status}: ${response.statusText}`);
+        resumoAtual = (await response.json()).resumo || {};
+        renderizarCards(resumoAtual);
+      } catch (error) {
+        console.error("Erro ao atualizar o resumo:", error);
+      }
+    }, ESPERA_RESUMO);
+  }
+
+  // Progresso ao vivo: cada leitura gravada chega pelo /api/ops/stream e atualiza
+  // a linha da OP e os cards do resumo, sem refazer a consulta de /api/ops
+  function atualizarLinhas(ops) {
+    if (!tbody) return;
+    let resumoAlterado = false;
+    ops.forEach((op) => {
+      const tr = tbody.querySelector(`tr[data-cod-op="${CSS.escape(String(op.CODIGO_OP))}"]`);
+      if (!tr) {
+        // OP fora das páginas carregadas: pode estar na consulta, o resumo vem do servidor
+        if (proximoCursor) agendarResumo();
+        return;
+      }
+      const status = op.STATUS || statusPorQuantidade(op.QTD_REGISTRADA, Number(tr.dataset.qtdPrevista));
+      const celulaStatus = tr.cells[0];
+      celulaStatus.textContent = status;
+      celulaStatus.className = classeStatus(status);
+      tr.cells[7].textContent = op.QTD_REGISTRADA;
+
+      const diferenca = op.QTD_REGISTRADA - Number(tr.dataset.qtdRegistrada);
+      tr.dataset.qtdRegistrada = op.QTD_REGISTRADA;
+      const resumo = resumoAtual[tr.dataset.especie];
+      if (resumo && diferenca) {
+        resumo.qtd_registrada += diferenca;
+        resumoAlterado = true;
+      }
+    });
+    if (resumoAlterado) renderizarCards(resumoAtual);
+  }
+
+  function acompanharLeituras() {
+    if (!tbody || !window.EventSource) return;
+    const fonte = new EventSource("/api/ops/stream");
+    fonte.addEventListener("leituras", (e) => atualizarLinhas(JSON.parse(e.data).ops || []));
+    // A conexão ficou para trás e perdeu eventos: recarrega a consulta atual
+    fonte.addEventListener("resincronizar", () => buscarDados());
+  }
+
+  function renderizarTabela(ops, acrescentar = false) {
     if (!tbody) return;
-    tbody.innerHTML = "";
+    if (!acrescentar) tbody.innerHTML = "";
 
-    if (!ops || ops.length === 0) {
+    if (!acrescentar && (!ops || ops.length === 0)) {
       tbody.innerHTML = '<tr><td colspan="9" style="text-align: center">Nenhum dado encontrado</td></tr>';
       return;
     }
@@ -122,12 +263,14 @@ document.addEventListener("DOMContentLoaded", function () {
     ops.forEach((op) => {
       const tr = document.createElement("tr");
       tr.onclick = () => window.location.href = `/op/${op.CODIGO_OP}`;
+      tr.dataset.codOp = op.CODIGO_OP;
+      tr.dataset.qtdPrevista = op.QTD_PREVISTA || 0;
+      tr.dataset.qtdRegistrada = op.QTD_REGISTRADA || 0;
+      // Mesma chave do resumo por espécie do servidor
+      tr.dataset.especie = op.ESPECIE ?? "Não especificado";
 
       const status = op.STATUS || "";
-      let statusClass = "status-pendente";
-      if (status.includes("Registro OK")) statusClass = "status-ok";
-      else if (status.includes("Registrando")) statusClass = "status-parcial";
-      else if (status.includes("a maior")) statusClass = "status-maior";
+      const statusClass = classeStatus(status);
 
       const tipoIcone = op.TIPO_OP === "LIN_PROD" ? "🏭" : op.TIPO_OP === "SOB_ENC" ? "🪡" : "";
 
@@ -146,20 +289,6 @@ document.addEventListener("DOMContentLoaded", function () {
     });
   }
 
-  function calcularResumo(ops) {
-    const resumo = {};
-    if (!ops || ops.length === 0) return resumo;
-
-    ops.forEach((op) => {
-      const especie = op.ESPECIE || "Não especificado";
-      if (!resumo[especie]) resumo[especie] = { qtd_prevista: 0, qtd_registrada: 0 };
-      resumo[especie].qtd_prevista += Number(op.QTD_PREVISTA || 0);
-      resumo[especie].qtd_registrada += Number(op.QTD_REGISTRADA || 0);
-    });
-
-    return resumo;
-  }
-
   function renderizarCards(resumo) {
     cardsContainer.innerHTML = "";
     if (Object.keys(resumo).length === 0) {
@@ -217,6 +346,7 @@ document.addEventListener("DOMContentLoaded", function () {
     dataFimInput.addEventListener("change", carregarSubespecies);
     carregarSubespecies();
     buscarDados();
+    acompanharLeituras();
   }
 
 });
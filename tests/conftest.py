@@ -0,0 +1,87 @@
+# tests/conftest.py
+import csv
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Nenhum teste grava nos arquivos reais de src/files: os caminhos padrão vão para uma pasta temporária
+_PASTA_ARQUIVOS = tempfile.mkdtemp(prefix="testes_registros_")
+os.environ["REGISTROS_CSV_PATH"] = os.path.join(_PASTA_ARQUIVOS, "registros.csv")
+os.environ["ARMAZEM_SQLITE_PATH"] = os.path.join(_PASTA_ARQUIVOS, "registros.db")
+os.environ["PARTICOES_REGISTROS_PATH"] = os.path.join(_PASTA_ARQUIVOS, "registros_particoes")
+
+from src.logic.diario_registros import COLUNAS_REGISTROS
+
+# Scripts manuais contra o banco de controle (não são testes automatizados)
+collect_ignore = ["main.py", "test_novo.py"]
+
+
+@pytest.fixture
+def registros(tmp_path):
+    """Caminho de um registros.csv só com o cabeçalho, numa pasta temporária."""
+    caminho = str(tmp_path / "registros.csv")
+    with open(caminho, "w", encoding="utf-8", newline="") as arq:
+        csv.writer(arq, lineterminator="\n").writerow(COLUNAS_REGISTROS)
+    return caminho
+
+
+@pytest.fixture
+def armazem(registros, tmp_path, monkeypatch):
+    """ArmazemCSV sobre o registros.csv temporário, devolvido por obter_armazem() durante o teste."""
+    from src.logic import armazem_leituras
+    from src.logic.armazem_leituras import ArmazemCSV
+    from src.logic.diario_registros import DiarioRegistros
+    from src.logic.indice_registros import IndiceRegistros
+    from src.logic.particoes_registros import ParticoesRegistros
+
+    diario = DiarioRegistros(registros, intervalo_fsync=0)
+    indice = IndiceRegistros(registros, ParticoesRegistros(str(tmp_path / "registros_particoes")), diario.trava)
+    indice.somas_por_op()
+    diario.ao_gravar(indice.ao_gravar)
+    armazem = ArmazemCSV(diario, indice)
+    monkeypatch.setattr(armazem_leituras, "_armazem", armazem)
+    yield armazem
+    armazem.fechar()
+
+
+@pytest.fixture
+def erp_local(tmp_path, monkeypatch):
+    """ERP local (SQLite) com 60 OPs em 10 dias a partir de 2025-03-01, atendido por um pool de uma conexão."""
+    import functools
+    from datetime import date
+
+    from bench.dados import gerar_erp
+    from src.database import erp_local
+    from src.database.conexao import PoolConexoes
+    from src.logic import consulta_ops
+
+    caminho = str(tmp_path / "erp.db")
+    ops = gerar_erp(caminho, n_ops=60, dias=10, inicio=date(2025, 3, 1), n_produtos=20, n_subespecies=4)
+    pool = PoolConexoes(functools.partial(erp_local.conectar, caminho), minimo=0, maximo=1, timeout=1)
+    monkeypatch.setattr(consulta_ops, "obter_pool", lambda: pool)
+    yield ops, pool
+    pool.fechar()
+
+
+class _UsuariosFalsos:
+    def usuario_ativo(self, login):
+        return {"LOGIN": login, "NIVEL_ACESSO": "admin" if login == "admin" else "operador"}
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    """Cliente HTTP do app (sem a tarefa de partida) com a sessão de um operador."""
+    from fastapi.testclient import TestClient
+
+    from src import main_web
+    from src.logic import sessao
+
+    monkeypatch.setattr(sessao, "_segredo", b"segredo-de-teste")
+    monkeypatch.setattr(main_web, "obter_indice_usuarios", _UsuariosFalsos)
+    cliente = TestClient(main_web.app)
+    cliente.cookies.set(sessao.COOKIE_SESSAO, sessao.criar_token("maria"))
+    return cliente
@@ -0,0 +1,182 @@
+# tests/test_armazem_leituras.py
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+PROCESSOS = 3
+THREADS = 2
+SALDO = 40
+
+
+def _registrar_enquanto_houver_saldo(tipo, pasta, tentativas, fila):
+    os.environ.update(
+        ARMAZEM_LEITURAS=tipo,
+        REGISTROS_CSV_PATH=os.path.join(pasta, "registros.csv"),
+        ARMAZEM_SQLITE_PATH=os.path.join(pasta, "registros.db"),
+        PARTICOES_REGISTROS_PATH=os.path.join(pasta, "registros_particoes"),
+    )
+    from src.logic.armazem_leituras import obter_armazem
+    from src.logic.configuracao import recarregar_configuracao
+    recarregar_configuracao()
+    armazem = obter_armazem()
+    aceitas = []
+
+    def estacao():
+        for _ in range(tentativas):
+            # Mesmo padrão da leitura automática: confere o saldo e grava com a escrita reservada
+            with armazem.reservar_escrita():
+                if armazem.qtd_registrada("OP1") < SALDO:
+                    time.sleep(0.002)
+                    armazem.registrar({"DATA": time.strftime("%Y-%m-%d %H:%M:%S"), "COD_OP": "OP1",
+                                       "ID_PRODUTO": "1", "QTD": 1, "USUARIO": "teste"})
+                    aceitas.append(1)
+
+    threads = [threading.Thread(target=estacao) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    armazem.fechar()
+    fila.put(len(aceitas))
+
+
+@pytest.mark.parametrize("tipo", ["csv", "sqlite"])
+def test_reservar_escrita_nao_usa_o_mesmo_saldo_em_varios_processos(tipo, tmp_path):
+    contexto = multiprocessing.get_context("spawn")
+    fila = contexto.Queue()
+    processos = [contexto.Process(target=_registrar_enquanto_houver_saldo, args=(tipo, str(tmp_path), 10, fila))
+                 for _ in range(PROCESSOS)]
+    for processo in processos:
+        processo.start()
+    aceitas = sum(fila.get(timeout=120) for _ in processos)
+    for processo in processos:
+        processo.join(60)
+    assert [p.exitcode for p in processos] == [0] * PROCESSOS
+
+    if tipo == "csv":
+        with open(tmp_path / "registros.csv", "r", encoding="utf-8") as arq:
+            gravadas = sum(1 for _ in arq) - 1
+    else:
+        con = sqlite3.connect(tmp_path / "registros.db")
+        gravadas = con.execute("SELECT COUNT(*) FROM LEITURA_PRODUTO").fetchone()[0]
+        con.close()
+    assert aceitas == gravadas == SALDO
+
+
+def test_ouvinte_que_consulta_o_indice_nao_trava_com_rotacao(registros, tmp_path):
+    from src.logic.armazem_leituras import ArmazemCSV
+    from src.logic.diario_registros import DiarioRegistros
+    from src.logic.indice_registros import IndiceRegistros
+    from src.logic.particoes_registros import ParticoesRegistros
+
+    diario = DiarioRegistros(registros, intervalo_fsync=0)
+    particoes = ParticoesRegistros(str(tmp_path / "registros_particoes"))
+    indice = IndiceRegistros(registros, particoes, diario.trava)
+    indice.somas_por_op()
+    diario.ao_gravar(indice.ao_gravar)
+    armazem = ArmazemCSV(diario, indice)
+    # Como o SSE: cada gravação consulta o índice, que recarrega tudo depois de uma rotação
+    armazem.ao_gravar(lambda linhas: armazem.qtd_registrada("A"))
+    armazem.ao_gravar_externo(lambda linhas: armazem.qtd_registrada("A"))
+    # Outro diário no mesmo arquivo faz o papel de outro worker (trava própria)
+    outro = DiarioRegistros(registros, intervalo_fsync=0)
+
+    parar = threading.Event()
+    contagens = [0, 0, 0, 0]
+
+    def leitura(mes):
+        return {"DATA": f"{mes}-10 10:00:00", "COD_OP": "A", "ID_PRODUTO": "1", "QTD": 1}
+
+    def gravar():
+        while not parar.is_set():
+            armazem.registrar(leitura("2025-02"))
+            contagens[0] += 1
+
+    def gravar_reservado():
+        while not parar.is_set():
+            with armazem.reservar_escrita():
+                armazem.qtd_registrada("A")
+                armazem.registrar(leitura("2025-03"))
+            contagens[1] += 1
+
+    def gravar_em_outro_worker():
+        while not parar.is_set():
+            outro.registrar_lote([leitura("2025-03")])
+            contagens[3] += 1
+
+    def rotacionar():
+        while not parar.is_set():
+            # Alternando: rotação neste worker e no outro (troca o arquivo sem passar pelo diário daqui)
+            rotacionador = outro if contagens[2] % 2 else diario
+            rotacionador.reescrever(lambda aberto: particoes.rotacionar(aberto, "2025-03"))
+            contagens[2] += 1
+
+    threads = [threading.Thread(target=f, daemon=True) for f in (gravar, gravar_reservado, gravar_em_outro_worker, rotacionar)]
+    for thread in threads:
+        thread.start()
+    time.sleep(2)
+    parar.set()
+    for thread in threads:
+        thread.join(10)
+    assert not any(thread.is_alive() for thread in threads), f"threads travadas: {contagens}"
+    assert armazem.qtd_registrada("A") == contagens[0] + contagens[1] + contagens[3]
+    diario.fechar()
+    outro.fechar()
+
+
+def test_ouvintes_sao_avisados_fora_do_lock_do_diario(registros, tmp_path):
+    from src.logic.armazem_leituras import ArmazemCSV
+    from src.logic.diario_registros import DiarioRegistros
+    from src.logic.indice_registros import IndiceRegistros
+    from src.logic.particoes_registros import ParticoesRegistros
+
+    diario = DiarioRegistros(registros, intervalo_fsync=0)
+    indice = IndiceRegistros(registros, ParticoesRegistros(str(tmp_path / "registros_particoes")), diario.trava)
+    indice.somas_por_op()
+    diario.ao_gravar(indice.ao_gravar)
+    armazem = ArmazemCSV(diario, indice)
+    avisos = []
+    armazem.ao_gravar(lambda linhas: avisos.append(("locais", len(linhas), diario._lock.locked())))
+    armazem.ao_gravar_externo(lambda linhas: avisos.append(("externas", len(linhas), diario._lock.locked())))
+
+    outro = DiarioRegistros(registros, intervalo_fsync=0)
+    linha = {"DATA": "2025-03-10 10:00:00", "COD_OP": "A", "ID_PRODUTO": "1", "QTD": 1}
+    outro.registrar_lote([linha] * 2)
+    # A gravação local encontra as do outro worker antes dela: ambas avisadas depois de soltar o lock
+    armazem.registrar(linha)
+    assert avisos == [("externas", 2, False), ("locais", 1, False)]
+    assert armazem.qtd_registrada("A") == 3
+    outro.fechar()
+    diario.fechar()
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def armazem_de_cada_tipo(request, tmp_path):
+    if request.param == "csv":
+        yield request.getfixturevalue("armazem")
+        return
+    from src.database.leituras_sqlite import ArmazemSQLite
+    armazem = ArmazemSQLite(str(tmp_path / "registros.db"))
+    yield armazem
+    armazem.fechar()
+
+
+def test_lote_gravado_de_uma_vez_e_avisado_uma_vez(armazem_de_cada_tipo):
+    armazem = armazem_de_cada_tipo
+    avisos = []
+    armazem.ao_gravar(lambda linhas: avisos.append([l["COD_OP"] for l in linhas]))
+    lote = [{"DATA": "2025-03-10 10:00:00", "COD_OP": cod_op, "ID_PRODUTO": "1", "QTD": 1} for cod_op in "ABA"]
+    armazem.registrar_lote(lote, sincronizar=True)
+    assert avisos == [["A", "B", "A"]]
+
+    # Gravações dentro da reserva também são avisadas, na ordem em que foram feitas
+    with armazem.reservar_escrita():
+        armazem.registrar(lote[0])
+        armazem.registrar(lote[1])
+    assert [cod for aviso in avisos[1:] for cod in aviso] == ["A", "B"]
+    assert armazem.somas_por_op() == {"A": 3, "B": 2}
+    assert sum(len(bloco) for bloco in armazem.iterar_leituras()) == 5
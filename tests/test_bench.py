@@ -0,0 +1,47 @@
+# tests/test_bench.py
+import json
+import os
+import subprocess
+import sys
+from collections import Counter
+
+from bench.carga import _conferir, _percentis
+from bench.comparar import comparar
+from src.database.erp_local import traduzir_sql
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_dialeto_do_firebird_traduzido_para_o_sqlite():
+    assert traduzir_sql("SELECT LIST(DISTINCT cb.codigo_barras, ',') FROM t") == \
+        "SELECT GROUP_CONCAT(DISTINCT cb.codigo_barras) FROM t"
+    assert traduzir_sql("SELECT LIST(x, ';') FROM t") == "SELECT GROUP_CONCAT(x, ';') FROM t"
+    assert traduzir_sql("WHERE CAST(opp.data AS DATE) = ?") == "WHERE DATE(opp.data) = ?"
+    assert traduzir_sql("SELECT * FROM t ORDER BY id ROWS ?") == "SELECT * FROM t ORDER BY id LIMIT ?"
+
+
+def test_microbenchmarks_rodam_e_comparam(tmp_path):
+    saida = tmp_path / "micro.json"
+    # Processo próprio: o benchmark aponta o ambiente para o ERP e o registros.csv sintéticos
+    subprocess.run([sys.executable, "-m", "bench.micro", "--ops", "50", "--leituras", "200", "--dias", "4",
+                    "--repeticoes", "1", "--saida", str(saida)],
+                   cwd=RAIZ, check=True, capture_output=True, timeout=120,
+                   env={**os.environ, "LOG_NIVEL": "DESLIGADO"})
+    resultado = json.loads(saida.read_text(encoding="utf-8"))
+    assert {"carregar_op_frio", "partida_importacao_app"} <= set(resultado["resultados"])
+    assert all(r["mediana_ms"] >= 0 for r in resultado["resultados"].values())
+
+    linhas = comparar(resultado, resultado)
+    assert {razao for _, _, _, razao in linhas if razao is not None} == {1.0}
+
+
+def test_carga_confere_perdidas_e_duplicadas():
+    enviadas = Counter({("estacao1", "100"): 3, ("estacao2", "200"): 2})
+    confirmadas = Counter({("estacao1", "100"): 3, ("estacao2", "200"): 2})
+    gravadas = Counter({("estacao1", "100"): 4, ("estacao2", "200"): 1, ("sintetico", "100"): 50})
+    assert _conferir(enviadas, confirmadas, gravadas, {"estacao1", "estacao2"}) == {
+        "enviadas": 5, "confirmadas": 5, "gravadas": 5, "perdidas": 1, "duplicadas": 1}
+
+    assert _percentis([]) == {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    assert _percentis([i / 1000 for i in range(1, 101)]) == {"p50_ms": 51.0, "p95_ms": 96.0, "p99_ms": 100.0,
+                                                             "max_ms": 100.0}
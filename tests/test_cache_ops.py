@@ -0,0 +1,177 @@
+# tests/test_cache_ops.py
+import threading
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from src.logic.cache_ops import CacheTTL, ParticoesDiarias
+
+INICIO = date(2025, 3, 1)
+
+
+def dia(n):
+    return INICIO + timedelta(days=n)
+
+
+def test_cache_ttl_single_flight():
+    cache = CacheTTL()
+    liberar = threading.Event()
+    cargas = []
+
+    def carregar():
+        cargas.append(1)
+        liberar.wait(5)
+        return "ops"
+
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(cache.obter("chave", carregar))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    threading.Timer(0.2, liberar.set).start()
+    for thread in threads:
+        thread.join(10)
+
+    assert len(cargas) == 1
+    assert resultados == ["ops"] * 5
+    assert cache.obter("chave", carregar) == "ops"
+    estatisticas = cache.estatisticas()
+    assert (estatisticas["faltas"], estatisticas["agrupadas"], estatisticas["acertos"]) == (1, 4, 1)
+
+
+def test_cache_ttl_nao_guarda_erros():
+    cache = CacheTTL()
+
+    def falhar():
+        raise OSError("ERP fora do ar")
+
+    with pytest.raises(OSError):
+        cache.obter("chave", falhar)
+    assert cache.obter("chave", lambda: "ops") == "ops"
+
+
+def test_cache_ttl_invalidacao_durante_a_carga_descarta_o_resultado():
+    cache = CacheTTL()
+
+    def carregar_e_invalidar():
+        cache.invalidar()
+        return "antigo"
+
+    assert cache.obter("chave", carregar_e_invalidar) == "antigo"
+    assert cache.consultar("chave") is None
+    assert cache.obter("chave", lambda: "novo") == "novo"
+    assert cache.consultar("chave") == "novo"
+
+
+def test_cache_ttl_expira_e_descarta_por_lru_e_memoria():
+    cache = CacheTTL(max_entradas=2, max_bytes=100, medir=len)
+    cache.obter("a", lambda: "x" * 10)
+    cache.obter("b", lambda: "x" * 10)
+    cache.consultar("a")
+    cache.obter("c", lambda: "x" * 10)
+    assert cache.consultar("b") is None and cache.consultar("a") is not None
+
+    cache.obter("d", lambda: "x" * 95)
+    assert cache.estatisticas()["entradas"] == 1
+    cache.obter("grande", lambda: "x" * 101)
+    assert cache.consultar("grande") is None
+
+    cache.obter("curto", lambda: "x", ttl=-1)
+    assert cache.consultar("curto") is None
+    assert cache.estatisticas()["expiradas"] == 1
+
+
+def test_cache_ttl_invalidar_com_filtro():
+    cache = CacheTTL()
+    for chave in (("linha", 1), ("linha", 2), ("sob_encomenda", 1)):
+        cache.obter(chave, lambda: "ops")
+    assert cache.invalidar(lambda chave: chave[0] == "linha") == 2
+    assert cache.consultar(("sob_encomenda", 1)) == "ops"
+
+
+class ERPFalso:
+    """Uma OP por dia; registra as faixas pedidas."""
+
+    def __init__(self):
+        self.faixas = []
+        self.durante_busca = None
+
+    def __call__(self, tipo, inicio, fim):
+        self.faixas.append((tipo, inicio, fim))
+        if self.durante_busca:
+            self.durante_busca()
+        dias = pd.date_range(inicio, fim)
+        return pd.DataFrame({"DATA_PREV": dias, "COD_OP": [f"{tipo}-{d:%d}" for d in dias]})
+
+
+@pytest.fixture
+def erp():
+    return ERPFalso()
+
+
+@pytest.fixture
+def particoes(erp):
+    return ParticoesDiarias(erp, "DATA_PREV", CacheTTL(max_entradas=1000))
+
+
+def test_so_busca_os_dias_que_faltam(particoes, erp):
+    particoes.carregar(["linha"], dia(2), dia(3))
+    particoes.carregar(["linha"], dia(6), dia(6))
+    df = particoes.carregar(["linha", "sob_encomenda"], dia(0), dia(7))
+
+    assert erp.faixas[2:] == [("linha", dia(0), dia(1)), ("linha", dia(4), dia(5)), ("linha", dia(7), dia(7)),
+                              ("sob_encomenda", dia(0), dia(7))]
+    assert list(df["COD_OP"]) == [f"linha-{n:02d}" for n in range(1, 9)] + [f"sob_encomenda-{n:02d}" for n in range(1, 9)]
+    assert particoes.carregar(["linha"], dia(0), dia(7), somente_cache=True) is not None
+
+
+def test_dias_sem_ops_nao_sao_consultados_de_novo(particoes, erp):
+    erp_vazio = lambda tipo, inicio, fim: erp(tipo, inicio, fim).iloc[0:0]
+    particoes.buscar = erp_vazio
+    assert particoes.carregar(["linha"], dia(0), dia(2)).empty
+    assert particoes.carregar(["linha"], dia(0), dia(2), somente_cache=True).empty
+    assert len(erp.faixas) == 1
+
+
+def test_invalidacao_durante_a_busca_nao_guarda_o_resultado(particoes, erp):
+    erp.durante_busca = particoes.cache.invalidar
+    # Quem pediu recebe o resultado, mas ele não fica no cache (pode estar desatualizado)
+    assert len(particoes.carregar(["linha"], dia(0), dia(2))) == 3
+    assert particoes.carregar(["linha"], dia(0), dia(2), somente_cache=True) is None
+
+    erp.durante_busca = None
+    particoes.carregar(["linha"], dia(0), dia(2))
+    assert particoes.carregar(["linha"], dia(0), dia(2), somente_cache=True) is not None
+    assert len(erp.faixas) == 2
+
+
+def test_buscas_simultaneas_da_mesma_faixa_vao_uma_vez_ao_erp(particoes, erp):
+    liberar = threading.Event()
+    erp.durante_busca = lambda: liberar.wait(5)
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(particoes.carregar(["linha"], dia(0), dia(4))))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    threading.Timer(0.2, liberar.set).start()
+    for thread in threads:
+        thread.join(10)
+
+    assert len(erp.faixas) == 1
+    assert [len(df) for df in resultados] == [5] * 4
+
+
+def test_limite_de_memoria_e_dividido_entre_os_caches(monkeypatch):
+    from src.logic import cache_ops
+    from src.logic.configuracao import recarregar_configuracao
+
+    monkeypatch.setenv("CACHE_OPS_MAX_MB", "64")
+    recarregar_configuracao()
+    for nome in ("_cache_ops", "_cache_dias", "_cache_op"):
+        monkeypatch.setattr(cache_ops, nome, None)
+    try:
+        caches = [cache_ops.obter_cache_ops(), cache_ops.obter_cache_dias(), cache_ops.obter_cache_op()]
+        assert sum(c.max_bytes for c in caches) == 64 * 1024 * 1024
+    finally:
+        monkeypatch.undo()
+        recarregar_configuracao()
@@ -0,0 +1,171 @@
+# tests/test_conexao.py
+import threading
+
+import pytest
+
+from src.database import conexao
+from src.database.conexao import PoolConexoes, PoolEsgotado
+from src.logic.configuracao import recarregar_configuracao
+
+
+class ConexaoFalsa:
+    def __init__(self):
+        self.fechada = False
+        self.quebrada = False
+
+    def is_closed(self):
+        return self.fechada
+
+    def cursor(self):
+        if self.quebrada:
+            raise OSError("conexão perdida")
+        return CursorFalso()
+
+    def rollback(self):
+        if self.quebrada:
+            raise OSError("conexão perdida")
+
+    def close(self):
+        self.fechada = True
+
+
+class CursorFalso:
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def abertas():
+    return []
+
+
+@pytest.fixture
+def fabrica(abertas):
+    def abrir():
+        con = ConexaoFalsa()
+        abertas.append(con)
+        return con
+    return abrir
+
+
+def test_preencher_abre_o_minimo_de_conexoes_ociosas(fabrica, abertas):
+    pool = PoolConexoes(fabrica, minimo=3, maximo=5)
+    pool.preencher()
+    assert len(abertas) == 3
+    assert pool.estatisticas()["livres"] == 3
+
+    # Já no mínimo: nada a abrir
+    pool.preencher()
+    assert len(abertas) == 3
+
+
+def test_conexao_devolvida_e_reutilizada(fabrica, abertas):
+    pool = PoolConexoes(fabrica, minimo=1, maximo=2)
+    pool.preencher()
+    with pool.conexao() as con:
+        assert con is abertas[0]
+        assert pool.estatisticas()["em_uso"] == 1
+    with pool.conexao() as con:
+        assert con is abertas[0]
+    estatisticas = pool.estatisticas()
+    assert (estatisticas["criadas"], estatisticas["reutilizadas"], estatisticas["livres"]) == (1, 2, 1)
+
+
+def test_pool_no_maximo_espera_e_esgota(fabrica):
+    pool = PoolConexoes(fabrica, minimo=0, maximo=2, timeout=0.2)
+    with pool.conexao(), pool.conexao():
+        with pytest.raises(PoolEsgotado):
+            with pool.conexao():
+                pass
+
+    # Quem espera recebe a conexão devolvida por outra thread
+    pool.timeout = 5
+    recebida = []
+
+    def esperar():
+        with pool.conexao() as con:
+            recebida.append(con)
+
+    with pool.conexao() as primeira, pool.conexao():
+        espera = threading.Thread(target=esperar)
+        espera.start()
+        espera.join(0.1)
+        assert espera.is_alive()
+    espera.join(5)
+    assert recebida[0] is primeira
+    assert pool.estatisticas()["esperas"] >= 2
+
+
+def test_conexao_quebrada_e_substituida(fabrica, abertas):
+    pool = PoolConexoes(fabrica, minimo=1, maximo=1, verificar_apos=0)
+    pool.preencher()
+    abertas[0].quebrada = True
+    with pool.conexao() as con:
+        assert con is abertas[1]
+    assert abertas[0].fechada
+    assert pool.estatisticas()["descartadas"] == 1
+
+
+def test_erro_no_bloco_descarta_conexao_que_nao_responde(fabrica, abertas):
+    pool = PoolConexoes(fabrica, minimo=0, maximo=1)
+    with pytest.raises(OSError):
+        with pool.conexao() as con:
+            con.quebrada = True
+            raise OSError("consulta falhou")
+    assert abertas[0].fechada
+    assert pool.estatisticas()["livres"] == 0
+
+
+def test_ociosas_alem_do_minimo_expiram(fabrica, abertas):
+    pool = PoolConexoes(fabrica, minimo=1, maximo=3, ocioso_max=0)
+    with pool.conexao(), pool.conexao(), pool.conexao():
+        pass
+    with pool.conexao():
+        pass
+    assert sum(con.fechada for con in abertas) == 2
+    assert pool.estatisticas()["livres"] == 1
+
+
+def test_fechar_fecha_livres_e_recusa_emprestimos(fabrica, abertas):
+    pool = PoolConexoes(fabrica, minimo=2, maximo=2)
+    pool.preencher()
+    pool.fechar()
+    assert all(con.fechada for con in abertas)
+    with pytest.raises(RuntimeError):
+        with pool.conexao():
+            pass
+
+
+@pytest.fixture
+def pool_compartilhado(tmp_path, monkeypatch):
+    monkeypatch.setenv("ERP_LOCAL_PATH", str(tmp_path / "erp.db"))
+    monkeypatch.setenv("FIREBIRD_POOL_MIN", "2")
+    recarregar_configuracao()
+    monkeypatch.setattr(conexao, "_pool", None)
+    yield
+    if conexao._pool is not None:
+        conexao._pool.fechar()
+    monkeypatch.undo()
+    recarregar_configuracao()
+
+
+def test_obter_pool_ja_abre_as_conexoes_minimas(pool_compartilhado):
+    pool = conexao.obter_pool()
+    assert pool is conexao.obter_pool()
+    assert pool.estatisticas()["livres"] == 2
+    assert pool.estatisticas()["criadas"] == 2
+
+
+def test_obter_pool_sem_erp_cria_o_pool_mesmo_assim(pool_compartilhado, monkeypatch):
+    def falhar(*args):
+        raise OSError("ERP fora do ar")
+    monkeypatch.setattr("src.database.erp_local.conectar", falhar)
+    pool = conexao.obter_pool()
+    assert pool.estatisticas()["livres"] == 0
+    assert pool.estatisticas()["falhas_conexao"] == 1
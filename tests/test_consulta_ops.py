@@ -0,0 +1,200 @@
+# tests/test_consulta_ops.py
+import os
+import subprocess
+import sys
+from unittest import mock
+
+import pandas as pd
+import pytest
+
+from src.database.conexao import PoolConexoes
+from src.logic import consulta_ops
+from src.logic.cache_ops import invalidar_cache_ops
+from src.logic.indice_codigos import IndiceOpsAbertas
+from src.logic.metricas import PREPARACOES
+
+
+def test_aquecer_abre_as_conexoes_minimas_e_carrega_as_ops_abertas(monkeypatch):
+    pool = PoolConexoes(mock.Mock, minimo=2, maximo=4)
+    monkeypatch.setattr(consulta_ops, "obter_pool", lambda: pool)
+    monkeypatch.setattr(consulta_ops, "atualizar_ops_abertas", lambda: 7)
+    assert consulta_ops.aquecer() == 7
+    assert pool.estatisticas()["livres"] == 2
+
+
+def test_aquecer_propaga_falha_do_erp(monkeypatch):
+    def falhar():
+        raise OSError("ERP fora do ar")
+    monkeypatch.setattr(consulta_ops, "obter_pool", lambda: PoolConexoes(falhar, minimo=1))
+    monkeypatch.setattr(consulta_ops, "atualizar_ops_abertas", lambda: 0)
+    with pytest.raises(OSError):
+        consulta_ops.aquecer()
+
+
+def test_importar_o_app_nao_carrega_pandas_nem_o_driver_do_erp():
+    # Processo novo: nesta sessão de testes o pandas já foi importado
+    codigo = "import sys, src.main_web; print(sorted({'pandas', 'numpy', 'firebird.driver'} & set(sys.modules)))"
+    saida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True, timeout=60,
+                           cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           env={**os.environ, "LOG_NIVEL": "DESLIGADO"})
+    assert saida.stdout.strip() == "[]"
+
+
+class ArmazemFalso:
+    def __init__(self, somas):
+        self.somas = somas
+
+    def somas_por_op(self):
+        return dict(self.somas)
+
+    def qtd_registrada(self, cod_op):
+        return self.somas.get(cod_op, 0)
+
+
+def test_status_vetorizado_igual_ao_de_uma_op():
+    df = pd.DataFrame({"QTD_REGISTRADA": [0, 1, 2, 3, 1, 0], "QTD_PREVISTA": [2, 2, 2, 2, None, None]})
+    status = consulta_ops.classificar_status(df)
+    assert list(status) == ["🔴 Pendente", "✅ Registrando", "✅ Registro OK", "⚠️ Registro a maior",
+                            "⚠️ Registro a maior", "🔴 Pendente"]
+    assert list(status) == [consulta_ops.status_leitura(r, p) for r, p in zip(df["QTD_REGISTRADA"], df["QTD_PREVISTA"])]
+
+
+def test_enriquecimento_so_soma_as_quantidades(monkeypatch):
+    monkeypatch.setattr(consulta_ops, "obter_armazem", lambda: ArmazemFalso({"100": 3}))
+    df = consulta_ops._enriquecer_registros(pd.DataFrame({"CODIGO_OP": [100, 200], "QTD_PREVISTA": [5, 5]}))
+    assert list(df["CODIGO_OP"]) == ["100", "200"]
+    assert list(df["QTD_REGISTRADA"]) == [3, 0]
+    assert "STATUS" not in df.columns
+
+
+def test_deltas_uma_entrada_por_op_com_status_das_ops_abertas(monkeypatch):
+    indice = IndiceOpsAbertas()
+    indice.definir(pd.DataFrame([{"CODIGO_OP": "100", "QTD_PREVISTA": 3, "CODIGO_BARRAS": "7891234567895"}]))
+    monkeypatch.setattr(consulta_ops, "obter_ops_abertas", lambda: indice)
+    monkeypatch.setattr(consulta_ops, "obter_armazem", lambda: ArmazemFalso({"100": 3, "200": 1}))
+    deltas = consulta_ops.deltas_leituras([{"COD_OP": "100"}, {"COD_OP": " 200 "}, {"COD_OP": "100"}, {"COD_OP": ""}])
+    # Fora do índice de OPs abertas não há QTD_PREVISTA: o painel recalcula o status
+    assert deltas == [{"CODIGO_OP": "100", "QTD_REGISTRADA": 3, "STATUS": "✅ Registro OK"},
+                      {"CODIGO_OP": "200", "QTD_REGISTRADA": 1}]
+
+
+def test_uma_linha_por_op_com_todos_os_codigos_de_barras(erp_local):
+    ops, _ = erp_local
+    invalidar_cache_ops()
+    try:
+        df = consulta_ops.carregar_ops_intervalo("2025-03-01", "2025-03-10")
+    finally:
+        invalidar_cache_ops()
+    assert len(df) == df["CODIGO_OP"].nunique() == 60
+    codigos = {op["CODIGO_OP"]: sorted(op["CODIGOS_BARRAS"]) for op in ops}
+    assert {linha["CODIGO_OP"]: sorted(linha["CODIGOS_BARRAS"] + linha["CODS_OP"])
+            for linha in df.to_dict(orient="records")} == codigos
+
+
+def test_busca_direta_de_uma_op_com_quantidade_sempre_atual(erp_local, armazem, monkeypatch):
+    ops, _ = erp_local
+    cod_op = ops[7]["CODIGO_OP"]
+    invalidar_cache_ops()
+    try:
+        df = consulta_ops.carregar_op(cod_op)
+        assert list(df["CODIGO_OP"]) == [cod_op] and list(df["QTD_REGISTRADA"]) == [0]
+        assert consulta_ops.carregar_op("999999").empty
+
+        # A parte do ERP vem do cache da OP; as leituras novas entram mesmo assim
+        armazem.registrar({"DATA": "2025-03-05 10:00:00", "COD_OP": cod_op, "QTD": 2})
+        monkeypatch.setattr(consulta_ops, "obter_pool", lambda: PoolConexoes(erp_fora_do_ar, timeout=1))
+        assert list(consulta_ops.carregar_op(f" {cod_op} ")["QTD_REGISTRADA"]) == [2]
+    finally:
+        invalidar_cache_ops()
+
+
+def test_consulta_parametrizada_com_poucos_textos_distintos():
+    sql_2, params_2 = consulta_ops._montar_consulta("linha", codigos_op=["10", "20"], subespecie="Sub'A")
+    sql_4, params_4 = consulta_ops._montar_consulta("linha", codigos_op=["10", "20", "30", "40"], subespecie="x")
+    # Valores só como parâmetros; a lista de códigos é completada até o tamanho do lote
+    assert sql_2 == sql_4 and "Sub" not in sql_2 and "'10'" not in sql_2
+    assert params_2 == ["10", "20", "20", "20", "SUB'A"]
+    assert params_4[:4] == ["10", "20", "30", "40"]
+
+    sql, params = consulta_ops._montar_consulta("sob_encomenda", "2025-03-01", "2025-03-10")
+    # Comparação direta na coluna (usa o índice de data), período semiaberto
+    assert "opp.data_prev_inicio >= ? AND opp.data_prev_inicio < ?" in sql
+    assert [p.isoformat() for p in params] == ["2025-03-01T00:00:00", "2025-03-11T00:00:00"]
+
+
+def test_consulta_preparada_uma_vez_por_conexao(erp_local):
+    ops, _ = erp_local
+    invalidar_cache_ops()
+    antes = PREPARACOES.valor(consulta="linha")
+    try:
+        # OPs de linha diferentes (fora do cache) reaproveitam o mesmo comando da única conexão
+        for op in ops[0:8:2]:
+            assert len(consulta_ops.carregar_op(op["CODIGO_OP"])) == 1
+    finally:
+        invalidar_cache_ops()
+    assert PREPARACOES.valor(consulta="linha") == antes + 1
+
+
+def erp_fora_do_ar():
+    raise OSError("ERP fora do ar")
+
+
+def test_falha_do_erp_e_propagada_sem_ficar_em_cache(erp_local, monkeypatch):
+    _, pool = erp_local
+    invalidar_cache_ops()
+    monkeypatch.setattr(consulta_ops, "obter_pool", lambda: PoolConexoes(erp_fora_do_ar, timeout=1))
+    with pytest.raises(OSError):
+        consulta_ops.carregar_ops_intervalo("2025-03-01", "2025-03-10")
+    with pytest.raises(OSError):
+        consulta_ops.carregar_op("OP000001")
+
+    # O ERP volta: a próxima consulta vai a ele em vez de devolver um resultado vazio guardado
+    monkeypatch.setattr(consulta_ops, "obter_pool", lambda: pool)
+    try:
+        assert len(consulta_ops.carregar_ops_intervalo("2025-03-01", "2025-03-10")) == 60
+    finally:
+        invalidar_cache_ops()
+
+
+def test_ops_abertas_mantem_o_indice_anterior_se_o_erp_falhar(monkeypatch):
+    indice = IndiceOpsAbertas()
+    indice.definir(pd.DataFrame([{"CODIGO_OP": "100", "QTD_PREVISTA": 2, "CODIGO_BARRAS": "7891234567895"}]))
+    monkeypatch.setattr(consulta_ops, "obter_ops_abertas", lambda: indice)
+
+    def carregar_ops_intervalo(*args, **kwargs):
+        erp_fora_do_ar()
+
+    monkeypatch.setattr(consulta_ops, "carregar_ops_intervalo", carregar_ops_intervalo)
+    assert consulta_ops.atualizar_ops_abertas() == 1
+    assert indice.tentado_em is not None
+
+
+def test_exportacao_em_paginas_devolve_a_conexao_entre_elas(erp_local, monkeypatch):
+    ops, pool = erp_local
+    monkeypatch.setattr(consulta_ops, "obter_armazem", lambda: ArmazemFalso({ops[0]["CODIGO_OP"]: 1}))
+
+    blocos = consulta_ops.iterar_ops_exportacao("2025-03-01", "2025-03-10", lote=7)
+    exportadas = []
+    for bloco in blocos:
+        # Enquanto o bloco é consumido (download lento), a conexão já está livre para outras consultas
+        assert pool.estatisticas()["em_uso"] == 0
+        with pool.conexao():
+            pass
+        assert len(bloco) <= 7
+        exportadas.extend(bloco)
+
+    assert sorted(op["CODIGO_OP"] for op in exportadas) == sorted(op["CODIGO_OP"] for op in ops)
+    assert [op["TIPO_OP"] for op in exportadas] == ["LIN_PROD"] * 30 + ["SOB_ENC"] * 30
+    primeira = next(op for op in exportadas if op["CODIGO_OP"] == ops[0]["CODIGO_OP"])
+    assert (primeira["QTD_REGISTRADA"], primeira["STATUS"]) == (1, consulta_ops.status_leitura(1, primeira["QTD_PREVISTA"]))
+
+
+def test_exportacao_com_filtros_e_pagina_exata(erp_local, monkeypatch):
+    ops, pool = erp_local
+    monkeypatch.setattr(consulta_ops, "obter_armazem", lambda: ArmazemFalso({}))
+    codigos = [op["CODIGO_OP"] for op in ops[:10]]
+
+    blocos = list(consulta_ops.iterar_ops_exportacao("2025-03-01", "2025-03-10", codigos_op=codigos, lote=5))
+    assert [len(b) for b in blocos] == [5, 5]
+    assert sorted(op["CODIGO_OP"] for b in blocos for op in b) == sorted(codigos)
+    assert list(consulta_ops.iterar_ops_exportacao("2025-03-01", "2025-03-10", id_produto="abc")) == []
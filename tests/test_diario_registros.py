@@ -0,0 +1,57 @@
+# tests/test_diario_registros.py
+import csv
+import multiprocessing
+
+from src.logic.diario_registros import COLUNAS_REGISTROS, DiarioRegistros, recuperar_linha_parcial
+
+PROCESSOS = 4
+LEITURAS_POR_PROCESSO = 500
+
+
+def _gravar_leituras(caminho, processo, quantidade):
+    diario = DiarioRegistros(caminho, intervalo_fsync=0.05)
+    for i in range(quantidade):
+        # Lotes de tamanhos variados e uma coluna longa: escritas grandes também não podem se misturar
+        lote = [{"DATA": "2025-03-10 10:00:00", "COD_OP": f"P{processo}", "ID_PRODUTO": str(i),
+                 "NOME_PRODUTO": "X" * (i % 7 * 700), "QTD": 1, "USUARIO": f"p{processo}"}]
+        diario.registrar_lote(lote)
+    diario.fechar()
+
+
+def test_gravacoes_simultaneas_de_varios_processos(registros):
+    contexto = multiprocessing.get_context("spawn")
+    processos = [contexto.Process(target=_gravar_leituras, args=(registros, p, LEITURAS_POR_PROCESSO))
+                 for p in range(PROCESSOS)]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join(120)
+    assert [p.exitcode for p in processos] == [0] * PROCESSOS
+
+    with open(registros, "r", encoding="utf-8", newline="") as arq:
+        linhas = list(csv.reader(arq))
+    assert linhas[0] == COLUNAS_REGISTROS
+    assert all(len(linha) == len(COLUNAS_REGISTROS) for linha in linhas[1:])
+    for p in range(PROCESSOS):
+        produtos = [linha[3] for linha in linhas[1:] if linha[1] == f"P{p}"]
+        # Nenhuma leitura perdida ou repetida, e cada processo na sua ordem de gravação
+        assert produtos == [str(i) for i in range(LEITURAS_POR_PROCESSO)]
+
+
+def test_linha_parcial_e_descartada(registros):
+    with open(registros, "ab") as arq:
+        arq.write(b"2025-03-10 10:00:00,A,789,1,Produto")
+
+    assert recuperar_linha_parcial(registros) > 0
+    with open(registros, "rb") as arq:
+        assert arq.read().count(b"\n") == 1
+
+
+def test_ultima_linha_completa_sem_quebra_e_mantida(registros):
+    linha = b'2025-03-10 10:00:00,A,789,1,"Produto, X",E,S,1,joao'
+    with open(registros, "ab") as arq:
+        arq.write(linha)
+
+    assert recuperar_linha_parcial(registros) == 0
+    with open(registros, "rb") as arq:
+        assert arq.read().endswith(linha + b"\n")
@@ -0,0 +1,46 @@
+# tests/test_execucao.py
+import asyncio
+import threading
+
+import pytest
+
+from src.logic.execucao import em_thread, executar_em_paralelo
+
+
+def test_em_thread_nao_bloqueia_o_event_loop():
+    liberar = threading.Event()
+
+    def consulta_bloqueante():
+        # Só termina se o event loop continuar livre para rodar liberar_depois()
+        return liberar.wait(5)
+
+    async def liberar_depois():
+        await asyncio.sleep(0.01)
+        liberar.set()
+
+    async def cenario():
+        resultado, _ = await asyncio.gather(em_thread(consulta_bloqueante), liberar_depois())
+        return resultado
+
+    assert asyncio.run(cenario()) is True
+
+
+def test_tarefas_rodam_ao_mesmo_tempo_e_na_ordem():
+    # Como as consultas de linha e sob encomenda: uma espera pela outra na barreira
+    barreira = threading.Barrier(2, timeout=5)
+
+    def consulta(tipo):
+        barreira.wait()
+        return tipo
+
+    assert executar_em_paralelo([lambda: consulta("linha"), lambda: consulta("sob_encomenda")]) == [
+        "linha", "sob_encomenda"]
+    assert executar_em_paralelo([threading.get_ident]) == [threading.get_ident()]
+
+
+def test_falha_de_uma_tarefa_e_propagada():
+    def falhar():
+        raise OSError("ERP fora do ar")
+
+    with pytest.raises(OSError):
+        executar_em_paralelo([lambda: 1, falhar])
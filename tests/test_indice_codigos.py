@@ -0,0 +1,99 @@
+# tests/test_indice_codigos.py
+import pandas as pd
+
+from src.logic.indice_codigos import (
+    MOTIVO_CODIGO_INVALIDO, MOTIVO_CODIGO_NAO_PERTENCE, MOTIVO_OK, MOTIVO_OP_DESCONHECIDA, MOTIVO_SEM_OP_ABERTA,
+    MOTIVO_SEM_SALDO, IndiceCodigos, IndiceOpsAbertas
+)
+
+EAN = "7891234567895"
+
+
+def op(cod_op, codigos=(EAN,), subdivisoes=()):
+    return {"CODIGO_OP": cod_op, "CODIGOS_BARRAS": list(codigos), "CODIGO_BARRAS": codigos[0] if codigos else None,
+            "CODS_OP": list(subdivisoes), "COD_OP": subdivisoes[0] if subdivisoes else None}
+
+
+def test_validar_aceita_codigos_do_produto_e_das_subdivisoes():
+    indice = IndiceCodigos()
+    indice.atualizar(pd.DataFrame([op("100", (EAN, "7890000000001"), ("100A", "100B")), op("200")]))
+
+    assert indice.validar("100", EAN) == (True, MOTIVO_OK)
+    assert indice.validar(" 100 ", "7890000000001 ") == (True, MOTIVO_OK)
+    assert indice.validar("100", "100B") == (True, MOTIVO_OK)
+    assert indice.validar("200", "100A") == (False, MOTIVO_CODIGO_NAO_PERTENCE)
+    assert indice.validar("300", EAN) == (False, MOTIVO_OP_DESCONHECIDA)
+    assert indice.validar("100", "") == (False, MOTIVO_CODIGO_INVALIDO)
+    assert indice.validar("100", "789-123") == (False, MOTIVO_CODIGO_INVALIDO)
+
+
+def test_atualizar_substitui_os_codigos_da_op():
+    indice = IndiceCodigos()
+    indice.atualizar_op(op("100"))
+    indice.atualizar(pd.DataFrame([op("100", ("7890000000001",))]))
+    assert indice.validar("100", EAN) == (False, MOTIVO_CODIGO_NAO_PERTENCE)
+    assert indice.validar("100", "7890000000001") == (True, MOTIVO_OK)
+
+
+def test_indice_limitado_descarta_as_ops_atualizadas_ha_mais_tempo():
+    indice = IndiceCodigos(max_ops=3)
+    indice.atualizar(pd.DataFrame([op(str(n)) for n in range(1, 4)]))
+    # A OP 1 é reconsultada (como as OPs abertas a cada atualização da janela) e fica
+    indice.atualizar_op(op("1"))
+    indice.atualizar(pd.DataFrame([op("4"), op("5")]))
+
+    assert len(indice) == 3
+    assert [indice.conhece(str(n)) for n in range(1, 6)] == [True, False, False, True, True]
+
+
+def ops_abertas(*ops):
+    indice = IndiceOpsAbertas()
+    indice.definir(pd.DataFrame([{**op(cod_op, codigos, subdivisoes), "DATA_PREVISTA": data, "QTD_PREVISTA": prevista,
+                                  "ID_PRODUTO": 1, "NOME_PRODUTO": "Mesa"}
+                                 for cod_op, data, prevista, codigos, subdivisoes in ops]))
+    return indice
+
+
+def test_resolver_escolhe_a_op_mais_antiga_com_saldo():
+    indice = ops_abertas(("300", "2025-03-12", 2, (EAN,), ()),
+                         ("100", "2025-03-10", 1, (EAN,), ()),
+                         ("200", None, 5, (EAN,), ()),
+                         ("150", "2025-03-10", 3, (EAN,), ()))
+    registradas = {}
+
+    def resolver():
+        dados, motivo = indice.resolver(EAN, lambda cod_op: registradas.get(cod_op, 0))
+        if dados:
+            registradas[dados["CODIGO_OP"]] = registradas.get(dados["CODIGO_OP"], 0) + 1
+        return dados["CODIGO_OP"] if dados else motivo
+
+    # Mesma data: desempata pelo código; sem data: por último
+    assert [resolver() for _ in range(12)] == ["100"] + ["150"] * 3 + ["300"] * 2 + ["200"] * 5 + [MOTIVO_SEM_SALDO]
+    assert len(indice) == 4
+
+
+def test_resolver_pelo_codigo_da_subdivisao_e_rejeicoes():
+    indice = ops_abertas(("100", "2025-03-10", 1, (EAN,), ("100A",)))
+    dados, motivo = indice.resolver("100A", lambda cod_op: 0)
+    assert (dados["CODIGO_OP"], dados["QTD_PREVISTA"], motivo) == ("100", 1.0, MOTIVO_OK)
+
+    # A cópia devolvida não altera o índice
+    dados["QTD_PREVISTA"] = 0
+    assert indice.dados("100")["QTD_PREVISTA"] == 1.0
+
+    assert indice.resolver("7890000000001", lambda cod_op: 0) == (None, MOTIVO_SEM_OP_ABERTA)
+    assert indice.resolver("", lambda cod_op: 0) == (None, MOTIVO_CODIGO_INVALIDO)
+
+
+def test_definir_substitui_a_janela_inteira():
+    indice = ops_abertas(("100", "2025-03-10", 1, (EAN,), ()))
+    indice.definir(pd.DataFrame([{**op("200"), "DATA_PREVISTA": "2025-03-11", "QTD_PREVISTA": 1}]))
+    assert indice.dados("100") is None
+    assert indice.resolver(EAN, lambda cod_op: 0)[0]["CODIGO_OP"] == "200"
+
+
+def test_reservar_tentativa_respeita_a_espera():
+    indice = IndiceOpsAbertas()
+    assert indice.reservar_tentativa(60)
+    assert not indice.reservar_tentativa(60)
+    assert indice.reservar_tentativa(0)
@@ -0,0 +1,106 @@
+# tests/test_indice_registros.py
+import multiprocessing
+import os
+
+import pytest
+
+from src.logic.diario_registros import DiarioRegistros
+from src.logic.indice_registros import IndiceRegistros
+from src.logic.particoes_registros import ParticoesRegistros
+
+MES_FECHADO = "2025-02"
+MES_ATUAL = "2025-03"
+
+
+def leitura(cod_op, mes=MES_FECHADO):
+    return {"DATA": f"{mes}-10 10:00:00", "COD_OP": cod_op, "ID_PRODUTO": "1", "QTD": 1, "USUARIO": "teste"}
+
+
+def _gravar_em_outro_processo(caminho, linhas):
+    diario = DiarioRegistros(caminho, intervalo_fsync=0)
+    diario.registrar_lote(linhas, sincronizar=True)
+    diario.fechar()
+
+
+def _rotacionar_em_outro_processo(caminho, pasta):
+    diario = DiarioRegistros(caminho, intervalo_fsync=0)
+    particoes = ParticoesRegistros(pasta)
+    diario.reescrever(lambda aberto: particoes.rotacionar(aberto, MES_ATUAL))
+    diario.fechar()
+
+
+def em_outro_processo(funcao, *args):
+    processo = multiprocessing.get_context("spawn").Process(target=funcao, args=args)
+    processo.start()
+    processo.join(60)
+    assert processo.exitcode == 0
+
+
+@pytest.fixture
+def pasta_particoes(tmp_path):
+    return str(tmp_path / "registros_particoes")
+
+
+@pytest.fixture
+def diario(registros):
+    diario = DiarioRegistros(registros, intervalo_fsync=0)
+    yield diario
+    diario.fechar()
+
+
+@pytest.fixture
+def indice(registros, diario, pasta_particoes):
+    indice = IndiceRegistros(registros, ParticoesRegistros(pasta_particoes), diario.trava)
+    indice.somas_por_op()
+    diario.ao_gravar(indice.ao_gravar)
+    return indice
+
+
+def test_indice_acompanha_gravacoes_de_outro_processo(registros, diario, indice):
+    externas = []
+    indice.ao_ler_externas(externas.extend)
+    diario.registrar_lote([leitura("A")] * 3)
+    assert indice.qtd_registrada("A") == 3
+
+    em_outro_processo(_gravar_em_outro_processo, registros, [leitura("A")] * 5 + [leitura("B")] * 2)
+    assert indice.acompanhar() == 7
+    assert [l["COD_OP"] for l in externas] == ["A"] * 5 + ["B"] * 2
+    assert indice.qtd_registrada("A") == 8
+    assert indice.qtd_registrada("B", "1") == 2
+
+    # Gravação local depois da externa: o trecho do outro processo não é somado duas vezes
+    em_outro_processo(_gravar_em_outro_processo, registros, [leitura("B")])
+    diario.registrar_lote([leitura("A")])
+    assert indice.somas_por_op() == {"A": 9, "B": 3}
+    assert indice.acompanhar() == 0
+    assert [l["COD_OP"] for l in externas][-1] == "B"
+
+
+def test_indice_continua_certo_depois_de_rotacao_em_outro_processo(registros, diario, indice, pasta_particoes):
+    diario.registrar_lote([leitura("A")] * 4 + [leitura("B", MES_ATUAL)] * 2)
+    assert indice.somas_por_op() == {"A": 4, "B": 2}
+
+    em_outro_processo(_rotacionar_em_outro_processo, registros, pasta_particoes)
+    assert ParticoesRegistros(pasta_particoes).meses() == [MES_FECHADO]
+    assert indice.somas_por_op() == {"A": 4, "B": 2}
+
+    # O diário deste processo passa a gravar no arquivo novo e o índice segue a partir dele
+    diario.registrar_lote([leitura("A", MES_ATUAL)])
+    assert indice.qtd_registrada("A") == 5
+    assert os.stat(registros).st_ino == os.fstat(diario._arquivo.fileno()).st_ino
+
+    recontagem = IndiceRegistros(registros, ParticoesRegistros(pasta_particoes))
+    assert recontagem.somas_por_op() == indice.somas_por_op() == {"A": 5, "B": 2}
+
+
+def test_gravacoes_locais_somadas_sem_reler_o_arquivo(registros, diario, indice, monkeypatch):
+    diario.registrar_lote([leitura("A")] * 2)
+
+    def reler():
+        raise AssertionError("o índice não deveria reler o arquivo inteiro")
+
+    monkeypatch.setattr(indice, "_recarregar_tudo", reler)
+    diario.registrar_lote([{**leitura("A"), "ID_PRODUTO": "2", "QTD": 3}, {**leitura("B"), "QTD": "x"}])
+    # QTD inválida conta como uma leitura, como no enriquecimento antigo
+    assert indice.somas_por_op() == {"A": 5, "B": 1}
+    assert (indice.qtd_registrada("A", "1"), indice.qtd_registrada("A", "2"), indice.qtd_registrada("C")) == (2, 3, 0)
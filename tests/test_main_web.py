@@ -0,0 +1,205 @@
+# tests/test_main_web.py
+import pandas as pd
+import pytest
+
+from src import main_web
+from src.database.conexao import PoolConexoes
+from src.logic import armazem_leituras, consulta_ops
+from src.logic.cache_ops import invalidar_cache_ops
+from src.logic.indice_codigos import IndiceCodigos, IndiceOpsAbertas
+
+EAN = "7891234567895"
+
+
+def test_pagina_da_op_valida_os_mesmos_codigos_que_o_servidor(cliente, monkeypatch):
+    df = pd.DataFrame([{"CODIGO_OP": "100", "NOME_PRODUTO": "Mesa", "ID_PRODUTO": 1, "QTD_REGISTRADA": 0,
+                        "CODIGOS_BARRAS": ["7891234567895"], "CODIGO_BARRAS": "7891234567895",
+                        "CODS_OP": ["100A", "100B"], "COD_OP": "100A"}])
+
+    async def carregar_op_async(cod_op):
+        return df.copy()
+
+    monkeypatch.setattr(consulta_ops, "carregar_op_async", carregar_op_async)
+    resposta = cliente.get("/op/100")
+    assert resposta.status_code == 200
+    assert 'const codigosEsperados = ["100A", "100B", "7891234567895"];' in resposta.text
+
+
+@pytest.fixture
+def ops_abertas(monkeypatch):
+    indice = IndiceOpsAbertas()
+    monkeypatch.setattr(main_web, "obter_ops_abertas", lambda: indice)
+    return indice
+
+
+def test_leitura_automatica_distribui_entre_as_ops_abertas(cliente, armazem, ops_abertas):
+    ops_abertas.definir(pd.DataFrame([
+        {"CODIGO_OP": cod_op, "DATA_PREVISTA": data, "QTD_PREVISTA": 2, "CODIGOS_BARRAS": [EAN], "ID_PRODUTO": 1,
+         "NOME_PRODUTO": "Mesa", "ESPECIE": "Móveis", "SUB_ESPECIE": "Mesas"}
+        for cod_op, data in (("200", "2025-03-11"), ("100", "2025-03-10"))]))
+
+    respostas = [cliente.post("/api/registrar_leitura/auto", json={"codigo_barras": EAN}) for _ in range(5)]
+    assert [r.json().get("cod_op") for r in respostas[:4]] == ["100", "100", "200", "200"]
+    assert respostas[1].json()["qtd_registrada"] == 2
+    assert (respostas[4].status_code, respostas[4].json()["motivo"]) == (422, "SEM_SALDO_PENDENTE")
+    assert armazem.somas_por_op() == {"100": 2, "200": 2}
+
+
+def test_leitura_automatica_sem_ops_carregadas_responde_503(cliente, armazem, ops_abertas, monkeypatch):
+    cargas = []
+    monkeypatch.setattr(main_web, "_atualizar_ops_abertas", lambda: cargas.append(1))
+    respostas = [cliente.post("/api/registrar_leitura/auto", json={"codigo_barras": EAN}) for _ in range(3)]
+    assert [r.status_code for r in respostas] == [503] * 3
+    # Só a primeira leitura tenta carregar do ERP; as seguintes esperam OPS_ABERTAS_ESPERA_FALHA
+    assert len(cargas) == 1
+
+
+def leitura(cod_op="100", codigo_barras=EAN, **campos):
+    return {"cod_op": cod_op, "codigo_barras": codigo_barras, "nome_produto": "Mesa", "especie": "Móveis",
+            "sub_especie": "Mesas", "id_produto": "1", **campos}
+
+
+@pytest.fixture
+def codigos(monkeypatch):
+    indice = IndiceCodigos()
+    indice.atualizar_op({"CODIGO_OP": "100", "CODIGOS_BARRAS": [EAN], "CODS_OP": ["100A"]})
+    carregadas = []
+
+    async def carregar_op_async(cod_op):
+        carregadas.append(cod_op)
+        return pd.DataFrame()
+
+    monkeypatch.setattr(main_web, "obter_indice_codigos", lambda: indice)
+    monkeypatch.setattr(consulta_ops, "carregar_op_async", carregar_op_async)
+    return carregadas
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def armazem_app(request, tmp_path, monkeypatch):
+    if request.param == "csv":
+        yield request.getfixturevalue("armazem")
+        return
+    from src.database.leituras_sqlite import ArmazemSQLite
+    armazem = ArmazemSQLite(str(tmp_path / "registros.db"))
+    monkeypatch.setattr(armazem_leituras, "_armazem", armazem)
+    yield armazem
+    armazem.fechar()
+
+
+def test_lote_grava_as_validas_e_devolve_o_resultado_de_cada_leitura(cliente, armazem_app, codigos):
+    gravadas = []
+    armazem_app.ao_gravar(gravadas.append)
+    resposta = cliente.post("/api/registrar_leitura/lote", json={"leituras": [
+        leitura(), leitura(codigo_barras="100A"), leitura(nome_produto=""), leitura(codigo_barras="7890000000001"),
+        leitura(cod_op="999"), leitura(),
+    ]})
+
+    assert resposta.status_code == 200
+    corpo = resposta.json()
+    assert (corpo["ok"], corpo["registradas"]) == (False, 3)
+    assert [(r["indice"], r["ok"], r.get("motivo")) for r in corpo["resultados"]] == [
+        (0, True, None), (1, True, None), (2, False, "DADOS_INCOMPLETOS"), (3, False, "CODIGO_NAO_PERTENCE_OP"),
+        (4, False, "OP_DESCONHECIDA"), (5, True, None),
+    ]
+    # A OP desconhecida é buscada uma vez; as válidas vão numa única gravação
+    assert codigos == ["999"]
+    assert [len(lote) for lote in gravadas] == [3]
+    assert armazem_app.qtd_registrada("100") == 3
+    leituras = [l for bloco in armazem_app.iterar_leituras() for l in bloco]
+    assert [(l["CODIGO_BARRAS"], l["USUARIO"]) for l in leituras] == [(EAN, "maria"), ("100A", "maria"), (EAN, "maria")]
+
+
+def test_lote_invalido_ou_grande_demais(cliente, armazem_app, codigos):
+    assert cliente.post("/api/registrar_leitura/lote", json={"leituras": []}).status_code == 400
+    assert cliente.post("/api/registrar_leitura/lote", json={"leituras": "x"}).status_code == 400
+    grande = [leitura()] * (main_web.MAX_LEITURAS_LOTE + 1)
+    assert cliente.post("/api/registrar_leitura/lote", json=grande).status_code == 413
+    assert armazem_app.somas_por_op() == {}
+
+
+def test_lote_exige_sessao(cliente, armazem_app, codigos):
+    cliente.cookies.clear()
+    assert cliente.post("/api/registrar_leitura/lote", json=[leitura()]).status_code == 401
+
+
+PERIODO = {"data_inicio": "01/03/2025", "data_fim": "10/03/2025"}
+
+
+def test_ops_com_erp_indisponivel_responde_5xx(cliente, erp_local, armazem, monkeypatch):
+    _, pool = erp_local
+    invalidar_cache_ops()
+
+    def fora_do_ar():
+        raise OSError("ERP fora do ar")
+
+    monkeypatch.setattr(consulta_ops, "obter_pool", lambda: PoolConexoes(fora_do_ar, timeout=1))
+    resposta = cliente.get("/api/ops", params=PERIODO)
+    assert (resposta.status_code, resposta.json()) == (500, {"erro": "ERP fora do ar"})
+
+    # Todas as conexões ocupadas: 503 em vez de um período sem OPs
+    monkeypatch.setattr(consulta_ops, "obter_pool", lambda: pool)
+    with pool.conexao():
+        assert cliente.get("/api/ops", params=PERIODO).status_code == 503
+
+    try:
+        resposta = cliente.get("/api/ops", params=PERIODO)
+        assert resposta.status_code == 200
+        assert resposta.json()["total"] == 60
+    finally:
+        invalidar_cache_ops()
+
+
+def test_ops_paginadas_por_cursor_e_filtradas(cliente, erp_local, armazem):
+    ops, _ = erp_local
+    cod_op = ops[-1]["CODIGO_OP"]
+    armazem.registrar_lote([{"DATA": "2025-03-05 10:00:00", "COD_OP": cod_op, "QTD": 1}])
+    invalidar_cache_ops()
+    try:
+        paginas, cursor = [], ""
+        while cursor is not None:
+            resposta = cliente.get("/api/ops", params={**PERIODO, "limite": 25, "cursor": cursor}).json()
+            assert resposta["total"] == 60
+            paginas.append(resposta["ops"])
+            cursor = resposta["proximo_cursor"]
+        todas = [op for pagina in paginas for op in pagina]
+        assert [len(pagina) for pagina in paginas] == [25, 25, 10]
+        assert len({op["CODIGO_OP"] for op in todas}) == 60
+        # OP com leituras vem antes das pendentes (ordem de status)
+        assert todas[0]["CODIGO_OP"] == cod_op and todas[0]["STATUS"] != "🔴 Pendente"
+
+        filtradas = cliente.get("/api/ops", params={**PERIODO, "subespecie": "SUBESPECIE 002"}).json()
+        assert 0 < filtradas["total"] < 60
+        assert {op["SUB_ESPECIE"] for op in filtradas["ops"]} == {"SUBESPECIE 002"}
+    finally:
+        invalidar_cache_ops()
+
+
+def test_ops_com_parametros_invalidos_responde_400(cliente):
+    assert cliente.get("/api/ops", params={**PERIODO, "data_fim": "2025-03-10"}).status_code == 400
+    assert cliente.get("/api/ops", params={**PERIODO, "cursor": "xyz"}).json() == {"erro": "Cursor inválido"}
+
+
+def test_exportacao_de_ops_em_csv(cliente, erp_local, armazem):
+    resposta = cliente.get("/api/export/ops", params={"data_inicio": "01/03/2025", "data_fim": "10/03/2025",
+                                                      "tipo_op": "linha", "formato": "csv"})
+    assert resposta.status_code == 200
+    assert resposta.headers["content-disposition"] == 'attachment; filename="ops_2025-03-01_2025-03-10.csv"'
+    linhas = resposta.content.decode("utf-8-sig").splitlines()
+    assert linhas[0].startswith("CODIGO_OP;DATA_PREVISTA;TIPO_OP")
+    assert len(linhas) == 1 + 30
+
+
+def test_exportacao_de_leituras_em_xlsx(cliente, armazem):
+    import io
+    import zipfile
+
+    armazem.registrar_lote([{"DATA": f"2025-03-{dia:02d} 10:00:00", "COD_OP": "100", "QTD": 1} for dia in (9, 10, 11)])
+    resposta = cliente.get("/api/export/registros", params={"data_inicio": "10/03/2025", "data_fim": "11/03/2025",
+                                                            "formato": "xlsx"})
+    assert resposta.status_code == 200
+    planilha = zipfile.ZipFile(io.BytesIO(resposta.content)).read("xl/worksheets/sheet1.xml").decode("utf-8")
+    assert "2025-03-10 10:00:00" in planilha and "2025-03-11 10:00:00" in planilha
+    assert "2025-03-09" not in planilha
+
+    assert cliente.get("/api/export/registros", params={"data_inicio": "10/03/2025", "data_fim": "09/03/2025"}
+                       ).status_code == 400
@@ -0,0 +1,53 @@
+# tests/test_metricas.py
+from src.logic import consulta_ops
+from src.logic.metricas import REQUISICOES, Contador, Histograma, Medidor, RegistroMetricas
+
+
+def test_exportacao_no_formato_do_prometheus():
+    registro = RegistroMetricas()
+    contador = registro.adicionar(Contador("leituras_total", "Leituras", ("motivo",)))
+    histograma = registro.adicionar(Histograma("duracao_segundos", "Duração", limites=(0.1, 1.0)))
+    contador.inc(motivo='OP "X"')
+    contador.inc(2, motivo='OP "X"')
+    for valor in (0.05, 0.5, 3.0):
+        histograma.observar(valor)
+
+    linhas = registro.exportar().splitlines()
+    assert linhas[:3] == ["# HELP leituras_total Leituras", "# TYPE leituras_total counter",
+                          'leituras_total{motivo="OP \\"X\\""} 3']
+    assert linhas[5:] == [
+        'duracao_segundos_bucket{le="0.1"} 1',
+        'duracao_segundos_bucket{le="1.0"} 2',
+        'duracao_segundos_bucket{le="+Inf"} 3',
+        "duracao_segundos_sum 3.55",
+        "duracao_segundos_count 3",
+    ]
+
+
+def test_falha_ao_coletar_uma_metrica_nao_derruba_as_demais():
+    def coletar():
+        raise OSError("pool fechado")
+
+    registro = RegistroMetricas()
+    registro.adicionar(Medidor("pool_livres", "Conexões livres", coletar=coletar))
+    registro.adicionar(Medidor("fila", "Fila", ("nome",), coletar=lambda: [({"nome": "sse"}, 2)]))
+    assert registro.exportar().splitlines() == [
+        "# erro ao coletar pool_livres: pool fechado",
+        "# HELP fila Fila", "# TYPE fila gauge", 'fila{nome="sse"} 2',
+    ]
+
+
+def test_requisicoes_contadas_pelo_modelo_da_rota(cliente, monkeypatch):
+    async def carregar_op_async(cod_op):
+        raise OSError("ERP fora do ar")
+
+    monkeypatch.setattr(consulta_ops, "carregar_op_async", carregar_op_async)
+    antes = REQUISICOES.valor(rota="/op/{cod_op}", metodo="GET", status=500)
+    cliente.get("/op/100")
+    cliente.get("/op/200")
+    assert REQUISICOES.valor(rota="/op/{cod_op}", metodo="GET", status=500) == antes + 2
+
+    resposta = cliente.get("/metrics")
+    assert resposta.status_code == 200
+    assert 'http_requisicoes_total{rota="/op/{cod_op}",metodo="GET",status="500"}' in resposta.text
+    assert "/op/100" not in resposta.text
@@ -0,0 +1,27 @@
+# tests/test_migrar_registros.py
+import sqlite3
+
+from src.database.migrar_registros import migrar
+
+
+def test_migracao_ignora_linhas_curtas_e_aceita_colunas_antigas(tmp_path, capsys):
+    caminho_csv = tmp_path / "registros.csv"
+    caminho_csv.write_text(
+        "COD_OP,COD_BARRAS,ID_PRODUTO,QTD,USUARIO,DATA_REGISTRO\n"
+        "100,7891234567895,1,1,maria,2025-03-10 10:00:00\n"
+        "100,7891234567895,1\n"
+        "200,7891234567895,2,3,joao,2025-03-10 10:05:00\n",
+        encoding="utf-8",
+    )
+    caminho_db = str(tmp_path / "registros.db")
+
+    assert migrar(str(caminho_csv), caminho_db, pasta=str(tmp_path / "registros_particoes")) == 2
+    assert "1 linhas incompletas ignoradas" in capsys.readouterr().out
+
+    con = sqlite3.connect(caminho_db)
+    linhas = con.execute("SELECT COD_OP, CODIGO_BARRAS, QTD, DATA FROM LEITURA_PRODUTO ORDER BY ID_LEITURA").fetchall()
+    con.close()
+    assert linhas == [("100", "7891234567895", 1, "2025-03-10 10:00:00"), ("200", "7891234567895", 3, "2025-03-10 10:05:00")]
+
+    # Banco já com leituras: não migra de novo sem forcar
+    assert migrar(str(caminho_csv), caminho_db, pasta=str(tmp_path / "registros_particoes")) == 0
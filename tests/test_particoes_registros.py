@@ -0,0 +1,144 @@
+# tests/test_particoes_registros.py
+import csv
+import os
+
+import pytest
+
+from src.logic import particoes_registros
+from src.logic.diario_registros import DiarioRegistros
+from src.logic.particoes_registros import DIARIO_ROTACAO, SUFIXO_ROTACAO, ParticoesRegistros, verificar
+
+MES_FECHADO = "2025-02"
+MES_ATUAL = "2025-03"
+
+
+def leitura(cod_op, mes, qtd=1):
+    return {"DATA": f"{mes}-10 10:00:00", "COD_OP": cod_op, "ID_PRODUTO": "1", "QTD": qtd, "USUARIO": "teste"}
+
+
+def gravar(caminho, linhas):
+    diario = DiarioRegistros(caminho, intervalo_fsync=0)
+    diario.registrar_lote(linhas, sincronizar=True)
+    diario.fechar()
+
+
+def ler(caminho):
+    with open(caminho, "r", encoding="utf-8", newline="") as arq:
+        return list(csv.DictReader(arq))
+
+
+def sobras(caminho, particoes):
+    arquivos = [caminho + SUFIXO_ROTACAO] + [os.path.join(particoes.pasta, n) for n in os.listdir(particoes.pasta)]
+    return [a for a in arquivos if a.endswith(SUFIXO_ROTACAO) and os.path.exists(a)]
+
+
+@pytest.fixture
+def particoes(tmp_path):
+    return ParticoesRegistros(str(tmp_path / "registros_particoes"))
+
+
+@pytest.fixture
+def com_leituras(registros):
+    gravar(registros, [leitura("A", MES_FECHADO)] * 4 + [leitura("B", MES_ATUAL)] * 2)
+    return registros
+
+
+def test_rotacao_move_meses_fechados_e_resume(com_leituras, particoes):
+    assert particoes.rotacionar(com_leituras, MES_ATUAL) == 4
+
+    assert particoes.meses() == [MES_FECHADO]
+    assert [l["COD_OP"] for l in particoes.ler_particao(MES_FECHADO)] == ["A"] * 4
+    assert [l["COD_OP"] for l in ler(com_leituras)] == ["B"] * 2
+    assert particoes.somas()[0] == {"A": 4}
+    assert not os.path.exists(os.path.join(particoes.pasta, DIARIO_ROTACAO))
+    assert verificar(particoes, com_leituras) == 0
+
+
+def test_rotacao_interrompida_antes_do_diario_e_descartada(com_leituras, particoes, monkeypatch):
+    antes = open(com_leituras, "rb").read()
+    gravar_atomico = particoes_registros._gravar_atomico
+
+    def cair_no_diario(caminho, conteudo):
+        if caminho.endswith(DIARIO_ROTACAO):
+            raise OSError("queda simulada")
+        gravar_atomico(caminho, conteudo)
+
+    monkeypatch.setattr(particoes_registros, "_gravar_atomico", cair_no_diario)
+    with pytest.raises(OSError):
+        particoes.rotacionar(com_leituras, MES_ATUAL)
+    monkeypatch.undo()
+
+    # Sem o ponto de confirmação nada foi substituído: só ficaram os arquivos montados
+    assert open(com_leituras, "rb").read() == antes
+    assert particoes.meses() == []
+    assert sobras(com_leituras, particoes)
+
+    # Gravações depois da queda continuam no arquivo aberto e entram na próxima rotação
+    gravar(com_leituras, [leitura("A", MES_FECHADO), leitura("B", MES_ATUAL)])
+
+    retomada = ParticoesRegistros(particoes.pasta)
+    assert retomada.rotacionar(com_leituras, MES_ATUAL) == 5
+    assert sobras(com_leituras, retomada) == []
+    assert [l["COD_OP"] for l in retomada.ler_particao(MES_FECHADO)] == ["A"] * 5
+    assert [l["COD_OP"] for l in ler(com_leituras)] == ["B"] * 3
+    assert retomada.somas()[0] == {"A": 5}
+
+
+def test_rotacao_interrompida_depois_do_diario_e_concluida(com_leituras, particoes, monkeypatch):
+    caminho_diario = os.path.join(particoes.pasta, DIARIO_ROTACAO)
+    concluir = ParticoesRegistros._concluir_rotacao
+
+    def cair_apos_confirmar(self):
+        if os.path.exists(caminho_diario):
+            raise OSError("queda simulada")
+        return concluir(self)
+
+    monkeypatch.setattr(ParticoesRegistros, "_concluir_rotacao", cair_apos_confirmar)
+    with pytest.raises(OSError):
+        particoes.rotacionar(com_leituras, MES_ATUAL)
+    monkeypatch.undo()
+    assert os.path.exists(caminho_diario)
+
+    # Leituras anexadas ao arquivo antigo depois da confirmação não podem se perder
+    gravar(com_leituras, [leitura("A", MES_FECHADO), leitura("B", MES_ATUAL), leitura("B", MES_ATUAL)])
+
+    retomada = ParticoesRegistros(particoes.pasta)
+    # A rotação pendente é concluída; a leitura tardia do mês fechado vai na rotação seguinte
+    assert retomada.rotacionar(com_leituras, MES_ATUAL) == 1
+    assert not os.path.exists(caminho_diario)
+    assert sobras(com_leituras, retomada) == []
+    assert [l["COD_OP"] for l in retomada.ler_particao(MES_FECHADO)] == ["A"] * 5
+    assert [l["COD_OP"] for l in ler(com_leituras)] == ["B"] * 4
+    assert retomada.somas()[0] == {"A": 5}
+    assert verificar(retomada, com_leituras) == 0
+
+
+def test_rotacao_interrompida_no_meio_das_substituicoes(com_leituras, particoes, monkeypatch):
+    substituir = os.replace
+
+    def cair_no_aberto(origem, destino):
+        if os.path.abspath(destino) == os.path.abspath(com_leituras):
+            raise OSError("queda simulada")
+        substituir(origem, destino)
+
+    monkeypatch.setattr(os, "replace", cair_no_aberto)
+    with pytest.raises(OSError):
+        particoes.rotacionar(com_leituras, MES_ATUAL)
+    monkeypatch.undo()
+
+    # A partição já foi trocada e o arquivo aberto ainda não: o diário resolve a duplicidade
+    retomada = ParticoesRegistros(particoes.pasta)
+    assert retomada.rotacionar(com_leituras, MES_ATUAL) == 0
+    assert [l["COD_OP"] for l in retomada.ler_particao(MES_FECHADO)] == ["A"] * 4
+    assert [l["COD_OP"] for l in ler(com_leituras)] == ["B"] * 2
+    assert retomada.somas()[0] == {"A": 4}
+
+
+def test_resumo_desatualizado_e_refeito(com_leituras, particoes):
+    particoes.rotacionar(com_leituras, MES_ATUAL)
+    with open(particoes.caminho_particao(MES_FECHADO), "a", encoding="utf-8", newline="") as arq:
+        csv.writer(arq, lineterminator="\n").writerow([f"{MES_FECHADO}-11 10:00:00", "A", "", "1", "", "", "", "3", ""])
+
+    assert verificar(particoes, com_leituras) == 1
+    assert ParticoesRegistros(particoes.pasta).somas()[0] == {"A": 7}
+    assert verificar(particoes, com_leituras) == 0
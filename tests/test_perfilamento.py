@@ -0,0 +1,52 @@
+# tests/test_perfilamento.py
+import threading
+
+from src.logic import sessao
+from src.logic.perfilamento import Amostrador, _pedido_manual, como_folded
+
+
+def calculo_demorado(parar):
+    while not parar.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_amostrador_conta_as_pilhas_das_threads_ocupadas():
+    parar = threading.Event()
+    ocupada = threading.Thread(target=calculo_demorado, args=(parar,))
+    ocupada.start()
+    amostrador = Amostrador(intervalo=0.001, limite=5)
+    amostrador.iniciar()
+    threading.Event().wait(0.2)
+    perfil = amostrador.parar()
+    parar.set()
+    ocupada.join()
+
+    assert perfil["amostras"] > 0
+    funcoes = {f["funcao"].split(" ")[0]: f for f in perfil["funcoes"]}
+    assert funcoes["calculo_demorado"]["total"] > 0
+    # A própria thread de amostragem não entra no perfil
+    assert "_rodar" not in funcoes
+    assert all(linha.rsplit(" ", 1)[1].isdigit() for linha in como_folded(perfil).splitlines())
+
+
+def test_pedido_manual_por_cabecalho_ou_parametro():
+    assert _pedido_manual({"query_string": b"data=1&perfilar=1"})
+    assert not _pedido_manual({"query_string": b"perfilar=0"})
+    assert _pedido_manual({"query_string": b"", "headers": [(b"x-perfilar", b"1")]})
+    assert not _pedido_manual({"query_string": b"", "headers": [(b"x-perfilar", b"0")]})
+
+
+def test_perfil_sob_demanda_so_para_admin(cliente):
+    params = {"data_inicio": "01/03/2025", "data_fim": "x", "perfilar": "1"}
+    assert "x-perfil-id" not in cliente.get("/api/ops", params=params).headers
+
+    cliente.cookies.set(sessao.COOKIE_SESSAO, sessao.criar_token("admin"))
+    resposta = cliente.get("/api/ops", params=params)
+    assert resposta.status_code == 400
+    perfil_id = int(resposta.headers["x-perfil-id"])
+
+    perfis = cliente.get("/api/admin/perfis").json()["perfis"]
+    assert {"id": perfil_id, "motivo": "pedido", "rota": "/api/ops", "status": 400}.items() <= perfis[0].items()
+    assert "pilhas" not in perfis[0]
+    assert cliente.get(f"/api/admin/perfis/{perfil_id}", params={"formato": "folded"}).status_code == 200
+    assert cliente.get("/api/admin/perfis/999999").status_code == 404
@@ -0,0 +1,30 @@
+# tests/test_serializacao.py
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from src.logic.serializacao import dumps_json, para_colunar
+
+
+def test_colunar_com_dicionario_nas_categoricas():
+    df = pd.DataFrame({
+        "CODIGO_OP": ["1", "2", "3"],
+        "STATUS": ["🔴 Pendente", None, "🔴 Pendente"],
+        "QTD_PREVISTA": [1.5, np.nan, 3.0],
+        "DATA_PREVISTA": pd.to_datetime(["2025-03-10 00:00:00", None, "2025-03-11 08:30:00"]),
+    })
+    colunar = json.loads(dumps_json(para_colunar(df, ("STATUS",))))
+
+    assert colunar["colunas"] == ["CODIGO_OP", "STATUS", "QTD_PREVISTA", "DATA_PREVISTA"]
+    assert colunar["dados"]["STATUS"] == [0, -1, 0]
+    assert colunar["dicionarios"] == {"STATUS": ["🔴 Pendente"]}
+    assert colunar["dados"]["QTD_PREVISTA"] == [1.5, None, 3.0]
+    assert colunar["dados"]["DATA_PREVISTA"] == ["2025-03-10T00:00:00", None, "2025-03-11T08:30:00"]
+
+
+def test_dumps_json_aceita_tipos_do_erp_e_do_numpy():
+    dados = {"qtd": Decimal("2.5"), "data": datetime(2025, 3, 10, 8), "n": np.int64(3), "v": np.array([1, 2])}
+    assert json.loads(dumps_json(dados)) == {"qtd": 2.5, "data": "2025-03-10T08:00:00", "n": 3, "v": [1, 2]}
@@ -0,0 +1,67 @@
+# tests/test_sessao.py
+import base64
+import json
+
+import pytest
+
+from src.logic import sessao
+from src.logic.configuracao import recarregar_configuracao
+from src.logic.sessao import criar_token, verificar_token
+
+
+@pytest.fixture(autouse=True)
+def segredo(monkeypatch):
+    monkeypatch.setattr(sessao, "_segredo", b"segredo-de-teste")
+
+
+def trocar_corpo(token, **campos):
+    corpo, assinatura = token.split(".")
+    dados = json.loads(base64.urlsafe_b64decode(corpo + "=" * (-len(corpo) % 4)))
+    dados.update(campos)
+    novo = base64.urlsafe_b64encode(json.dumps(dados).encode()).rstrip(b"=").decode()
+    return f"{novo}.{assinatura}"
+
+
+def test_token_valido():
+    assert verificar_token(criar_token("maria")) == "maria"
+
+
+@pytest.mark.parametrize("token", ["", "abc", "a.b.c", "abc.def", "abc.déf", "ábc.def", "abc.\udcff"])
+def test_token_malformado(token):
+    assert verificar_token(token) is None
+
+
+def test_token_com_corpo_alterado():
+    assert verificar_token(trocar_corpo(criar_token("maria"), u="admin")) is None
+
+
+def test_token_com_assinatura_alterada():
+    corpo, assinatura = criar_token("maria").split(".")
+    outro = "A" if assinatura[0] != "A" else "B"
+    assert verificar_token(f"{corpo}.{outro}{assinatura[1:]}") is None
+
+
+def test_token_de_outro_segredo(monkeypatch):
+    token = criar_token("maria")
+    monkeypatch.setattr(sessao, "_segredo", b"outro-segredo")
+    assert verificar_token(token) is None
+
+
+def test_token_expirado():
+    assert verificar_token(criar_token("maria", duracao=-1)) is None
+    assert verificar_token(trocar_corpo(criar_token("maria", duracao=-1), exp=4102444800)) is None
+
+
+def test_segredo_gerado_e_compartilhado(tmp_path, monkeypatch):
+    monkeypatch.setenv("SESSAO_SEGREDO", "")
+    monkeypatch.setenv("REGISTROS_CSV_PATH", str(tmp_path / "registros.csv"))
+    recarregar_configuracao()
+    try:
+        segredo = sessao._segredo_gerado()
+        assert len(segredo) == 64
+        # Outro worker lê o mesmo arquivo em vez de gerar um segredo próprio
+        assert sessao._segredo_gerado() == segredo
+        assert (tmp_path / ".sessao_segredo").read_text(encoding="utf-8") == segredo
+    finally:
+        monkeypatch.undo()
+        recarregar_configuracao()
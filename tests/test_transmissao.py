@@ -0,0 +1,52 @@
+# tests/test_transmissao.py
+import asyncio
+import threading
+
+from src.logic.transmissao import EVENTO_RESINCRONIZAR, Transmissor
+
+
+def test_evento_publicado_de_outra_thread_chega_a_todos_os_assinantes():
+    async def cenario():
+        transmissor = Transmissor()
+        filas = [transmissor.assinar(), transmissor.assinar()]
+        publicacao = threading.Thread(target=transmissor.publicar, args=({"tipo": "leituras", "n": 1},))
+        publicacao.start()
+        recebidos = [await asyncio.wait_for(fila.get(), 5) for fila in filas]
+        publicacao.join()
+
+        transmissor.cancelar(filas[0])
+        transmissor.publicar({"tipo": "leituras", "n": 2})
+        assert await asyncio.wait_for(filas[1].get(), 5) == {"tipo": "leituras", "n": 2}
+        return recebidos, filas[0].empty(), transmissor.total_assinantes
+
+    recebidos, vazia, total = asyncio.run(cenario())
+    assert recebidos == [{"tipo": "leituras", "n": 1}] * 2
+    assert vazia and total == 1
+
+
+def test_assinante_atrasado_recebe_pedido_de_resincronizar():
+    async def cenario():
+        transmissor = Transmissor(max_fila=2)
+        lenta, rapida = transmissor.assinar(), transmissor.assinar()
+        recebidos = []
+        for n in range(3):
+            transmissor.publicar({"n": n})
+            await asyncio.sleep(0)
+            recebidos.append(rapida.get_nowait())
+        return [lenta.get_nowait() for _ in range(lenta.qsize())], recebidos
+
+    lenta, rapida = asyncio.run(cenario())
+    # A fila cheia é esvaziada e fica só o aviso; quem acompanha não perde nada
+    assert lenta == [EVENTO_RESINCRONIZAR]
+    assert rapida == [{"n": 0}, {"n": 1}, {"n": 2}]
+
+
+def test_assinante_de_loop_encerrado_e_descartado():
+    transmissor = Transmissor()
+
+    async def assinar():
+        return transmissor.assinar()
+
+    asyncio.run(assinar())
+    transmissor.publicar({"n": 1})
+    assert transmissor.total_assinantes == 0